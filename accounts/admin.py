@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from accounts.models import Client
+from accounts.models import Client, OutboundEmail
 
 
 @admin.register(Client)
@@ -9,3 +9,10 @@ class ClientAdmin(admin.ModelAdmin):
     search_fields = ["company_name", "user__username", "user__email"]
     raw_id_fields = ["user"]
 
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ["to", "template", "status", "attempts", "created_at", "sent_at"]
+    list_filter = ["status", "template"]
+    search_fields = ["to"]
+    readonly_fields = ["attempts", "last_error", "created_at", "locked_at", "sent_at"]
@@ -0,0 +1,104 @@
+"""
+JWT claims carrying the tenant and role of the user.
+
+Access tokens hold ``role`` ("ADMIN" / "CLIENT" / None), ``client_id`` and the
+few user fields the API reads (username, email, is_staff), so
+ClaimsJWTAuthentication builds ``request.user`` from the token without
+loading the user nor its Client profile. Views scope querysets with
+``client_id_for(request.user)`` (``filter(client_id=...)``).
+
+The principal is an unsaved User instance with the token's primary key: it
+can be assigned to foreign keys (DeploymentLog.user, ...) but must never be
+saved. Claims are re-read from the database on every refresh, so a role or
+tenant change, or a deactivated account, takes effect within one access token
+lifetime (ACCESS_TOKEN_LIFETIME). Tokens issued before the claims existed
+(no ``role`` claim) still authenticate through the database lookup.
+"""
+from django.contrib.auth.models import User
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ROLE_ADMIN = "ADMIN"
+ROLE_CLIENT = "CLIENT"
+
+
+def client_id_for(user):
+    """Id of the user's Client profile, or None. No query for token-built users."""
+    if not user.is_authenticated:
+        return None
+    if hasattr(user, "client_id"):
+        return user.client_id
+    profile = getattr(user, "client_profile", None)
+    return profile.pk if profile is not None else None
+
+
+def role_for(user):
+    if hasattr(user, "role"):
+        return user.role
+    if user.is_staff:
+        return ROLE_ADMIN
+    if client_id_for(user) is not None:
+        return ROLE_CLIENT
+    return None
+
+
+def add_claims(token, user):
+    token["username"] = user.username
+    token["email"] = user.email
+    token["is_staff"] = user.is_staff
+    token["role"] = role_for(user)
+    token["client_id"] = client_id_for(user)
+    return token
+
+
+def tokens_for(user):
+    """Refresh token (and its ``access_token``) with the tenant and role claims."""
+    return add_claims(RefreshToken.for_user(user), user)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh re-reads the user, so the new access token carries its current role and tenant."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        refresh = self.token_class(data.get("refresh", attrs["refresh"]))
+        user = (
+            User.objects.select_related("client_profile")
+            .filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}, is_active=True)
+            .first()
+        )
+        if user is None:
+            raise exceptions.AuthenticationFailed("User not found or inactive", code="user_inactive")
+        data["access"] = str(add_claims(refresh, user).access_token)
+        return data
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication without the per-request user / profile queries."""
+
+    def get_user(self, validated_token):
+        if "role" not in validated_token:
+            return super().get_user(validated_token)
+        # simplejwt stores the id as a string
+        user_id = User._meta.get_field(api_settings.USER_ID_FIELD).to_python(validated_token[api_settings.USER_ID_CLAIM])
+        user = User(
+            **{api_settings.USER_ID_FIELD: user_id},
+            username=validated_token.get("username", ""),
+            email=validated_token.get("email", ""),
+            is_staff=validated_token.get("is_staff", False),
+            is_active=True,
+        )
+        user._state.adding = False
+        user._state.db = "default"
+        user.role = validated_token["role"]
+        user.client_id = validated_token.get("client_id")
+        return user
@@ -0,0 +1,215 @@
+"""
+Transactional email outbox.
+
+Views only insert an OutboundEmail row (``queue_email``); delivery happens out
+of the request in ``deliver_due``: right after the commit in a background
+thread, and periodically by ``manage.py send_queued_emails`` for retries.
+A pass sends all the due messages over a single SMTP connection. A failing
+message is retried with exponential backoff and dead-lettered after
+EMAIL_MAX_ATTEMPTS.
+
+Each template has a context builder run at delivery time. It can return None
+to skip the message: the password reset one resolves the user then, so the
+request costs the same whether or not the address exists, and no reset token
+is stored in the outbox. Templates are compiled once per process.
+"""
+import logging
+import threading
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from accounts.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# name -> (subject, context builder)
+TEMPLATES = {}
+
+STALE_LOCK = timedelta(minutes=10)
+
+
+def email_template(name, subject):
+    def register(fn):
+        TEMPLATES[name] = (subject, fn)
+        return fn
+    return register
+
+
+@lru_cache(maxsize=None)
+def compiled(name):
+    """(text, html or None) templates of ``name``, compiled once per process."""
+    text = get_template(f"accounts/emails/{name}.txt")
+    try:
+        html = get_template(f"accounts/emails/{name}.html")
+    except TemplateDoesNotExist:
+        html = None
+    return text, html
+
+
+@email_template("password_reset", "🔐 Réinitialisation de votre mot de passe - Jounaid SaaS")
+def password_reset_context(email):
+    user = User.objects.filter(email__iexact=email.to, is_active=True).order_by("pk").first()
+    if user is None:
+        return None
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    frontend_base = getattr(settings, "FRONTEND_URL", "http://localhost:3000")
+    return {"user": user, "reset_link": f"{frontend_base}/reset-password?uid={uid}&token={token}"}
+
+
+def queue_email(to, template, context=None, dedupe=False):
+    """
+    Store the email and wake the delivery worker once the transaction commits.
+    With ``dedupe``, an undelivered email of the same template to the same
+    address is returned instead of queueing another one.
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown email template {template}")
+    if dedupe:
+        pending = OutboundEmail.objects.filter(
+            to__iexact=to, template=template, status__in=["QUEUED", "SENDING", "FAILED"]
+        ).first()
+        if pending is not None:
+            return pending
+    email = OutboundEmail.objects.create(to=to, template=template, context=context or {})
+    transaction.on_commit(process_in_background)
+    return email
+
+
+def build_message(email, mail_connection=None):
+    """EmailMultiAlternatives for ``email``, or None when there is nothing to send."""
+    subject, builder = TEMPLATES[email.template]
+    context = builder(email)
+    if context is None:
+        return None
+    context = {**email.context, **context}
+    text, html = compiled(email.template)
+    message = EmailMultiAlternatives(
+        subject, text.render(context), settings.DEFAULT_FROM_EMAIL, [email.to], connection=mail_connection
+    )
+    if html is not None:
+        message.attach_alternative(html.render(context), "text/html")
+    return message
+
+
+def _claim(email):
+    now = timezone.now()
+    return bool(
+        OutboundEmail.objects.filter(pk=email.pk)
+        .filter(Q(status__in=["QUEUED", "FAILED"]) | Q(status="SENDING", locked_at__lt=now - STALE_LOCK))
+        .update(status="SENDING", locked_at=now)
+    )
+
+
+def _failed(email, error):
+    max_attempts = getattr(settings, "EMAIL_MAX_ATTEMPTS", 6)
+    retry_base = getattr(settings, "EMAIL_RETRY_BASE_SECONDS", 60)
+    email.last_error = error
+    if email.attempts >= max_attempts:
+        email.status = "DEAD"
+    else:
+        email.status = "FAILED"
+        email.next_attempt_at = timezone.now() + timedelta(seconds=retry_base * 2 ** (email.attempts - 1))
+
+
+def deliver_due(limit=None):
+    """Send the due emails over one SMTP connection. Returns {status: count}."""
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(
+        Q(status__in=["QUEUED", "FAILED"], next_attempt_at__lte=now)
+        | Q(status="SENDING", locked_at__lt=now - STALE_LOCK)
+    ).order_by("next_attempt_at", "id")[: limit or getattr(settings, "EMAIL_BATCH_SIZE", 100)]
+    claimed = [email for email in due if _claim(email)]
+    if not claimed:
+        return {}
+
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+        connection_error = None
+    except Exception as e:
+        connection_error = f"SMTP connection failed: {e}"
+
+    try:
+        for email in claimed:
+            email.attempts += 1
+            if connection_error:
+                _failed(email, connection_error)
+                continue
+            try:
+                message = build_message(email, mail_connection)
+                if message is None:
+                    email.status = "SKIPPED"
+                else:
+                    message.send()
+                    email.status = "SENT"
+                    email.sent_at = timezone.now()
+                email.last_error = ""
+            except Exception as e:
+                logger.warning("Email %s to %s failed: %s", email.pk, email.to, e)
+                _failed(email, str(e))
+    finally:
+        if not connection_error:
+            mail_connection.close()
+
+    for email in claimed:
+        email.locked_at = None
+    OutboundEmail.objects.bulk_update(
+        claimed, ["status", "attempts", "last_error", "next_attempt_at", "locked_at", "sent_at"]
+    )
+    counts = {}
+    for email in claimed:
+        counts[email.status] = counts.get(email.status, 0) + 1
+    return counts
+
+
+def purge_delivered(days=None):
+    """Delete SENT / SKIPPED rows older than EMAIL_OUTBOX_RETENTION_DAYS. Returns the count."""
+    days = days if days is not None else getattr(settings, "EMAIL_OUTBOX_RETENTION_DAYS", 30)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboundEmail.objects.filter(status__in=["SENT", "SKIPPED"], created_at__lt=cutoff).delete()
+    return deleted
+
+
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def process_in_background():
+    """Wake the in-process delivery worker (one per process, batches share a connection)."""
+    _wake.set()
+    if not _worker_lock.acquire(blocking=False):
+        return  # the running worker will loop once more
+
+    def run():
+        try:
+            while True:
+                try:
+                    # Cleared before draining: a wake-up during the drain makes it loop once more.
+                    while _wake.is_set():
+                        _wake.clear()
+                        while deliver_due():
+                            pass
+                except Exception:
+                    logger.exception("Email delivery worker failed")
+                finally:
+                    _worker_lock.release()
+                # A wake-up after the last check found the lock still held and returned: take over.
+                if not (_wake.is_set() and _worker_lock.acquire(blocking=False)):
+                    return
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,173 @@
+"""
+Offline verification of Google ID tokens (Sign in with Google).
+
+The ID token is an RS256 JWT signed with one of the keys Google publishes at
+GOOGLE_JWKS_URL. The key set is kept in process and in the shared cache for as
+long as its Cache-Control max-age says, and refreshed by a background thread
+once it is due, so verifying a login never waits on Google:
+
+- a stale key set keeps being used while the refresh runs;
+- with no key set yet, or a ``kid`` that is not in it (Google rotated its
+  keys), a refresh is scheduled and the login gets GoogleKeysUnavailable,
+  which the view turns into a retryable 503.
+
+``manage.py refresh_google_jwks`` warms the cache (deploy, cron).
+GOOGLE_JWKS_FILE replaces Google's key set with a local JWKS file (tests,
+development).
+"""
+import json
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+CACHE_KEY = "google-jwks"
+DEFAULT_MAX_AGE = 3600
+
+_state = None  # {"keys": {kid: jwk}, "expires_at": epoch}
+_parsed_keys = {}
+_state_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_last_refresh_attempt = 0.0
+
+
+class GoogleTokenError(Exception):
+    pass
+
+
+class GoogleKeysUnavailable(GoogleTokenError):
+    pass
+
+
+def _max_age(response):
+    match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE
+    return max(max_age - int(response.headers.get("Age", 0) or 0), 60)
+
+
+def _set_state(state):
+    global _state
+    with _state_lock:
+        _state = state
+        _parsed_keys.clear()
+
+
+def _local_state():
+    with open(settings.GOOGLE_JWKS_FILE) as f:
+        jwks = json.load(f)
+    return {"keys": {key["kid"]: key for key in jwks["keys"]}, "expires_at": float("inf")}
+
+
+def fetch_jwks():
+    """Download Google's key set and store it in process and in the shared cache. Returns the state."""
+    if getattr(settings, "GOOGLE_JWKS_FILE", ""):
+        state = _local_state()
+        _set_state(state)
+        return state
+    response = requests.get(
+        getattr(settings, "GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs"),
+        timeout=getattr(settings, "GOOGLE_HTTP_TIMEOUT", 5),
+    )
+    response.raise_for_status()
+    max_age = _max_age(response)
+    state = {"keys": {key["kid"]: key for key in response.json()["keys"]}, "expires_at": time.time() + max_age}
+    # Other workers pick it up from the cache; kept past expiry so they serve it while refreshing.
+    cache.set(CACHE_KEY, state, timeout=max_age * 2)
+    _set_state(state)
+    return state
+
+
+def refresh_in_background():
+    """Start a single refresh thread, at most once per GOOGLE_JWKS_MIN_REFRESH seconds."""
+    global _last_refresh_attempt
+    now = time.monotonic()
+    if now - _last_refresh_attempt < getattr(settings, "GOOGLE_JWKS_MIN_REFRESH", 60):
+        return
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    _last_refresh_attempt = now
+
+    def run():
+        try:
+            fetch_jwks()
+        except Exception as e:
+            logger.warning("Google JWKS refresh failed: %s", e)
+        finally:
+            _refresh_lock.release()
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def current_state():
+    """Key set to verify with, without any call to Google; schedules a refresh when due."""
+    state = _state
+    if state is None and getattr(settings, "GOOGLE_JWKS_FILE", ""):
+        state = _local_state()
+        _set_state(state)
+    if state is None or state["expires_at"] <= time.time():
+        shared = cache.get(CACHE_KEY)
+        if shared is not None and (state is None or shared["expires_at"] > state["expires_at"]):
+            _set_state(shared)
+            state = shared
+    if state is None or state["expires_at"] <= time.time():
+        refresh_in_background()
+    return state
+
+
+def signing_key(kid):
+    from jwt.algorithms import RSAAlgorithm
+
+    state = current_state()
+    if state is None:
+        raise GoogleKeysUnavailable("Google signing keys not loaded yet")
+    jwk = state["keys"].get(kid)
+    if jwk is None:
+        refresh_in_background()  # probably a key rotation
+        raise GoogleKeysUnavailable(f"Unknown Google signing key {kid}")
+    key = _parsed_keys.get(kid)
+    if key is None:
+        key = _parsed_keys[kid] = RSAAlgorithm.from_jwk(jwk)
+    return key
+
+
+def client_ids():
+    return [cid for cid in getattr(settings, "GOOGLE_CLIENT_IDS", []) if cid]
+
+
+def verify_id_token(id_token):
+    """Claims of a valid Google ID token issued to one of GOOGLE_CLIENT_IDS. Raises GoogleTokenError."""
+    import jwt
+
+    audiences = client_ids()
+    if not audiences:
+        raise GoogleTokenError("GOOGLE_CLIENT_IDS is not configured")
+    try:
+        header = jwt.get_unverified_header(id_token)
+    except jwt.PyJWTError as e:
+        raise GoogleTokenError(f"Malformed ID token: {e}")
+    if header.get("alg") != "RS256" or not header.get("kid"):
+        raise GoogleTokenError("ID token must be RS256 with a kid")
+    try:
+        claims = jwt.decode(
+            id_token,
+            signing_key(header["kid"]),
+            algorithms=["RS256"],
+            audience=audiences,
+            issuer=GOOGLE_ISSUERS,
+            leeway=getattr(settings, "GOOGLE_TOKEN_LEEWAY", 30),
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise GoogleTokenError(f"Invalid ID token: {e}")
+    if not claims.get("email") or not claims.get("email_verified"):
+        raise GoogleTokenError("ID token has no verified email")
+    return claims
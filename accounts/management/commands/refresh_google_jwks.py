@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import google
+
+
+class Command(BaseCommand):
+    help = "Fetch Google's ID token signing keys into the shared cache (run at deploy and periodically)."
+
+    def handle(self, *args, **options):
+        try:
+            state = google.fetch_jwks()
+        except Exception as e:
+            raise CommandError(f"Google JWKS fetch failed: {e}")
+        self.stdout.write(self.style.SUCCESS(f"done: {len(state['keys'])} keys ({', '.join(sorted(state['keys']))})"))
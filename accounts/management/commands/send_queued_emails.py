@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import emails
+
+
+class Command(BaseCommand):
+    help = "Deliver due outbox emails (new ones and retries). Run from cron, or with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Emails per batch (one SMTP connection)")
+        parser.add_argument("--loop", action="store_true", help="Keep polling")
+        parser.add_argument("--interval", type=int, default=10, help="Seconds between passes with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = {}
+            while True:
+                batch = emails.deliver_due(limit=options["limit"])
+                if not batch:
+                    break
+                for status, count in batch.items():
+                    counts[status] = counts.get(status, 0) + count
+            purged = emails.purge_delivered()
+            if counts or purged or not options["loop"]:
+                summary = ", ".join(f"{status.lower()}={count}" for status, count in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f"done: {summary or 'nothing to send'}, {purged} purged"))
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
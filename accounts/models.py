@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Client(models.Model):
@@ -12,3 +13,36 @@ class Client(models.Model):
     def __str__(self):
         return f"{self.company_name} ({self.user.username})"
 
+
+
+class OutboundEmail(models.Model):
+    """Outbox of transactional emails, delivered by a background worker (see accounts/emails.py)."""
+
+    STATUS_CHOICES = [
+        ("QUEUED", "Queued"),
+        ("SENDING", "Sending"),
+        ("SENT", "Sent"),
+        ("SKIPPED", "Skipped - nothing to send"),
+        ("FAILED", "Failed - will be retried"),
+        ("DEAD", "Dead - retries exhausted"),
+    ]
+
+    to = models.EmailField()
+    template = models.CharField(max_length=50)
+    # Rendered at delivery time; secrets such as reset tokens are never stored here.
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="QUEUED")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outboundemail_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.template} to {self.to} ({self.status})"
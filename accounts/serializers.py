@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
+from accounts.auth import role_for
 from accounts.models import Client
 
 
@@ -12,11 +13,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "email", "is_staff", "is_active", "date_joined", "role"]
 
     def get_role(self, obj):
-        if obj.is_staff:
-            return "ADMIN"
-        if hasattr(obj, "client_profile"):
-            return "CLIENT"
-        return None
+        return role_for(obj)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
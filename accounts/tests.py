@@ -0,0 +1,135 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from jwt.algorithms import RSAAlgorithm
+from rest_framework.test import APIClient
+
+from accounts import google
+from accounts.models import OutboundEmail
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+KID = "test-key"
+
+
+def _reset_google_state():
+    google._set_state(None)
+    google._last_refresh_attempt = 0.0
+    cache.delete(google.CACHE_KEY)
+
+
+@override_settings(GOOGLE_CLIENT_IDS=[CLIENT_ID])
+class GoogleIdTokenLoginTest(TestCase):
+    """Sign in with Google against a local key set (GOOGLE_JWKS_FILE)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(cls.private_key.public_key()))
+        jwk.update({"kid": KID, "alg": "RS256", "use": "sig"})
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.jwks_file = Path(cls.tmp.name) / "jwks.json"
+        cls.jwks_file.write_text(json.dumps({"keys": [jwk]}))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        _reset_google_state()
+        self.addCleanup(_reset_google_state)
+        self.api = APIClient()
+
+    def id_token(self, kid=KID, **claims):
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": CLIENT_ID,
+            "sub": "1234567890",
+            "email": "jane@example.com",
+            "email_verified": True,
+            "given_name": "Jane",
+            "iat": now,
+            "exp": now + 3600,
+            **claims,
+        }
+        return jwt.encode(payload, self.private_key, algorithm="RS256", headers={"kid": kid})
+
+    def login(self, token):
+        return self.api.post("/api/auth/google/", {"id_token": token}, format="json")
+
+    def test_valid_token(self):
+        with self.settings(GOOGLE_JWKS_FILE=str(self.jwks_file)):
+            response = self.login(self.id_token())
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertIn("access", response.data)
+        self.assertEqual(response.data["user"]["email"], "jane@example.com")
+        self.assertTrue(User.objects.filter(email="jane@example.com").exists())
+
+    def test_wrong_audience(self):
+        with self.settings(GOOGLE_JWKS_FILE=str(self.jwks_file)):
+            response = self.login(self.id_token(aud="someone-else.apps.googleusercontent.com"))
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(User.objects.filter(email="jane@example.com").exists())
+
+    def test_expired_token(self):
+        past = int(time.time()) - 7200
+        with self.settings(GOOGLE_JWKS_FILE=str(self.jwks_file)):
+            response = self.login(self.id_token(iat=past, exp=past + 3600))
+        self.assertEqual(response.status_code, 401)
+
+    def test_unknown_kid_schedules_refresh(self):
+        with self.settings(GOOGLE_JWKS_FILE=str(self.jwks_file)), \
+                mock.patch.object(google, "refresh_in_background") as refresh:
+            response = self.login(self.id_token(kid="rotated-key"))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+        refresh.assert_called()
+
+    def test_cold_cache(self):
+        # No key set anywhere yet: the login is not blocked on Google, a refresh is scheduled.
+        with mock.patch.object(google, "refresh_in_background") as refresh:
+            response = self.login(self.id_token())
+        self.assertEqual(response.status_code, 503)
+        refresh.assert_called_once()
+
+        # Another worker fetched the keys into the shared cache: this one picks them up.
+        with self.settings(GOOGLE_JWKS_FILE=str(self.jwks_file)):
+            state = google._local_state()
+        cache.set(google.CACHE_KEY, {**state, "expires_at": time.time() + 3600})
+        with mock.patch.object(google, "refresh_in_background") as refresh:
+            response = self.login(self.id_token())
+        self.assertEqual(response.status_code, 200, response.data)
+        refresh.assert_not_called()
+
+
+class PasswordResetRequestTest(TestCase):
+    def setUp(self):
+        cache.clear()  # throttle history
+        self.api = APIClient()
+
+    def request_reset(self, email):
+        return self.api.post("/api/password-reset/", {"email": email}, format="json")
+
+    def test_invalid_address_is_rejected(self):
+        self.assertEqual(self.request_reset("not an email").status_code, 400)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_pending_request_is_not_duplicated(self):
+        self.assertEqual(self.request_reset("jane@example.com").status_code, 200)
+        self.assertEqual(self.request_reset("Jane@Example.com").status_code, 200)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_requests_are_throttled(self):
+        statuses = [self.request_reset(f"user{i}@example.com").status_code for i in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+        self.assertEqual(OutboundEmail.objects.count(), 5)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from billing.models import Plan, Subscription, Payment
+from billing.models import Plan, Subscription, Payment, Module, ModuleManifest, StripeEvent, RevenueRollup, Invoice
 
 
 @admin.register(Plan)
@@ -25,3 +25,46 @@ class PaymentAdmin(admin.ModelAdmin):
     search_fields = ["subscription__client__company_name", "transaction_id"]
     raw_id_fields = ["subscription"]
 
+    def get_readonly_fields(self, request, obj=None):
+        # amount / subscription feed the revenue rollups, which only follow status changes
+        return ["subscription", "amount"] if obj else []
+
+
+
+@admin.register(Module)
+class ModuleAdmin(admin.ModelAdmin):
+    list_display = ["name"]
+    search_fields = ["name"]
+
+
+@admin.register(ModuleManifest)
+class ModuleManifestAdmin(admin.ModelAdmin):
+    list_display = ["module", "odoo_version", "application", "indexed_at"]
+    list_filter = ["odoo_version", "application"]
+    search_fields = ["module__name", "summary"]
+    raw_id_fields = ["module"]
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ["event_id", "type", "status", "attempts", "received_at", "processed_at"]
+    list_filter = ["status", "type", "received_at"]
+    search_fields = ["event_id", "last_error"]
+    readonly_fields = ["received_at", "processed_at", "locked_at"]
+
+
+@admin.register(RevenueRollup)
+class RevenueRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        "month", "plan", "revenue", "refunds", "outstanding", "new_subscriptions", "churned_subscriptions", "mrr_delta",
+    ]
+    list_filter = ["plan", "month"]
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ["number", "payment", "issued_at", "status", "rendered_at"]
+    list_filter = ["status", "issued_at"]
+    search_fields = ["number", "payment__subscription__client__company_name"]
+    raw_id_fields = ["payment"]
+    readonly_fields = ["number", "issued_at", "snapshot", "pdf_path", "pdf_size", "rendered_at"]
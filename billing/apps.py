@@ -5,3 +5,5 @@ class BillingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "billing"
 
+    def ready(self):
+        from billing import signals  # noqa: F401
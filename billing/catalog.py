@@ -0,0 +1,75 @@
+"""
+Cached public plan catalog (pricing page).
+
+The catalog version is a hash of the serialized catalog, so it only changes
+when a plan does. It doubles as the HTTP validator: ETag is the version token
+and Last-Modified the time that content was first served, so conditional
+requests get a 304 without touching the database.
+
+The version key expires after PLAN_CATALOG_TTL seconds; the next read
+re-serializes the plans and, if nothing changed, finds the same token (and
+keeps its Last-Modified), so clients keep revalidating with 304s. With the
+default per-process LocMemCache, a change saved by another worker is picked up
+within that delay; Plan post_save / post_delete (billing/signals.py) drop the
+version key of the current process at once. Configure a shared cache
+(CACHE_BACKEND / CACHE_LOCATION) to make invalidation immediate everywhere.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+VERSION_KEY = "plan-catalog:version"
+# Last version served, without timeout: keeps Last-Modified when the content did not change
+LAST_VERSION_KEY = "plan-catalog:last-version"
+
+
+def ttl():
+    return getattr(settings, "PLAN_CATALOG_TTL", 300)
+
+
+def _build():
+    """(token, {plan id: serialized plan}) from the database."""
+    from billing.models import Plan
+    from billing.serializers import PlanSerializer
+
+    catalog = {data["id"]: data for data in PlanSerializer(Plan.objects.order_by("id"), many=True).data}
+    payload = json.dumps(list(catalog.values()), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:20], catalog
+
+
+def invalidate():
+    """Drop the current version: the next read re-hashes the catalog."""
+    cache.delete(VERSION_KEY)
+
+
+def current_version():
+    """{"token": str, "modified": datetime} of the catalog currently served."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        token, catalog = _build()
+        last = cache.get(LAST_VERSION_KEY)
+        if last is not None and last["token"] == token:
+            candidate = last
+        else:
+            candidate = {"token": token, "modified": timezone.now().replace(microsecond=0)}
+            cache.set(LAST_VERSION_KEY, candidate, timeout=None)
+        cache.set(f"plan-catalog:{token}", catalog, timeout=ttl() * 2)
+        # add(): concurrent first readers agree on a single version
+        cache.add(VERSION_KEY, candidate, timeout=ttl())
+        version = cache.get(VERSION_KEY) or candidate
+    return version
+
+
+def get_catalog(version=None):
+    """{plan id: serialized plan}, in catalog order, for ``version``."""
+    version = version or current_version()
+    key = f"plan-catalog:{version['token']}"
+    catalog = cache.get(key)
+    if catalog is None:
+        token, catalog = _build()
+        # Outlives the version key: an orphaned entry simply expires.
+        cache.set(f"plan-catalog:{token}", catalog, timeout=ttl() * 2)
+    return catalog
@@ -0,0 +1,116 @@
+"""
+Subscription billing cycle (manage.py run_billing_cycle).
+
+Every step is set-based and idempotent, so the cycle can run as often as
+wanted (cron):
+
+- renewals: ACTIVE auto-renewing subscriptions whose next_billing_date is due
+  get a PENDING renewal Payment for the period starting at their end_date
+  (unique per subscription and period), then next_billing_date is cleared
+  until that payment is PAID (billing.services.extend_period schedules the next one);
+- expirations: ACTIVE subscriptions past end_date + BILLING_GRACE_DAYS become EXPIRED
+  (recorded as churn in the revenue rollups).
+
+Due rows are read through the (status, next_billing_date) / (status, end_date)
+indexes and handled in chunks of primary keys.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Max, When
+from django.utils import timezone
+
+from billing import rollups
+from billing.models import Payment, Subscription
+
+CHUNK_SIZE = 2000
+
+
+@dataclass
+class CycleReport:
+    renewals_invoiced: int = 0
+    expired: int = 0
+
+
+def _chunks(qs, size=CHUNK_SIZE):
+    """Primary keys of ``qs`` in ascending chunks (keyset pagination: no OFFSET scans)."""
+    last_pk = 0
+    while True:
+        pks = list(qs.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def invoice_renewals(today, dry_run=False):
+    due = Subscription.objects.filter(status="ACTIVE", auto_renew=True, next_billing_date__lte=today)
+    if dry_run:
+        return due.count()
+
+    invoiced = 0
+    amount = Case(
+        When(billing_cycle="YEARLY", then=F("plan__price") * 12),
+        default=F("plan__price"),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    for pks in _chunks(due):
+        rows = (
+            Subscription.objects.filter(pk__in=pks)
+            .annotate(amount=amount)
+            .values_list("pk", "amount", "end_date", "next_billing_date")
+        )
+        renewals = Payment.objects.filter(subscription_id__in=pks, billing_period__isnull=False)
+        with transaction.atomic():
+            # Serializes concurrent runs on the chunk, so what is inserted below is ours alone.
+            list(Subscription.objects.select_for_update().filter(pk__in=pks).values_list("pk", flat=True))
+            existing = set(renewals.values_list("subscription_id", "billing_period"))
+            watermark = renewals.aggregate(last=Max("pk"))["last"] or 0
+            payments = []
+            for pk, amount, end_date, next_billing_date in rows:
+                # The renewed period starts when the current one ends.
+                period = end_date or next_billing_date
+                if (pk, period) in existing:
+                    continue
+                payments.append(
+                    Payment(
+                        subscription_id=pk,
+                        amount=amount or Decimal("0"),
+                        method="MANUAL",
+                        status="PENDING",
+                        billing_period=period,
+                    )
+                )
+            # ignore_conflicts still guards against a concurrent run
+            Payment.objects.bulk_create(payments, ignore_conflicts=True)
+            # Only the rows actually inserted (conflicts are dropped silently) feed the rollups.
+            rollups.payments_created(
+                renewals.filter(pk__gt=watermark).values_list("subscription__plan_id", "amount")
+            )
+            invoiced += Subscription.objects.filter(pk__in=pks, next_billing_date__lte=today).update(
+                next_billing_date=None
+            )
+    return invoiced
+
+
+def expire_subscriptions(today, dry_run=False):
+    grace = timedelta(days=getattr(settings, "BILLING_GRACE_DAYS", 3))
+    due = Subscription.objects.filter(status="ACTIVE", end_date__lt=today - grace)
+    if dry_run:
+        return due.count()
+
+    expired = 0
+    for pks in _chunks(due):
+        expired += rollups.end_subscriptions(Subscription.objects.filter(pk__in=pks), "EXPIRED")
+    return expired
+
+
+def run_cycle(today=None, dry_run=False):
+    today = today or timezone.localdate()
+    return CycleReport(
+        renewals_invoiced=invoice_renewals(today, dry_run=dry_run),
+        expired=expire_subscriptions(today, dry_run=dry_run),
+    )
@@ -0,0 +1,177 @@
+"""
+Invoices.
+
+An Invoice is issued, with a sequential number per year, in the transaction
+that marks a Payment PAID. It stores a snapshot of everything printed on it
+(seller, customer, plan, amounts), so later edits of the plan or the client
+never change an issued invoice.
+
+PDFs are rendered after commit by a small worker pool (INVOICE_RENDER_WORKERS)
+and written under INVOICE_ROOT/<year>/<number>.pdf; ``manage.py render_invoices``
+retries the ones still pending or failed. ``stream_zip`` exports a period as a
+ZIP generated on the fly, one PDF in memory at a time.
+"""
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from billing import pdf
+from billing.models import Invoice, InvoiceSequence
+
+_render_pool = None
+
+
+def next_number(year):
+    """Next invoice number of ``year``; the sequence row stays locked until the transaction ends."""
+    InvoiceSequence.objects.get_or_create(year=year)
+    sequence = InvoiceSequence.objects.select_for_update().get(year=year)
+    sequence.last_number += 1
+    sequence.save(update_fields=["last_number"])
+    return f"{getattr(settings, 'INVOICE_NUMBER_PREFIX', 'INV')}-{year}-{sequence.last_number:06d}"
+
+
+def build_snapshot(payment, number, issued_at):
+    subscription = payment.subscription
+    client = subscription.client
+    user = client.user
+    cycle = "annuel" if subscription.billing_cycle == "YEARLY" else "mensuel"
+    description = f"Abonnement {subscription.plan.name} ({cycle})"
+    if payment.billing_period:
+        description += f" - période du {payment.billing_period:%d/%m/%Y}"
+    amount = f"{payment.amount:.2f}"
+    return {
+        "number": number,
+        "issued_on": timezone.localtime(issued_at).strftime("%d/%m/%Y"),
+        "paid_on": timezone.localtime(payment.paid_at or issued_at).strftime("%d/%m/%Y"),
+        "currency": getattr(settings, "STRIPE_CURRENCY", "eur").upper(),
+        "seller": getattr(settings, "INVOICE_SELLER", {}),
+        "customer": {
+            "company": client.company_name,
+            "name": user.get_full_name() or user.username,
+            "email": user.email,
+            "address": client.address,
+        },
+        "lines": [{"description": description, "amount": amount}],
+        "total": amount,
+        "method": payment.get_method_display(),
+        "transaction_id": payment.transaction_id or "",
+        "subscription_id": subscription.pk,
+        "plan": subscription.plan.name,
+    }
+
+
+def issue_invoice(payment):
+    """Issue the invoice of a PAID payment (idempotent). Must run inside a transaction."""
+    existing = Invoice.objects.filter(payment=payment).first()
+    if existing:
+        return existing
+    issued_at = timezone.now()
+    number = next_number(timezone.localtime(issued_at).year)
+    invoice = Invoice.objects.create(
+        payment=payment, number=number, issued_at=issued_at, snapshot=build_snapshot(payment, number, issued_at)
+    )
+    transaction.on_commit(lambda: render_async(invoice.pk))
+    return invoice
+
+
+def invoice_root():
+    return Path(getattr(settings, "INVOICE_ROOT", settings.BASE_DIR / "invoices"))
+
+
+def render(invoice):
+    """Render and store the PDF of ``invoice``. Returns the PDF bytes."""
+    try:
+        data = pdf.render_invoice(invoice.snapshot)
+        path = invoice_root() / str(invoice.issued_at.year) / f"{invoice.number}.pdf"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception as e:
+        Invoice.objects.filter(pk=invoice.pk).update(status="FAILED", error_message=str(e))
+        raise
+    invoice.status, invoice.pdf_path, invoice.pdf_size = "RENDERED", str(path), len(data)
+    invoice.rendered_at, invoice.error_message = timezone.now(), ""
+    invoice.save(update_fields=["status", "pdf_path", "pdf_size", "rendered_at", "error_message"])
+    return data
+
+
+def _render_job(invoice_id):
+    try:
+        invoice = Invoice.objects.filter(pk=invoice_id).first()
+        if invoice and invoice.status != "RENDERED":
+            render(invoice)
+    except Exception:
+        pass  # recorded as FAILED; render_invoices retries
+    finally:
+        connection.close()
+
+
+def render_async(invoice_id):
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, "INVOICE_RENDER_WORKERS", 2), thread_name_prefix="invoice-render"
+        )
+    _render_pool.submit(_render_job, invoice_id)
+
+
+def pdf_bytes(invoice):
+    """The stored PDF, rendered on the spot if it is missing."""
+    if invoice.status == "RENDERED" and invoice.pdf_path and os.path.exists(invoice.pdf_path):
+        with open(invoice.pdf_path, "rb") as f:
+            return f.read()
+    return render(invoice)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file object collecting what zipfile writes, drained after each entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(invoices):
+    """
+    Yield a ZIP of the invoices' PDFs plus an index.csv. zipfile writes local
+    headers with data descriptors on an unseekable sink, so the archive is sent
+    as it is built.
+    """
+    sink = _ChunkSink()
+    index = io.StringIO()
+    writer = csv.writer(index, delimiter=";")
+    writer.writerow(["number", "issued_on", "customer", "plan", "total", "currency", "transaction_id"])
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for invoice in invoices.iterator(chunk_size=200):
+            archive.writestr(f"{invoice.number}.pdf", pdf_bytes(invoice))
+            snapshot = invoice.snapshot
+            writer.writerow(
+                [
+                    invoice.number, snapshot["issued_on"], snapshot["customer"]["company"], snapshot["plan"],
+                    snapshot["total"], snapshot["currency"], snapshot["transaction_id"],
+                ]
+            )
+            yield sink.drain()
+        archive.writestr("index.csv", index.getvalue())
+    yield sink.drain()
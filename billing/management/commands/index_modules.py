@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from billing import modules
+from billing.models import Plan
+
+
+class Command(BaseCommand):
+    help = "Index the module manifests and dependency closures shipped in the odoo:<version> images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--odoo-version", action="append", default=[],
+            help="Odoo version to index (repeatable, default: every version used by a plan)",
+        )
+        parser.add_argument("--image", default="odoo:{version}", help="Image name template")
+
+    def handle(self, *args, **options):
+        versions = options["odoo_version"] or sorted(set(Plan.objects.values_list("odoo_version", flat=True)))
+        if not versions:
+            raise CommandError("No Odoo version to index")
+
+        for version in versions:
+            image = options["image"].format(version=version)
+            try:
+                manifests = modules.dump_manifests(image)
+            except (RuntimeError, ValueError) as e:
+                self.stdout.write(self.style.ERROR(f"{version}: {e}"))
+                continue
+            count = modules.store_index(version, manifests)
+            self.stdout.write(self.style.SUCCESS(f"{version}: {count} modules indexed from {image}"))
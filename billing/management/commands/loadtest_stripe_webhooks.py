@@ -0,0 +1,237 @@
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import Client
+from billing import stripe_events
+from billing.models import Invoice, Payment, Plan, StripeEvent, Subscription
+from billing.stripe_standin import StripeStandIn, checkout_completed_event, new_id, sign_payload
+from billing.stripe_views import CreateStripeCheckoutSessionView
+
+DONE_STATUSES = ["PROCESSED", "IGNORED", "DEAD"]
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return "n/a"
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000  # noqa: E731
+    return (
+        f"p50 {pick(0.50):.1f} ms, p95 {pick(0.95):.1f} ms, p99 {pick(0.99):.1f} ms, "
+        f"max {ordered[-1] * 1000:.1f} ms, mean {statistics.mean(ordered) * 1000:.1f} ms"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test checkout + the Stripe webhook against the local Stripe stand-in: "
+        "creates its own clients/plan/subscriptions, fires checkout.session.completed "
+        "with duplicates, retries, replays and bad signatures, then checks activation. "
+        "Writes fixtures: run it on a disposable database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=1000, help="Checkout sessions to complete")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="Same delivery sent twice at once")
+        parser.add_argument("--retry-ratio", type=float, default=0.05, help="Same event re-signed and re-sent later")
+        parser.add_argument("--replay-ratio", type=float, default=0.02, help="New event id for an already paid session")
+        parser.add_argument("--bad-signature-ratio", type=float, default=0.01)
+        parser.add_argument(
+            "--url", default="",
+            help="Webhook URL of a running server sharing this database (default: in-process test client)",
+        )
+        parser.add_argument("--wait", type=int, default=300, help="Seconds to wait for the inbox to drain")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["url"] and not getattr(settings, "STRIPE_WEBHOOK_SECRET", ""):
+            raise CommandError("--url needs STRIPE_WEBHOOK_SECRET, the one the target server verifies with")
+        self.rng = random.Random(options["seed"])
+        self.secret = getattr(settings, "STRIPE_WEBHOOK_SECRET", "") or "whsec_loadtest"
+        standin = StripeStandIn().start()
+        try:
+            with override_settings(
+                STRIPE_API_BASE=standin.url,
+                STRIPE_SECRET_KEY="sk_test_standin",
+                STRIPE_WEBHOOK_SECRET=self.secret,
+                STRIPE_MAX_NETWORK_RETRIES=0,
+            ):
+                self.run(standin, options)
+        finally:
+            standin.stop()
+
+    def run(self, standin, options):
+        # One client per subscription: a client has at most one PENDING subscription.
+        prefix = f"loadtest-{time.strftime('%Y%m%d%H%M%S')}-"
+        User.objects.bulk_create(
+            [
+                User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", password=UNUSABLE_PASSWORD_PREFIX)
+                for i in range(options["events"])
+            ],
+            batch_size=500,
+        )  # bulk_create: no post_save, the profiles are created below
+        users = User.objects.filter(username__startswith=prefix)
+        Client.objects.bulk_create(
+            [Client(user=user, company_name=user.username) for user in users], batch_size=500
+        )
+        clients = Client.objects.filter(user__username__startswith=prefix)
+        plan = Plan.objects.create(name=prefix.rstrip("-"), price=29, is_active=False)
+        Subscription.objects.bulk_create(
+            [Subscription(client=client, plan=plan, status="PENDING") for client in clients], batch_size=500
+        )
+        subscriptions = list(Subscription.objects.filter(client__in=clients).select_related("client__user"))
+        self.stdout.write(f"{len(subscriptions)} pending subscriptions ({prefix}*), stand-in {standin.url}")
+
+        sessions = self.checkout(subscriptions, options["concurrency"])
+        deliveries = self.build_deliveries([standin.objects["checkout/sessions"][s] for s in sessions], options)
+        event_ids = {event_id for event_id, _, _ in deliveries}
+        self.fire(deliveries, options)
+        self.drain(event_ids, options)
+        self.verify(clients, plan, len(sessions), event_ids)
+
+    def checkout(self, subscriptions, concurrency):
+        """CreateStripeCheckoutSessionView for every subscription. Returns the session ids."""
+        factory = APIRequestFactory()
+        view = CreateStripeCheckoutSessionView.as_view()
+        path = reverse("create_stripe_checkout")
+
+        def one(subscription):
+            request = factory.post(path, {"subscription_id": subscription.pk, "amount": "29"}, format="json")
+            force_authenticate(request, subscription.client.user)
+            t0 = time.perf_counter()
+            try:
+                response = view(request)
+            finally:
+                connection.close()
+            return time.perf_counter() - t0, response.status_code, response.data.get("session_id")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, subscriptions))
+        elapsed = time.perf_counter() - start
+        failed = [status for _, status, _ in results if status != 200]
+        self.stdout.write(
+            f"checkout: {len(results)} sessions in {elapsed:.1f}s, {len(results) / elapsed:.0f} req/s, "
+            f"{_percentiles([latency for latency, _, _ in results])}, {len(failed)} failed"
+        )
+        if failed:
+            raise CommandError(f"checkout failed: {sorted(set(failed))}")
+        return [session_id for _, _, session_id in results]
+
+    def build_deliveries(self, sessions, options):
+        """[(event_id, payload, kind)] in sending order; retries go out after the first wave."""
+        first_wave, retries = [], []
+        for session in sessions:
+            event = checkout_completed_event(session)
+            payload = json.dumps(event).encode()
+            first_wave.append((event["id"], payload, "first"))
+            if self.rng.random() < options["duplicate_ratio"]:
+                first_wave.append((event["id"], payload, "duplicate"))
+            if self.rng.random() < options["bad_signature_ratio"]:
+                first_wave.append((event["id"], payload, "bad_signature"))
+            if self.rng.random() < options["replay_ratio"]:
+                replay = checkout_completed_event(session, event_id=new_id("evt"))
+                first_wave.append((replay["id"], json.dumps(replay).encode(), "replay"))
+            if self.rng.random() < options["retry_ratio"]:
+                retries.append((event["id"], payload, "retry"))
+        self.rng.shuffle(first_wave)
+        return first_wave + retries
+
+    def fire(self, deliveries, options):
+        url = options["url"] or reverse("stripe_webhook")
+        local = threading.local()
+
+        def post(payload, signature):
+            if not options["url"]:
+                response = TestClient().post(
+                    url, data=payload, content_type="application/json",
+                    HTTP_STRIPE_SIGNATURE=signature, HTTP_HOST="localhost",
+                )
+                connection.close()
+                return response.status_code
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            response = local.session.post(
+                url, data=payload, timeout=30,
+                headers={"Content-Type": "application/json", "Stripe-Signature": signature},
+            )
+            return response.status_code
+
+        def one(delivery):
+            _, payload, kind = delivery
+            # Signed at send time, like Stripe does for every attempt.
+            signature = sign_payload(payload, "whsec_wrong" if kind == "bad_signature" else self.secret)
+            t0 = time.perf_counter()
+            try:
+                status = post(payload, signature)
+            except requests.RequestException:
+                status = 0
+            return kind, status, time.perf_counter() - t0
+
+        self.fire_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(one, deliveries))
+        elapsed = time.perf_counter() - self.fire_started
+
+        kinds = {}
+        unexpected = 0
+        for kind, status, _ in results:
+            kinds[kind] = kinds.get(kind, 0) + 1
+            unexpected += status != (400 if kind == "bad_signature" else 200)
+        self.stdout.write(
+            f"webhook: {len(results)} deliveries {kinds} in {elapsed:.1f}s, {len(results) / elapsed:.0f} req/s, "
+            f"{_percentiles([latency for _, _, latency in results])}, {unexpected} unexpected status"
+        )
+        self.unexpected_statuses = unexpected
+
+    def drain(self, event_ids, options):
+        """Wait until every stored event is processed (or dead)."""
+        deadline = time.monotonic() + options["wait"]
+        pending = StripeEvent.objects.filter(event_id__in=event_ids).exclude(status__in=DONE_STATUSES)
+        while pending.exists() and time.monotonic() < deadline:
+            if not options["url"]:
+                stripe_events.process_in_background()
+            time.sleep(0.2)
+        retried = StripeEvent.objects.filter(event_id__in=event_ids, attempts__gt=1).count()
+        self.stdout.write(
+            f"inbox drained {time.perf_counter() - self.fire_started:.1f}s after the first delivery, "
+            f"{pending.count()} still pending, {retried} needed more than one processing attempt"
+        )
+
+    def verify(self, clients, plan, expected, event_ids):
+        payments = Payment.objects.filter(subscription__client__in=clients)
+        subscriptions = Subscription.objects.filter(client__in=clients)
+        events = StripeEvent.objects.filter(event_id__in=event_ids)
+        checks = {
+            "events stored once": (events.count(), len(event_ids)),
+            "events processed": (events.filter(status="PROCESSED").count(), len(event_ids)),
+            "payments created": (payments.count(), expected),
+            "payments PAID": (payments.filter(status="PAID").exclude(transaction_id="").count(), expected),
+            "subscriptions ACTIVE": (subscriptions.filter(status="ACTIVE").count(), expected),
+            "paid_total == price": (subscriptions.filter(paid_total=plan.price).count(), expected),
+            "invoices issued": (Invoice.objects.filter(payment__in=payments).count(), expected),
+            "unexpected HTTP status": (self.unexpected_statuses, 0),
+        }
+        failed = []
+        for name, (actual, wanted) in checks.items():
+            ok = actual == wanted
+            failed += [] if ok else [name]
+            self.stdout.write((self.style.SUCCESS if ok else self.style.ERROR)(f"  {name}: {actual} / {wanted}"))
+        if failed:
+            raise CommandError(f"correctness checks failed: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"done: {expected} subscriptions activated exactly once"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from billing import stripe_events
+
+
+class Command(BaseCommand):
+    help = "Process due Stripe webhook events (new ones and retries). Run from cron, or with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Maximum number of events per pass")
+        parser.add_argument("--loop", action="store_true", help="Keep polling")
+        parser.add_argument("--interval", type=int, default=10, help="Seconds between passes with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = stripe_events.process_due_events(limit=options["limit"])
+            if counts or not options["loop"]:
+                summary = ", ".join(f"{status.lower()}={count}" for status, count in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f"done: {summary or 'nothing to process'}"))
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from billing import rollups
+from billing.models import RevenueRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the revenue rollups from the Payment and Subscription tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only report the months/plans where the incremental rollups differ from a rebuild",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            count = rollups.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"done: {count} rollups rebuilt"))
+            return
+
+        def snapshot():
+            return {
+                (r["month"], r["plan_id"]): tuple(r[name] for name in rollups.COUNTERS)
+                for r in RevenueRollup.objects.values("month", "plan_id", *rollups.COUNTERS)
+            }
+
+        zero = tuple(0 for _ in rollups.COUNTERS)
+        current = snapshot()
+        # Rebuild inside a rolled-back transaction: --check never modifies the rollups.
+        with transaction.atomic():
+            rollups.rebuild()
+            rebuilt = snapshot()
+            transaction.set_rollback(True)
+
+        drift = sorted(k for k in set(current) | set(rebuilt) if current.get(k, zero) != rebuilt.get(k, zero))
+        for month, plan_id in drift:
+            self.stdout.write(
+                self.style.WARNING(f"{month:%Y-%m} plan {plan_id}: {current.get((month, plan_id))} != {rebuilt.get((month, plan_id))}")
+            )
+        self.stdout.write(self.style.SUCCESS(f"done: {len(drift)} rollup(s) differ"))
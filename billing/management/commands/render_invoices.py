@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from billing import invoices
+from billing.models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Render the invoices whose PDF is pending or failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-render every invoice")
+
+    def handle(self, *args, **options):
+        qs = Invoice.objects.all() if options["all"] else Invoice.objects.exclude(status="RENDERED")
+        rendered = failed = 0
+        for invoice in qs.iterator():
+            try:
+                invoices.render(invoice)
+                rendered += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{invoice.number}: {e}"))
+        self.stdout.write(self.style.SUCCESS(f"done: {rendered} rendered, {failed} failed"))
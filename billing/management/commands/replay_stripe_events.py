@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from billing import stripe_events
+from billing.models import StripeEvent
+
+
+class Command(BaseCommand):
+    help = "Re-queue Stripe webhook events (dead-lettered by default) and process them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event-id", action="append", default=[], help="Stripe event id (repeatable)")
+        parser.add_argument(
+            "--status", action="append", default=[],
+            help="Statuses to replay (repeatable, default: DEAD; ignored with --event-id)",
+        )
+        parser.add_argument("--type", default=None, help="Only events of this type")
+        parser.add_argument("--since", default=None, help="Only events received after this ISO datetime")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        qs = StripeEvent.objects.all()
+        if options["event_id"]:
+            qs = qs.filter(event_id__in=options["event_id"])
+        else:
+            qs = qs.filter(status__in=[s.upper() for s in options["status"]] or ["DEAD"])
+        if options["type"]:
+            qs = qs.filter(type=options["type"])
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since must be an ISO datetime")
+            qs = qs.filter(received_at__gte=since)
+        # Never replay an event a worker is holding.
+        qs = qs.exclude(status="PROCESSING")
+
+        if options["dry_run"]:
+            for stripe_event in qs.order_by("stripe_created", "id"):
+                self.stdout.write(f"{stripe_event.event_id} {stripe_event.type} ({stripe_event.status})")
+            self.stdout.write(self.style.SUCCESS(f"done: {qs.count()} event(s) would be replayed"))
+            return
+
+        requeued = qs.update(status="RECEIVED", attempts=0, last_error="", next_attempt_at=timezone.now())
+        counts = stripe_events.process_due_events()
+        summary = ", ".join(f"{status.lower()}={count}" for status, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(f"done: {requeued} requeued; {summary or 'nothing processed'}"))
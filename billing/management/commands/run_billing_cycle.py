@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from billing import cycle
+
+
+class Command(BaseCommand):
+    help = "Invoice due renewals, expire lapsed subscriptions and suspend/resume the affected instances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", default=None, help="Run as of this date (YYYY-MM-DD, default: today)")
+        parser.add_argument("--skip-instances", action="store_true", help="Only update subscriptions and payments")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        today = None
+        if options["date"]:
+            today = parse_date(options["date"])
+            if today is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        report = cycle.run_cycle(today=today, dry_run=options["dry_run"])
+        self.stdout.write(f"renewals invoiced: {report.renewals_invoiced}")
+        self.stdout.write(f"subscriptions expired: {report.expired}")
+
+        if not options["skip_instances"]:
+            from instances import suspension  # local import: instances depends on billing
+
+            for label, (ok, failed) in (
+                ("suspended", suspension.suspend_unpaid(dry_run=options["dry_run"])),
+                ("resumed", suspension.resume_paid(dry_run=options["dry_run"])),
+            ):
+                self.stdout.write(f"instances {label}: {len(ok)}" + (f" ({', '.join(ok)})" if ok else ""))
+                for name in failed:
+                    self.stdout.write(self.style.ERROR(f"{name}: {label[:-1]} failed, see deployment logs"))
+
+        self.stdout.write(self.style.SUCCESS("done" + (" (dry run)" if options["dry_run"] else "")))
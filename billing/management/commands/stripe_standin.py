@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from billing.stripe_standin import StripeStandIn
+
+
+class Command(BaseCommand):
+    help = "Run the local Stripe stand-in (point STRIPE_API_BASE at it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument(
+            "--webhook-url", default="http://localhost:8000/api/billing/stripe-webhook/",
+            help="Where completed sessions deliver their webhook event",
+        )
+        parser.add_argument("--webhook-secret", default=None, help="Default: STRIPE_WEBHOOK_SECRET")
+
+    def handle(self, *args, **options):
+        standin = StripeStandIn(
+            options["host"], options["port"],
+            webhook_url=options["webhook_url"],
+            webhook_secret=options["webhook_secret"] or getattr(settings, "STRIPE_WEBHOOK_SECRET", "") or "whsec_standin",
+        )
+        self.stdout.write(f"Stripe stand-in on {standin.url}, webhooks to {standin.webhook_url}")
+        try:
+            standin.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            standin.stop()
+        self.stdout.write(self.style.SUCCESS(f"done: {standin.requests} requests served"))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from billing import stripe_gateway
+from billing.models import Plan
+
+
+class Command(BaseCommand):
+    help = "Create/update the Stripe Product and Price of each plan and store their ids on the plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plan", action="append", default=[], help="Plan name (repeatable)")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "STRIPE_SECRET_KEY", ""):
+            raise CommandError("STRIPE_SECRET_KEY is not set")
+
+        plans = Plan.objects.order_by("name")
+        if options["plan"]:
+            plans = plans.filter(name__in=options["plan"])
+
+        synced = failed = 0
+        for plan in plans:
+            if options["dry_run"]:
+                up_to_date = plan.stripe_price_id and plan.stripe_price_amount == plan.price
+                self.stdout.write(f"{plan.name}: {'price up to date' if up_to_date else 'price to create'}")
+                continue
+            try:
+                changes = stripe_gateway.sync_plan(plan)
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{plan.name}: {e}"))
+                continue
+            synced += 1
+            self.stdout.write(f"{plan.name}: {', '.join(changes)} ({plan.stripe_price_id})")
+        self.stdout.write(self.style.SUCCESS(f"done: {synced} synced, {failed} failed"))
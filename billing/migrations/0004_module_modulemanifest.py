@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_alter_payment_method_alter_subscription_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Module',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ModuleManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('odoo_version', models.CharField(db_index=True, max_length=10)),
+                ('summary', models.CharField(blank=True, max_length=255)),
+                ('depends', models.JSONField(default=list, help_text='Direct dependencies')),
+                ('closure', models.JSONField(default=list, help_text='Transitive dependencies, the module included')),
+                ('auto_install', models.JSONField(blank=True, help_text='Modules that trigger the auto-install (null = not auto-installed)', null=True)),
+                ('application', models.BooleanField(default=False)),
+                ('indexed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifests', to='billing.module')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='modulemanifest',
+            constraint=models.UniqueConstraint(fields=('module', 'odoo_version'), name='unique_module_manifest_per_version'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_module_modulemanifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanModule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_modules', to='billing.module')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_modules', to='billing.plan')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='modules',
+            field=models.ManyToManyField(blank=True, related_name='plans', through='billing.PlanModule', to='billing.module'),
+        ),
+        migrations.AddIndex(
+            model_name='planmodule',
+            index=models.Index(fields=['module', 'plan'], name='planmodule_module_plan_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='planmodule',
+            constraint=models.UniqueConstraint(fields=('plan', 'module'), name='unique_plan_module'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:08
+
+from django.db import migrations
+
+
+def sync_plan_modules(apps, schema_editor):
+    Plan = apps.get_model("billing", "Plan")
+    Module = apps.get_model("billing", "Module")
+    PlanModule = apps.get_model("billing", "PlanModule")
+
+    plans = list(Plan.objects.all())
+    names = {name for plan in plans for name in (plan.allowed_modules or []) if name}
+    Module.objects.bulk_create([Module(name=name) for name in names], ignore_conflicts=True)
+    module_ids = dict(Module.objects.filter(name__in=names).values_list("name", "id"))
+    PlanModule.objects.bulk_create(
+        [
+            PlanModule(plan_id=plan.id, module_id=module_ids[name])
+            for plan in plans
+            for name in set(plan.allowed_modules or [])
+            if name
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_plan_modules'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_plan_modules, migrations.RunPython.noop),
+    ]
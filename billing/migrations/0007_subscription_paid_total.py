@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_sync_plan_modules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='paid_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of PAID payments (maintained by Payment)', max_digits=10),
+        ),
+    ]
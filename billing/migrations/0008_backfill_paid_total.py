@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_paid_total(apps, schema_editor):
+    Subscription = apps.get_model("billing", "Subscription")
+    Payment = apps.get_model("billing", "Payment")
+    paid = (
+        Payment.objects.filter(subscription=OuterRef("pk"), status="PAID")
+        .values("subscription")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    Subscription.objects.update(
+        paid_total=Coalesce(Subquery(paid), Value(Decimal("0")), output_field=models.DecimalField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_subscription_paid_total'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_paid_total, migrations.RunPython.noop),
+    ]
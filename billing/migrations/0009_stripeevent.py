@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_backfill_paid_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(db_index=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('stripe_created', models.BigIntegerField(default=0, help_text='Event creation time on Stripe (epoch)')),
+                ('status', models.CharField(choices=[('RECEIVED', 'Received'), ('PROCESSING', 'Processing'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored - no handler'), ('FAILED', 'Failed - will be retried'), ('DEAD', 'Dead - retries exhausted')], default='RECEIVED', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='stripeevent_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0009_stripeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='stripe_price_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Plan price the Stripe price was created for', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='stripe_price_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='stripe_product_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_plan_stripe_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='billing_period',
+            field=models.DateField(blank=True, help_text='Start of the period paid by a renewal payment (run_billing_cycle)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['status', 'next_billing_date'], name='subscription_renewal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['status', 'end_date'], name='subscription_expiry_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('billing_period__isnull', False)), fields=('subscription', 'billing_period'), name='unique_renewal_payment_per_period'),
+        ),
+    ]
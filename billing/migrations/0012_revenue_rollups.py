@@ -0,0 +1,62 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0011_billing_cycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='refunded_at',
+            field=models.DateTimeField(blank=True, help_text='When it last left PAID', null=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='activated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='ended_at',
+            field=models.DateTimeField(blank=True, help_text='When it last left ACTIVE', null=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='mrr_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Monthly recurring revenue at activation', max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Payments that became PAID', max_digits=12)),
+                ('refunds', models.DecimalField(decimal_places=2, default=0, help_text='Payments that left PAID', max_digits=12)),
+                ('payments_count', models.IntegerField(default=0)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, help_text='PENDING amount invoiced this month', max_digits=12)),
+                ('new_subscriptions', models.IntegerField(default=0)),
+                ('churned_subscriptions', models.IntegerField(default=0)),
+                ('mrr_delta', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='billing.plan')),
+            ],
+            options={
+                'ordering': ['month', 'plan'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('month', 'plan'), name='unique_revenue_rollup'),
+        ),
+    ]
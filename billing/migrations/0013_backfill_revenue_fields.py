@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:17
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_revenue_fields(apps, schema_editor):
+    """Best effort for rows created before the fields existed; run rebuild_revenue_rollups afterwards."""
+    Payment = apps.get_model("billing", "Payment")
+    Subscription = apps.get_model("billing", "Subscription")
+    Payment.objects.filter(status__in=["PAID", "REFUNDED"], paid_at__isnull=True).update(paid_at=F("payment_date"))
+    Payment.objects.filter(status="REFUNDED", refunded_at__isnull=True).update(refunded_at=F("payment_date"))
+    for subscription in Subscription.objects.filter(status__in=["ACTIVE", "EXPIRED"]).select_related("plan"):
+        subscription.activated_at = subscription.created_at
+        subscription.mrr_amount = subscription.plan.price
+        if subscription.status == "EXPIRED":
+            subscription.ended_at = subscription.created_at.replace(
+                year=subscription.end_date.year, month=subscription.end_date.month, day=subscription.end_date.day
+            ) if subscription.end_date else subscription.created_at
+        subscription.save(update_fields=["activated_at", "mrr_amount", "ended_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0012_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_revenue_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0013_backfill_revenue_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=32, unique=True)),
+                ('issued_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('snapshot', models.JSONField(help_text='Billing data as of issue, rendered as is')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending rendering'), ('RENDERED', 'Rendered'), ('FAILED', 'Rendering failed')], default='PENDING', max_length=20)),
+                ('pdf_path', models.CharField(blank=True, max_length=500)),
+                ('pdf_size', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('rendered_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='invoice', to='billing.payment')),
+            ],
+            options={
+                'ordering': ['-issued_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db.models import ProtectedError
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ProtectedDestroyMixin:
+    """409 instead of a 500 when the object (or what it cascades to) is referenced by an issued invoice."""
+
+    protected_error_message = "Invoiced payments cannot be deleted"
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            # Invoice.payment is PROTECT: issued invoices are immutable
+            return Response({"error": self.protected_error_message}, status=status.HTTP_409_CONFLICT)
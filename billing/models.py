@@ -1,10 +1,23 @@
-from django.db import models
+import calendar
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 from accounts.models import Client
 
 
+def add_months(day, months):
+    """``day`` + ``months``, clamped to the end of the target month (Jan 31 + 1 month = Feb 28/29)."""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
 class Plan(models.Model):
     name = models.CharField(max_length=50, unique=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
@@ -15,11 +28,82 @@ class Plan(models.Model):
     odoo_version = models.CharField(max_length=10, default="18", help_text="Version d'Odoo pour ce plan (ex: 16, 17, 18)")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # Stripe catalog objects (manage.py sync_stripe_plans); prices are immutable on Stripe
+    stripe_product_id = models.CharField(max_length=255, blank=True)
+    stripe_price_id = models.CharField(max_length=255, blank=True)
+    stripe_price_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, help_text="Plan price the Stripe price was created for"
+    )
+    # Indexed copy of allowed_modules, kept in sync on save (allowed_modules stays the API field)
+    modules = models.ManyToManyField("Module", through="PlanModule", related_name="plans", blank=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.sync_modules()
+
+    def sync_modules(self):
+        """Mirror allowed_modules into PlanModule rows."""
+        names = {name for name in (self.allowed_modules or []) if name}
+        Module.objects.bulk_create([Module(name=name) for name in names], ignore_conflicts=True)
+        module_ids = set(Module.objects.filter(name__in=names).values_list("id", flat=True))
+        PlanModule.objects.filter(plan=self).exclude(module_id__in=module_ids).delete()
+        PlanModule.objects.bulk_create(
+            [PlanModule(plan=self, module_id=module_id) for module_id in module_ids], ignore_conflicts=True
+        )
+        from billing.modules import effective_modules_key  # local import: modules imports models
+
+        cache.delete(effective_modules_key(self.pk))
 
     def __str__(self):
         return self.name
 
 
+class Module(models.Model):
+    """Technical name of an Odoo module, shared by every indexed Odoo version."""
+
+    name = models.CharField(max_length=128, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PlanModule(models.Model):
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name="plan_modules")
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name="plan_modules")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["plan", "module"], name="unique_plan_module"),
+        ]
+        indexes = [
+            # Reverse lookups ("which plans include X") start from the module.
+            models.Index(fields=["module", "plan"], name="planmodule_module_plan_idx"),
+        ]
+
+
+class ModuleManifest(models.Model):
+    """Manifest of a module as shipped in the ``odoo:<odoo_version>`` image (see index_modules)."""
+
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name="manifests")
+    odoo_version = models.CharField(max_length=10, db_index=True)
+    summary = models.CharField(max_length=255, blank=True)
+    depends = models.JSONField(default=list, help_text="Direct dependencies")
+    closure = models.JSONField(default=list, help_text="Transitive dependencies, the module included")
+    auto_install = models.JSONField(
+        null=True, blank=True, help_text="Modules that trigger the auto-install (null = not auto-installed)"
+    )
+    application = models.BooleanField(default=False)
+    indexed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.module.name} ({self.odoo_version})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["module", "odoo_version"], name="unique_module_manifest_per_version"),
+        ]
+
+
 class Subscription(models.Model):
     STATUS_CHOICES = [
         ("PENDING", "Pending"),
@@ -41,11 +125,43 @@ class Subscription(models.Model):
     auto_renew = models.BooleanField(default=True, help_text="Auto-renew subscription when it expires")
     billing_cycle = models.CharField(max_length=10, choices=BILLING_CYCLE_CHOICES, default="MONTHLY")
     next_billing_date = models.DateField(null=True, blank=True, help_text="Next billing date for auto-renewal")
+    paid_total = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, help_text="Sum of PAID payments (maintained by Payment)"
+    )
+    # Revenue reporting (billing/rollups.py)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    ended_at = models.DateTimeField(null=True, blank=True, help_text="When it last left ACTIVE")
+    mrr_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, help_text="Monthly recurring revenue at activation"
+    )
     created_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.client.company_name} - {self.plan.name} ({self.status})"
 
+    def period_end(self, start):
+        """End of a billing period starting on ``start``."""
+        months = 12 if self.billing_cycle == "YEARLY" else 1
+        return add_months(start, months)
+
+    def renewal_amount(self):
+        # Plan.price is monthly
+        return (self.plan.price or 0) * (12 if self.billing_cycle == "YEARLY" else 1)
+
+    def refresh_paid_total(self):
+        """Recompute paid_total in a single UPDATE ... SET paid_total = (SELECT SUM(...))."""
+        paid = (
+            Payment.objects.filter(subscription=OuterRef("pk"), status="PAID")
+            .values("subscription")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        Subscription.objects.filter(pk=self.pk).update(
+            paid_total=Coalesce(Subquery(paid), Value(Decimal("0")), output_field=models.DecimalField())
+        )
+        self.paid_total = Subscription.objects.values_list("paid_total", flat=True).get(pk=self.pk)
+        return self.paid_total
+
     def clean(self):
         if self.end_date and self.end_date < self.start_date:
             raise ValidationError("end_date must be after start_date")
@@ -63,6 +179,11 @@ class Subscription(models.Model):
                 name="unique_pending_subscription_per_client",
             )
         ]
+        indexes = [
+            # run_billing_cycle range scans
+            models.Index(fields=["status", "next_billing_date"], name="subscription_renewal_idx"),
+            models.Index(fields=["status", "end_date"], name="subscription_expiry_idx"),
+        ]
 
 
 class Payment(models.Model):
@@ -87,46 +208,165 @@ class Payment(models.Model):
     method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, default="MANUAL")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
     transaction_id = models.CharField(max_length=255, blank=True, null=True, help_text="External transaction ID")
+    billing_period = models.DateField(
+        null=True, blank=True, help_text="Start of the period paid by a renewal payment (run_billing_cycle)"
+    )
+    paid_at = models.DateTimeField(null=True, blank=True)
+    refunded_at = models.DateTimeField(null=True, blank=True, help_text="When it last left PAID")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # One renewal payment per subscription and period: run_billing_cycle can be re-run safely.
+            models.UniqueConstraint(
+                fields=["subscription", "billing_period"],
+                condition=models.Q(billing_period__isnull=False),
+                name="unique_renewal_payment_per_period",
+            ),
+        ]
+
+    # Status as loaded from the database (see from_db), so save() can detect transitions without a SELECT
+    _loaded_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
     def save(self, *args, **kwargs):
-        """Activate subscription when payment is marked as PAID"""
+        """Activate subscription when payment is marked as PAID (through billing.services)"""
+        from billing import rollups  # local import: rollups imports models
+
         is_new = self.pk is None
-        old_status = None
-        
-        if not is_new:
-            try:
-                old_payment = Payment.objects.get(pk=self.pk)
-                old_status = old_payment.status
-            except Payment.DoesNotExist:
-                pass
-        
+        becomes_paid = not is_new and self.status == "PAID" and self._loaded_status != "PAID"
+        if becomes_paid:
+            # The PAID transition itself is a locked, conditional UPDATE: persist the other fields first.
+            self.status = self._loaded_status
+        elif self.status != self._loaded_status:
+            if self.status == "PAID":
+                self.paid_at = timezone.now()
+            elif self._loaded_status == "PAID":
+                self.refunded_at = timezone.now()
         super().save(*args, **kwargs)
 
-        # Activate subscription when payment status changes to PAID
-        if not is_new and old_status != "PAID" and self.status == "PAID":
-            # Recalculate total paid for this subscription
-            from django.db.models import Sum  # local import to avoid circulars at module load
+        if becomes_paid:
+            from billing.services import mark_payment_paid  # local import: services imports models
 
-            agg = self.subscription.payments.filter(status="PAID").aggregate(total=Sum("amount"))
-            total_paid = agg["total"] or 0
-            required_amount = self.subscription.plan.price or 0
+            mark_payment_paid(self)
+            return
+        if is_new or self.status != self._loaded_status:
+            rollups.payment_changed(self, None if is_new else self._loaded_status, self.status)
+        if is_new and self.status == "PAID":
+            from billing.invoices import issue_invoice
 
-            # Only activate if the total paid covers at least the plan price
-            if total_paid < required_amount:
-                # Still underpaid: keep subscription in its current status (typically PENDING)
-                return
+            with transaction.atomic():
+                issue_invoice(self)
+        if self.status == "PAID" or self._loaded_status == "PAID":
+            self.subscription.refresh_paid_total()
+        self._loaded_status = self.status
 
-            # Suspend other active subscriptions for this client
-            Subscription.objects.filter(
-                client=self.subscription.client,
-                status="ACTIVE"
-            ).exclude(pk=self.subscription.pk).update(status="SUSPENDED")
+    def delete(self, *args, **kwargs):
+        from billing import rollups
 
-            # Activate the subscription
-            self.subscription.status = "ACTIVE"
-            self.subscription.save()
+        result = super().delete(*args, **kwargs)
+        rollups.payment_deleted(self)
+        if self.status == "PAID":
+            self.subscription.refresh_paid_total()
+        return result
 
     def __str__(self):
         return f"Payment {self.amount} - {self.subscription.client.company_name} ({self.status})"
 
+
+class StripeEvent(models.Model):
+    """Inbox of verified Stripe webhook events, processed asynchronously (see billing/stripe_events.py)."""
+
+    STATUS_CHOICES = [
+        ("RECEIVED", "Received"),
+        ("PROCESSING", "Processing"),
+        ("PROCESSED", "Processed"),
+        ("IGNORED", "Ignored - no handler"),
+        ("FAILED", "Failed - will be retried"),
+        ("DEAD", "Dead - retries exhausted"),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField()
+    stripe_created = models.BigIntegerField(default=0, help_text="Event creation time on Stripe (epoch)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="RECEIVED")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="stripeevent_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
+
+
+class RevenueRollup(models.Model):
+    """
+    Monthly revenue counters per plan, maintained incrementally (billing/rollups.py).
+    mrr_delta and the subscription counters are deltas: MRR at a month is the running sum.
+    """
+
+    month = models.DateField(help_text="First day of the month")
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name="revenue_rollups")
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Payments that became PAID")
+    refunds = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Payments that left PAID")
+    payments_count = models.IntegerField(default=0)
+    outstanding = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, help_text="PENDING amount invoiced this month"
+    )
+    new_subscriptions = models.IntegerField(default=0)
+    churned_subscriptions = models.IntegerField(default=0)
+    mrr_delta = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["month", "plan"]
+        constraints = [
+            models.UniqueConstraint(fields=["month", "plan"], name="unique_revenue_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.plan.name}"
+
+
+class InvoiceSequence(models.Model):
+    """Last invoice number issued per year (row locked while numbering)."""
+
+    year = models.PositiveIntegerField(primary_key=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+
+class Invoice(models.Model):
+    STATUS_CHOICES = [
+        ("PENDING", "Pending rendering"),
+        ("RENDERED", "Rendered"),
+        ("FAILED", "Rendering failed"),
+    ]
+
+    payment = models.OneToOneField(Payment, on_delete=models.PROTECT, related_name="invoice")
+    number = models.CharField(max_length=32, unique=True)
+    issued_at = models.DateTimeField(default=timezone.now, db_index=True)
+    snapshot = models.JSONField(help_text="Billing data as of issue, rendered as is")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    pdf_path = models.CharField(max_length=500, blank=True)
+    pdf_size = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    rendered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-issued_at"]
+
+    def __str__(self):
+        return self.number
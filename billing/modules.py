@@ -0,0 +1,189 @@
+"""
+Module dependency index per Odoo version.
+
+``manage.py index_modules`` extracts every manifest from the ``odoo:<version>``
+image once and stores the transitive closure of each module. At request time
+the whole index of a version is loaded into a dict (kept in the Django cache
+until the next indexing run), so expanding a plan is only set lookups.
+
+The expansion of a plan (auto-install fixpoint included) is itself cached per
+plan, for one index version and one allowed_modules set; Plan.sync_modules
+drops it when the plan changes.
+"""
+import json
+import subprocess
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from billing.models import Module, ModuleManifest
+
+# Runs inside the image: prints {name: manifest subset} for every addon on the addons path.
+MANIFEST_DUMP_SCRIPT = r"""
+import ast, json, os, odoo.addons
+out = {}
+for root in odoo.addons.__path__:
+    if not os.path.isdir(root):
+        continue
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, '__manifest__.py')
+        if name in out or not os.path.isfile(path):
+            continue
+        try:
+            with open(path) as f:
+                manifest = ast.literal_eval(f.read())
+        except Exception:
+            continue
+        if not manifest.get('installable', True):
+            continue
+        out[name] = {
+            'summary': str(manifest.get('summary') or manifest.get('name') or '')[:255],
+            'depends': list(manifest.get('depends') or []),
+            'auto_install': manifest.get('auto_install', False),
+            'application': bool(manifest.get('application', False)),
+        }
+print(json.dumps(out))
+"""
+
+
+def dump_manifests(image):
+    result = subprocess.run(
+        ["docker", "run", "--rm", "--entrypoint", "python3", image, "-c", MANIFEST_DUMP_SCRIPT],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"could not read manifests from {image}")
+    return json.loads(result.stdout)
+
+
+def compute_closures(manifests):
+    """{name: set of transitive dependencies, name included}. Unknown dependencies are kept as leaves."""
+    closures = {}
+
+    for root in manifests:
+        if root in closures:
+            continue
+        # Iterative post-order DFS: deep chains (website_* -> website -> ... -> base) never hit the recursion limit.
+        stack = [(root, iter(manifests[root]["depends"]))]
+        visiting = {root}
+        while stack:
+            name, deps = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                stack.pop()
+                visiting.discard(name)
+                closure = {name}
+                for d in manifests.get(name, {}).get("depends", []):
+                    closure |= closures.get(d, {d})
+                closures[name] = closure
+            elif dep not in closures and dep not in visiting and dep in manifests:
+                visiting.add(dep)
+                stack.append((dep, iter(manifests[dep]["depends"])))
+    return closures
+
+
+@transaction.atomic
+def store_index(odoo_version, manifests):
+    """Replace the index of ``odoo_version``. Returns the number of manifests stored."""
+    closures = compute_closures(manifests)
+    Module.objects.bulk_create([Module(name=name) for name in manifests], ignore_conflicts=True)
+    module_ids = dict(Module.objects.filter(name__in=list(manifests)).values_list("name", "id"))
+
+    now = timezone.now()
+    rows = []
+    for name, manifest in manifests.items():
+        auto_install = manifest["auto_install"]
+        if auto_install is True:
+            auto_install = manifest["depends"]
+        rows.append(
+            ModuleManifest(
+                module_id=module_ids[name],
+                odoo_version=odoo_version,
+                summary=manifest["summary"],
+                depends=manifest["depends"],
+                closure=sorted(closures[name]),
+                auto_install=list(auto_install) if auto_install not in (False, None) else None,
+                application=manifest["application"],
+                indexed_at=now,
+            )
+        )
+    ModuleManifest.objects.filter(odoo_version=odoo_version).delete()
+    ModuleManifest.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def index_stamp(odoo_version):
+    """Time of the last indexing run of ``odoo_version`` (None if never indexed)."""
+    return ModuleManifest.objects.filter(odoo_version=odoo_version).aggregate(stamp=Max("indexed_at"))["stamp"]
+
+
+def get_index(odoo_version, stamp=None):
+    """{name: (closure frozenset, auto-install trigger frozenset or None)} for ``odoo_version``."""
+    stamp = stamp or index_stamp(odoo_version)
+    if stamp is None:
+        return {}
+    key = f"module-index:{odoo_version}:{stamp.timestamp()}"
+    index = cache.get(key)
+    if index is None:
+        index = {
+            name: (frozenset(closure), frozenset(auto_install) if auto_install is not None else None)
+            for name, closure, auto_install in ModuleManifest.objects.filter(odoo_version=odoo_version).values_list(
+                "module__name", "closure", "auto_install"
+            )
+        }
+        cache.set(key, index, timeout=None)
+    return index
+
+
+def expand(index, requested):
+    """The requested modules, their dependencies and what Odoo auto-installs once its triggers are there."""
+    effective = set()
+    for name in requested:
+        effective |= index[name][0] if name in index else {name}
+
+    auto_installable = [(name, entry) for name, entry in index.items() if entry[1] is not None]
+    changed = True
+    while changed:
+        changed = False
+        for name, (closure, trigger) in auto_installable:
+            if name not in effective and trigger <= effective:
+                effective |= closure
+                changed = True
+    return effective
+
+
+def effective_modules_key(plan_id):
+    return f"effective-modules:{plan_id}"
+
+
+def effective_modules(plan):
+    """
+    What installing the plan's allowed modules actually brings in: their
+    dependencies plus the modules Odoo auto-installs once their triggers are there.
+    """
+    stamp = index_stamp(plan.odoo_version)
+    requested = frozenset(plan.allowed_modules or [])
+    # Validated against what it was computed from: another process may have changed the plan.
+    entry_id = (plan.odoo_version, stamp.timestamp() if stamp else None, requested)
+    entry = cache.get(effective_modules_key(plan.pk))
+    if entry is None or entry["id"] != entry_id:
+        index = get_index(plan.odoo_version, stamp)
+        entry = {
+            "id": entry_id,
+            "indexed": bool(index),
+            "effective": frozenset(expand(index, requested)),
+            "unknown": sorted(m for m in requested if m not in index),
+        }
+        cache.set(effective_modules_key(plan.pk), entry, timeout=None)
+
+    return {
+        "plan": plan.name,
+        "odoo_version": plan.odoo_version,
+        "indexed": entry["indexed"],
+        "requested": sorted(requested),
+        "effective": sorted(entry["effective"]),
+        "added": sorted(entry["effective"] - requested),
+        "unknown": entry["unknown"],
+    }
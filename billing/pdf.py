@@ -0,0 +1,118 @@
+"""
+Minimal PDF writer for invoices.
+
+Single A4 page, standard Type1 fonts (Helvetica / Helvetica-Bold, never
+embedded) and WinAnsi text, which is all an invoice needs. Everything that
+does not depend on the invoice (font and page objects, the static part of
+the layout) is built once per process; rendering an invoice only assembles
+its content stream and the cross-reference table.
+"""
+from functools import lru_cache
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+
+
+def _escape(text):
+    data = str(text).encode("cp1252", errors="replace")  # WinAnsiEncoding
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def text(x, y, value, size=10, bold=False):
+    font = b"/F2" if bold else b"/F1"
+    return b"BT %s %d Tf %d %d Td (%s) Tj ET\n" % (font, size, x, y, _escape(value))
+
+
+def right_text(x, y, value, size=10, bold=False):
+    # Helvetica digits are 0.556 em wide: good enough to right-align amounts.
+    width = int(len(str(value)) * size * 0.556)
+    return text(x - width, y, value, size=size, bold=bold)
+
+
+def line(x1, y1, x2, y2, width=0.5):
+    return b"%.1f w %d %d m %d %d l S\n" % (width, x1, y1, x2, y2)
+
+
+@lru_cache(maxsize=None)
+def _static_objects():
+    """Objects shared by every invoice: catalog, pages, page and fonts (content stream is object 6)."""
+    return [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+
+
+@lru_cache(maxsize=None)
+def _static_layout():
+    """Invoice template: rules and column headers."""
+    top = PAGE_HEIGHT - MARGIN
+    right = PAGE_WIDTH - MARGIN
+    return b"".join(
+        [
+            line(MARGIN, top - 150, right, top - 150, width=1),
+            text(MARGIN, top - 170, "Description", bold=True),
+            right_text(right, top - 170, "Montant", bold=True),
+            line(MARGIN, top - 178, right, top - 178),
+            line(MARGIN, 90, right, 90),
+        ]
+    )
+
+
+def build_pdf(content):
+    """Assemble a one-page PDF around ``content`` (a content stream)."""
+    objects = _static_objects() + [b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)]
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def render_invoice(snapshot):
+    """PDF bytes for an invoice snapshot (see billing.invoices.build_snapshot)."""
+    top = PAGE_HEIGHT - MARGIN
+    right = PAGE_WIDTH - MARGIN
+    seller, customer = snapshot["seller"], snapshot["customer"]
+    ops = [_static_layout(), text(MARGIN, top - 10, seller.get("name", ""), size=16, bold=True)]
+
+    y = top - 28
+    for value in [*seller.get("address", "").splitlines(), seller.get("vat", "")]:
+        if value:
+            ops.append(text(MARGIN, y, value, size=9))
+            y -= 12
+
+    ops.append(right_text(right, top - 10, f"Facture {snapshot['number']}", size=14, bold=True))
+    ops.append(right_text(right, top - 28, f"Date : {snapshot['issued_on']}", size=9))
+
+    y = top - 80
+    ops.append(text(330, y, customer.get("company", ""), bold=True))
+    for value in [customer.get("name", ""), customer.get("email", ""), *customer.get("address", "").splitlines()]:
+        if value:
+            y -= 12
+            ops.append(text(330, y, value, size=9))
+
+    y = top - 200
+    for item in snapshot["lines"]:
+        ops.append(text(MARGIN, y, item["description"]))
+        ops.append(right_text(right, y, f"{item['amount']} {snapshot['currency']}"))
+        y -= 16
+
+    y -= 10
+    ops.append(line(330, y + 8, right, y + 8))
+    ops.append(text(330, y - 6, "Total", bold=True))
+    ops.append(right_text(right, y - 6, f"{snapshot['total']} {snapshot['currency']}", bold=True))
+
+    footer = f"Payé le {snapshot['paid_on']} - {snapshot['method']}"
+    if snapshot.get("transaction_id"):
+        footer += f" - réf. {snapshot['transaction_id']}"
+    ops.append(text(MARGIN, 75, footer, size=8))
+    return build_pdf(b"".join(ops))
@@ -0,0 +1,205 @@
+"""
+Revenue rollups.
+
+RevenueRollup holds, per month and plan, counters updated as payments and
+subscriptions change state, so /api/billing/reports/ never scans Payment:
+
+- revenue / payments_count: payments becoming PAID, in the month they are paid;
+- refunds: payments leaving PAID, in the month it happens;
+- outstanding: amount still PENDING, in the month it was invoiced;
+- new / churned subscriptions and mrr_delta: subscriptions entering / leaving
+  ACTIVE. MRR at a month is the running sum of mrr_delta.
+
+``rebuild`` recomputes everything from the Payment and Subscription rows
+(manage.py rebuild_revenue_rollups). Only the last activation of a
+subscription is kept on the row, so a reactivated subscription shows there
+as a single activation.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from billing.models import Payment, Plan, RevenueRollup, Subscription
+
+COUNTERS = (
+    "revenue", "refunds", "payments_count", "outstanding", "new_subscriptions", "churned_subscriptions", "mrr_delta",
+)
+
+
+def month_of(value=None):
+    """First day of the (local) month of a date or datetime, now by default."""
+    value = value or timezone.now()
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def bump(month, plan_id, **deltas):
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    rollup, _ = RevenueRollup.objects.get_or_create(month=month, plan_id=plan_id)
+    RevenueRollup.objects.filter(pk=rollup.pk).update(**{name: F(name) + value for name, value in deltas.items()})
+
+
+def payment_changed(payment, old_status, new_status):
+    plan_id = payment.subscription.plan_id
+    amount = payment.amount or Decimal("0")
+    invoiced = month_of(payment.payment_date)
+    if old_status == "PENDING":
+        bump(invoiced, plan_id, outstanding=-amount)
+    if new_status == "PENDING":
+        bump(invoiced, plan_id, outstanding=amount)
+    if new_status == "PAID":
+        bump(month_of(payment.paid_at), plan_id, revenue=amount, payments_count=1)
+    elif old_status == "PAID":
+        bump(month_of(payment.refunded_at), plan_id, refunds=amount)
+
+
+def payments_created(rows):
+    """Bulk counterpart of payment_changed for new PENDING payments: rows of (plan_id, amount)."""
+    month = month_of()
+    totals = defaultdict(Decimal)
+    for plan_id, amount in rows:
+        totals[plan_id] += amount or 0
+    for plan_id, amount in totals.items():
+        bump(month, plan_id, outstanding=amount)
+
+
+def payment_deleted(payment):
+    """Undo what the payment contributed, so counters match a rebuild."""
+    plan_id = payment.subscription.plan_id
+    amount = payment.amount or Decimal("0")
+    if payment.status == "PENDING":
+        bump(month_of(payment.payment_date), plan_id, outstanding=-amount)
+    if payment.paid_at:
+        bump(month_of(payment.paid_at), plan_id, revenue=-amount, payments_count=-1)
+    if payment.refunded_at and payment.status != "PAID":
+        bump(month_of(payment.refunded_at), plan_id, refunds=-amount)
+
+
+def subscription_activated(subscription):
+    bump(
+        month_of(subscription.activated_at), subscription.plan_id,
+        new_subscriptions=1, mrr_delta=subscription.mrr_amount or 0,
+    )
+
+
+def end_subscriptions(queryset, status):
+    """Move the ACTIVE subscriptions of ``queryset`` to ``status`` and record the churn. Returns the count."""
+    now = timezone.now()
+    with transaction.atomic():
+        pks = list(queryset.filter(status="ACTIVE").select_for_update().values_list("pk", flat=True))
+        if not pks:
+            return 0
+        rows = Subscription.objects.filter(pk__in=pks)
+        totals = list(rows.values("plan_id").annotate(count=Count("id"), mrr=Sum("mrr_amount")))
+        updated = rows.update(status=status, ended_at=now, next_billing_date=None)
+        for row in totals:
+            bump(month_of(now), row["plan_id"], churned_subscriptions=row["count"], mrr_delta=-(row["mrr"] or 0))
+    return updated
+
+
+def _by_month(queryset, date_field, **aggregates):
+    return (
+        queryset.annotate(month=TruncMonth(date_field, output_field=DateField()))
+        .values("month", "plan_id")
+        .annotate(**aggregates)
+    )
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every rollup from the Payment and Subscription rows. Returns the number of rollups."""
+    counters = defaultdict(lambda: defaultdict(Decimal))
+    payments = Payment.objects.annotate(plan_id=F("subscription__plan_id"))
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    for row in _by_month(payments.filter(paid_at__isnull=False), "paid_at", total=Sum("amount"), count=Count("id")):
+        counters[row["month"], row["plan_id"]]["revenue"] += row["total"]
+        counters[row["month"], row["plan_id"]]["payments_count"] += row["count"]
+    for row in _by_month(
+        payments.filter(refunded_at__isnull=False).exclude(status="PAID"), "refunded_at", total=Sum("amount")
+    ):
+        counters[row["month"], row["plan_id"]]["refunds"] += row["total"]
+    for row in _by_month(payments.filter(status="PENDING"), "payment_date", total=Sum("amount")):
+        counters[row["month"], row["plan_id"]]["outstanding"] += row["total"]
+
+    subscriptions = Subscription.objects.filter(mrr_amount__isnull=False)
+    for row in _by_month(
+        subscriptions.filter(activated_at__isnull=False), "activated_at",
+        count=Count("id"), mrr=Coalesce(Sum("mrr_amount"), Decimal("0"), output_field=money),
+    ):
+        counters[row["month"], row["plan_id"]]["new_subscriptions"] += row["count"]
+        counters[row["month"], row["plan_id"]]["mrr_delta"] += row["mrr"]
+    for row in _by_month(
+        subscriptions.filter(ended_at__isnull=False).exclude(status="ACTIVE"), "ended_at",
+        count=Count("id"), mrr=Coalesce(Sum("mrr_amount"), Decimal("0"), output_field=money),
+    ):
+        counters[row["month"], row["plan_id"]]["churned_subscriptions"] += row["count"]
+        counters[row["month"], row["plan_id"]]["mrr_delta"] -= row["mrr"]
+
+    RevenueRollup.objects.all().delete()
+    RevenueRollup.objects.bulk_create(
+        [
+            RevenueRollup(
+                month=month, plan_id=plan_id,
+                **{name: int(values[name]) if name.endswith(("_count", "_subscriptions")) else values[name]
+                   for name in COUNTERS},
+            )
+            for (month, plan_id), values in counters.items()
+        ],
+        batch_size=500,
+    )
+    return len(counters)
+
+
+def report(since=None, until=None):
+    """Monthly MRR/ARR, revenue, churn and outstanding balance, with per-plan figures."""
+    plans = dict(Plan.objects.values_list("id", "name"))
+    by_month = defaultdict(list)
+    for row in RevenueRollup.objects.values("month", "plan_id", *COUNTERS):
+        by_month[row["month"]].append(row)
+
+    result = []
+    mrr = defaultdict(Decimal)  # running sum per plan
+    active = 0
+    for month in sorted(by_month):
+        rows = by_month[month]
+        totals = {name: sum(row[name] for row in rows) for name in COUNTERS}
+        active_at_start = active
+        active += totals["new_subscriptions"] - totals["churned_subscriptions"]
+        net = {}
+        for row in rows:
+            mrr[row["plan_id"]] += row["mrr_delta"]
+            net[row["plan_id"]] = row["revenue"] - row["refunds"]
+
+        if (since and month < since) or (until and month > until):
+            continue
+        total_mrr = sum(mrr.values(), Decimal("0"))
+        result.append(
+            {
+                "month": month.strftime("%Y-%m"),
+                "mrr": total_mrr,
+                "arr": total_mrr * 12,
+                "revenue": totals["revenue"],
+                "refunds": totals["refunds"],
+                "net_revenue": totals["revenue"] - totals["refunds"],
+                "payments": totals["payments_count"],
+                "outstanding": totals["outstanding"],
+                "new_subscriptions": totals["new_subscriptions"],
+                "churned_subscriptions": totals["churned_subscriptions"],
+                "active_subscriptions": active,
+                "churn_rate": round(totals["churned_subscriptions"] / active_at_start, 4) if active_at_start else None,
+                "plans": {
+                    plans.get(plan_id, str(plan_id)): {"net_revenue": net.get(plan_id, Decimal("0")), "mrr": mrr[plan_id]}
+                    for plan_id in sorted(set(net) | {p for p, value in mrr.items() if value})
+                },
+            }
+        )
+    return result
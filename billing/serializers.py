@@ -1,13 +1,20 @@
 from rest_framework import serializers
-from django.db.models import Sum
 
-from billing.models import Plan, Subscription, Payment
+from billing.models import Plan, Subscription, Payment, Module, Invoice
 
 
 class PlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Plan
-        fields = "__all__"
+        # `modules` mirrors allowed_modules, which stays the API field
+        exclude = ["modules"]
+        read_only_fields = ["stripe_product_id", "stripe_price_id", "stripe_price_amount"]
+
+
+class ModuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Module
+        fields = ["id", "name"]
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -21,16 +28,17 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = "__all__"
-        read_only_fields = ["client"]
+        # Maintained by Payment.save / mark_payment_paid and the revenue rollups (billing/rollups.py)
+        read_only_fields = ["client", "paid_total", "mrr_amount", "activated_at", "ended_at"]
 
+    # SubscriptionViewSet annotates both; the fallbacks cover freshly created/updated instances.
     def get_total_paid(self, obj):
-        agg = obj.payments.filter(status="PAID").aggregate(total=Sum("amount"))
-        return agg["total"] or 0
+        return getattr(obj, "total_paid", obj.paid_total)
 
     def get_amount_due(self, obj):
-        price = obj.plan.price or 0
-        total_paid = self.get_total_paid(obj)
-        remaining = price - total_paid
+        if hasattr(obj, "amount_due"):
+            return obj.amount_due
+        remaining = (obj.plan.price or 0) - obj.paid_total
         return remaining if remaining > 0 else 0
 
 
@@ -41,5 +49,22 @@ class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = "__all__"
-        read_only_fields = ["created_at", "payment_date"]
+        # billing_period / paid_at / refunded_at feed the revenue rollups (billing/rollups.py)
+        read_only_fields = ["created_at", "payment_date", "billing_period", "paid_at", "refunded_at"]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if isinstance(self.instance, Payment):
+            # The rollups follow status transitions only: amount and subscription are fixed once created.
+            for name in ("amount", "subscription"):
+                fields[name].read_only = True
+        return fields
+
+
+class InvoiceSerializer(serializers.ModelSerializer):
+    subscription = serializers.IntegerField(source="payment.subscription_id", read_only=True)
+    amount = serializers.DecimalField(source="payment.amount", max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Invoice
+        exclude = ["pdf_path", "error_message"]
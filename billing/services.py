@@ -0,0 +1,95 @@
+"""
+Payment state transitions.
+
+Concurrent confirmations of the same payment (Stripe retries, an admin
+clicking validate_payment, ...) must activate the subscription once. The PAID
+transition is a conditional ``UPDATE ... WHERE status != 'PAID'``: only the
+caller whose UPDATE matched a row goes on. Activation then runs in the same
+transaction, under a lock on the client row (one active subscription per client).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import Client
+from billing import invoices, rollups
+from billing.models import Payment, Subscription
+
+
+def mark_payment_paid(payment, transaction_id=None):
+    """
+    Mark ``payment`` PAID and activate its subscription once it is fully paid.
+    Returns False if the payment was already PAID (nothing done).
+    """
+    with transaction.atomic():
+        old_status = Payment.objects.select_for_update().filter(pk=payment.pk).values_list("status", flat=True).first()
+        now = timezone.now()
+        updated = (
+            Payment.objects.filter(pk=payment.pk)
+            .exclude(status="PAID")
+            .update(status="PAID", paid_at=now, transaction_id=transaction_id or F("transaction_id"))
+        )
+        if not updated:
+            return False
+        payment.status = payment._loaded_status = "PAID"
+        payment.paid_at = now
+        if transaction_id:
+            payment.transaction_id = transaction_id
+        rollups.payment_changed(payment, old_status, "PAID")
+        invoices.issue_invoice(payment)
+
+        subscription = payment.subscription
+        # Lock order: client, then subscription. Serializes activations of the client's subscriptions.
+        Client.objects.select_for_update().filter(pk=subscription.client_id).first()
+        subscription = Subscription.objects.select_for_update().select_related("plan").get(pk=subscription.pk)
+        payment.subscription = subscription
+        subscription.refresh_paid_total()
+
+        was_active = subscription.status == "ACTIVE"
+        if payment.billing_period:
+            # Renewal (run_billing_cycle): extend by one period, from the renewed period or from today if lapsed.
+            extend_period(subscription, payment.billing_period if was_active else timezone.localdate())
+
+        # Only activate if the total paid covers at least the plan price
+        if was_active or subscription.paid_total < (subscription.plan.price or 0):
+            return True
+
+        rollups.end_subscriptions(
+            Subscription.objects.filter(client_id=subscription.client_id).exclude(pk=subscription.pk), "SUSPENDED"
+        )
+        subscription.status = "ACTIVE"
+        subscription.activated_at = now
+        subscription.ended_at = None
+        subscription.mrr_amount = subscription.plan.price or 0  # Plan.price is monthly
+        if not subscription.end_date:
+            extend_period(subscription, timezone.localdate())
+        # save() (not update()) so post_save receivers (module policy push) run
+        subscription.save(
+            update_fields=["status", "activated_at", "ended_at", "mrr_amount", "end_date", "next_billing_date"]
+        )
+        rollups.subscription_activated(subscription)
+    return True
+
+
+def mark_payment_failed(payment):
+    """PENDING -> FAILED; a payment another event already settled is left alone. Returns True if changed."""
+    with transaction.atomic():
+        if not Payment.objects.filter(pk=payment.pk, status="PENDING").update(status="FAILED"):
+            return False
+        rollups.payment_changed(payment, "PENDING", "FAILED")
+        payment.status = payment._loaded_status = "FAILED"
+    return True
+
+
+def extend_period(subscription, start):
+    """Move end_date to the end of the period starting on ``start`` and schedule the next renewal."""
+    end = subscription.period_end(start)
+    subscription.end_date = max(end, subscription.end_date) if subscription.end_date else end
+    lead = timedelta(days=getattr(settings, "BILLING_RENEWAL_LEAD_DAYS", 7))
+    subscription.next_billing_date = subscription.end_date - lead if subscription.auto_renew else None
+    Subscription.objects.filter(pk=subscription.pk).update(
+        end_date=subscription.end_date, next_billing_date=subscription.next_billing_date
+    )
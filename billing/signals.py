@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from billing import catalog
+from billing.models import Plan
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidate_plan_catalog(sender, **kwargs):
+    # Now and again after commit: a version hashed from the pre-commit rows in between is dropped too.
+    catalog.invalidate()
+    transaction.on_commit(catalog.invalidate)
@@ -0,0 +1,178 @@
+"""
+Asynchronous processing of the Stripe webhook inbox.
+
+The webhook only verifies the signature and stores the event (StripeEvent,
+unique on the Stripe event id, so retried deliveries are dropped). Events are
+then processed in Stripe creation order by ``process_due_events``: right after
+reception in a background thread, and periodically by
+``manage.py process_stripe_events`` for retries.
+
+A failing event is retried with exponential backoff and dead-lettered after
+STRIPE_EVENT_MAX_ATTEMPTS; ``manage.py replay_stripe_events`` re-queues it.
+Handlers must be idempotent: Stripe itself delivers at least once.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from billing.models import Payment, StripeEvent
+from billing.services import mark_payment_failed, mark_payment_paid
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# A worker that died mid-event leaves it PROCESSING: reclaim it after this delay.
+STALE_LOCK = timedelta(minutes=10)
+
+
+def handles(*event_types):
+    def register(fn):
+        for event_type in event_types:
+            HANDLERS[event_type] = fn
+        return fn
+    return register
+
+
+def record_event(event):
+    """Store a verified event. Returns (StripeEvent, created); created is False for a redelivery."""
+    return StripeEvent.objects.get_or_create(
+        event_id=event["id"],
+        defaults={
+            "type": event.get("type", ""),
+            "payload": event,
+            "stripe_created": event.get("created") or 0,
+        },
+    )
+
+
+def _payment_from_metadata(obj):
+    payment_id = (obj.get("metadata") or {}).get("payment_id")
+    if not payment_id:
+        return None
+    try:
+        return Payment.objects.select_related("subscription").get(pk=int(payment_id))
+    except (Payment.DoesNotExist, ValueError):
+        logger.warning("Payment id %s not found", payment_id)
+        return None
+
+
+@handles("checkout.session.completed", "checkout.session.async_payment_succeeded")
+def checkout_paid(obj):
+    # Delayed payment methods complete the session unpaid; async_payment_succeeded follows.
+    if obj.get("payment_status", "paid") == "unpaid":
+        return
+    payment = _payment_from_metadata(obj)
+    if payment:
+        mark_payment_paid(payment, transaction_id=obj.get("id") or obj.get("payment_intent"))
+
+
+@handles("checkout.session.async_payment_failed", "checkout.session.expired", "payment_intent.payment_failed")
+def payment_failed(obj):
+    payment = _payment_from_metadata(obj)
+    if payment:
+        # Never downgrades a payment another event already confirmed.
+        mark_payment_failed(payment)
+
+
+@handles("charge.refunded")
+def charge_refunded(obj):
+    if not obj.get("refunded"):
+        return  # partial refund: kept PAID
+    payment = _payment_from_metadata(obj)
+    if payment and payment.status == "PAID":
+        payment.status = "REFUNDED"
+        payment.save()
+
+
+def process_event(stripe_event):
+    handler = HANDLERS.get(stripe_event.type)
+    if handler is None:
+        stripe_event.status = "IGNORED"
+    else:
+        with transaction.atomic():
+            handler(stripe_event.payload.get("data", {}).get("object", {}))
+        stripe_event.status = "PROCESSED"
+    stripe_event.processed_at = timezone.now()
+
+
+def _claim(stripe_event):
+    """Take the event for this worker; False if another worker got it first."""
+    now = timezone.now()
+    return bool(
+        StripeEvent.objects.filter(pk=stripe_event.pk)
+        .filter(Q(status__in=["RECEIVED", "FAILED"]) | Q(status="PROCESSING", locked_at__lt=now - STALE_LOCK))
+        .update(status="PROCESSING", locked_at=now)
+    )
+
+
+def process_due_events(limit=None):
+    """Process due events in Stripe creation order. Returns {status: count}."""
+    max_attempts = getattr(settings, "STRIPE_EVENT_MAX_ATTEMPTS", 8)
+    retry_base = getattr(settings, "STRIPE_EVENT_RETRY_BASE_SECONDS", 30)
+    now = timezone.now()
+    due = StripeEvent.objects.filter(
+        Q(status__in=["RECEIVED", "FAILED"], next_attempt_at__lte=now)
+        | Q(status="PROCESSING", locked_at__lt=now - STALE_LOCK)
+    ).order_by("stripe_created", "id")
+    if limit:
+        due = due[:limit]
+
+    counts = {}
+    for stripe_event in due:
+        if not _claim(stripe_event):
+            continue
+        stripe_event.attempts += 1
+        try:
+            process_event(stripe_event)
+            stripe_event.last_error = ""
+        except Exception as e:
+            logger.exception("Stripe event %s failed", stripe_event.event_id)
+            stripe_event.last_error = str(e)
+            if stripe_event.attempts >= max_attempts:
+                stripe_event.status = "DEAD"
+            else:
+                stripe_event.status = "FAILED"
+                stripe_event.next_attempt_at = timezone.now() + timedelta(
+                    seconds=retry_base * 2 ** (stripe_event.attempts - 1)
+                )
+        stripe_event.locked_at = None
+        stripe_event.save(
+            update_fields=["status", "attempts", "last_error", "next_attempt_at", "locked_at", "processed_at"]
+        )
+        counts[stripe_event.status] = counts.get(stripe_event.status, 0) + 1
+    return counts
+
+
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def process_in_background():
+    """Wake the in-process worker (a single one per process keeps events in order)."""
+    _wake.set()
+    if not _worker_lock.acquire(blocking=False):
+        return  # the running worker will loop once more
+
+    def run():
+        try:
+            while True:
+                try:
+                    # Cleared before claiming: an event stored during the pass makes it loop once more.
+                    while _wake.is_set():
+                        _wake.clear()
+                        process_due_events()
+                finally:
+                    _worker_lock.release()
+                # A wake-up after the last check found the lock still held and returned: take over.
+                if not (_wake.is_set() and _worker_lock.acquire(blocking=False)):
+                    return
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,138 @@
+"""
+Stripe API access.
+
+One StripeClient per process, on a pooled requests session with explicit
+timeouts, instead of configuring the global ``stripe.api_key`` per request.
+STRIPE_API_BASE points it at a local stand-in (e.g. stripe-mock) for tests
+and load runs.
+
+Each Plan is mirrored as a Stripe Product with one active Price; the ids are
+stored on the Plan so checkout only references them.
+"""
+import threading
+from decimal import Decimal
+
+import requests
+import stripe
+from django.conf import settings
+
+from billing import catalog
+from billing.models import Plan
+
+_client = None
+_client_config = None
+_client_lock = threading.Lock()
+
+
+def _config():
+    return (
+        getattr(settings, "STRIPE_SECRET_KEY", ""),
+        getattr(settings, "STRIPE_API_BASE", ""),
+        getattr(settings, "STRIPE_TIMEOUT", 10),
+        getattr(settings, "STRIPE_MAX_NETWORK_RETRIES", 2),
+    )
+
+
+def get_client():
+    """Shared StripeClient, rebuilt only when the settings change."""
+    global _client, _client_config
+    config = _config()
+    with _client_lock:
+        if _client is None or _client_config != config:
+            api_key, api_base, timeout, retries = config
+            _client = stripe.StripeClient(
+                api_key,
+                http_client=stripe.RequestsClient(session=requests.Session(), timeout=timeout),
+                base_addresses={"api": api_base} if api_base else None,
+                max_network_retries=retries,
+            )
+            _client_config = config
+        return _client
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal("1")))
+
+
+def currency():
+    return getattr(settings, "STRIPE_CURRENCY", "eur")
+
+
+def sync_plan(plan, client=None):
+    """Create/update the Product and Price of ``plan``. Returns the list of changes made."""
+    client = client or get_client()
+    changes = []
+    product_params = {"name": plan.name, "active": plan.is_active, "metadata": {"plan_id": str(plan.pk)}}
+
+    if not plan.stripe_product_id:
+        product = client.v1.products.create(product_params, {"idempotency_key": f"plan-{plan.pk}-product"})
+        plan.stripe_product_id = product.id
+        changes.append("product_created")
+    else:
+        client.v1.products.update(plan.stripe_product_id, product_params)
+        changes.append("product_updated")
+
+    if plan.stripe_price_id and plan.stripe_price_amount == plan.price:
+        return changes
+
+    old_price_id = plan.stripe_price_id
+    price = client.v1.prices.create(
+        {
+            "product": plan.stripe_product_id,
+            "currency": currency(),
+            "unit_amount": to_cents(plan.price),
+            "metadata": {"plan_id": str(plan.pk)},
+        },
+        # The price being replaced is part of the key: a retried sync replays its own create, while
+        # going back to an earlier amount creates a new Price instead of replaying the archived one.
+        {"idempotency_key": f"plan-{plan.pk}-price-{to_cents(plan.price)}-{currency()}-from-{old_price_id or 'none'}"},
+    )
+    plan.stripe_price_id = price.id
+    plan.stripe_price_amount = plan.price
+    changes.append("price_created")
+    if old_price_id and old_price_id != price.id:
+        client.v1.prices.update(old_price_id, {"active": False})
+        changes.append("price_archived")
+
+    # update(), not save(): no module sync, no rollout for a catalog id change
+    Plan.objects.filter(pk=plan.pk).update(
+        stripe_product_id=plan.stripe_product_id,
+        stripe_price_id=plan.stripe_price_id,
+        stripe_price_amount=plan.stripe_price_amount,
+    )
+    catalog.invalidate()  # update() sends no post_save
+    return changes
+
+
+def create_checkout_session(subscription, payment, success_url, cancel_url):
+    """One API call: the synced Price when paying the plan price, inline price_data otherwise."""
+    plan = subscription.plan
+    if plan.stripe_price_id and plan.stripe_price_amount == plan.price == payment.amount:
+        line_item = {"price": plan.stripe_price_id, "quantity": 1}
+    else:
+        # Partial payments, or a plan not synced yet.
+        line_item = {
+            "price_data": {
+                "currency": currency(),
+                "product_data": {
+                    "name": f"Abonnement {plan.name}",
+                    "description": f"Paiement pour le plan {plan.name}",
+                },
+                "unit_amount": to_cents(payment.amount),
+            },
+            "quantity": 1,
+        }
+    metadata = {"payment_id": str(payment.id), "subscription_id": str(subscription.id)}
+    return get_client().v1.checkout.sessions.create(
+        {
+            "payment_method_types": ["card"],
+            "line_items": [line_item],
+            "mode": "payment",
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+            "metadata": metadata,
+            # Copied onto the PaymentIntent and its charges: routes payment_failed / refund events
+            "payment_intent_data": {"metadata": metadata},
+        },
+        {"idempotency_key": f"checkout-payment-{payment.id}"},
+    )
@@ -0,0 +1,241 @@
+"""
+Local Stripe stand-in for development and load runs.
+
+Serves the small part of the Stripe API the backend calls (Checkout Sessions,
+Products, Prices), honouring Idempotency-Key, and delivers webhook events
+signed with the real ``Stripe-Signature`` scheme (HMAC-SHA256 over
+"<timestamp>.<payload>" with the endpoint secret), so StripeWebhookView
+verifies them unchanged.
+
+    manage.py stripe_standin --port 12111 --webhook-url http://localhost:8000/api/billing/stripe-webhook/
+    STRIPE_API_BASE=http://localhost:12111 STRIPE_SECRET_KEY=sk_test_standin ...
+
+POST /_standin/checkout/sessions/<id>/complete marks a session paid and
+delivers its checkout.session.completed event. manage.py
+loadtest_stripe_webhooks drives it for throughput runs.
+"""
+import hashlib
+import hmac
+import json
+import re
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+OBJECT_PREFIXES = {"products": "prod", "prices": "price", "checkout/sessions": "cs_test"}
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Stripe-Signature header value for ``payload`` (bytes or str)."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def decode_form(body):
+    """Stripe form encoding (``a[b][0][c]=v``) to nested dicts/lists."""
+    root = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = re.findall(r"[^\[\]]+", key)
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return _lists(root)
+
+
+def _lists(node):
+    if not isinstance(node, dict):
+        return node
+    node = {key: _lists(value) for key, value in node.items()}
+    if node and all(key.isdigit() for key in node):
+        return [node[key] for key in sorted(node, key=int)]
+    return node
+
+
+def new_id(prefix):
+    return f"{prefix}_{secrets.token_hex(12)}"
+
+
+def checkout_completed_event(session, event_id=None, created=None):
+    """checkout.session.completed event for a paid ``session``."""
+    return {
+        "id": event_id or new_id("evt"),
+        "object": "event",
+        "type": "checkout.session.completed",
+        "created": int(created if created is not None else time.time()),
+        "livemode": False,
+        "data": {"object": {**session, "status": "complete", "payment_status": "paid"}},
+    }
+
+
+class StripeStandIn:
+    def __init__(self, host="127.0.0.1", port=0, webhook_url=None, webhook_secret=None):
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.objects = {kind: {} for kind in OBJECT_PREFIXES}
+        self.idempotent = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.standin = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- API ---
+
+    def create(self, kind, params):
+        obj_id = new_id(OBJECT_PREFIXES[kind])
+        obj = {"id": obj_id, "object": kind.split("/")[-1].rstrip("s"), "created": int(time.time()), **params}
+        if kind == "products":
+            obj.setdefault("active", True)
+        elif kind == "prices":
+            obj.setdefault("active", True)
+            obj["unit_amount"] = int(obj.get("unit_amount", 0))
+        elif kind == "checkout/sessions":
+            obj.update(self._session_fields(obj_id, params))
+        self.objects[kind][obj_id] = obj
+        return obj
+
+    def _session_fields(self, session_id, params):
+        total = 0
+        for item in params.get("line_items") or []:
+            quantity = int(item.get("quantity", 1))
+            if "price" in item:
+                price = self.objects["prices"].get(item["price"]) or {}
+                total += int(price.get("unit_amount", 0)) * quantity
+            else:
+                total += int((item.get("price_data") or {}).get("unit_amount", 0)) * quantity
+        return {
+            "object": "checkout.session",
+            "url": f"{self.url}/pay/{session_id}",
+            "status": "open",
+            "payment_status": "unpaid",
+            "amount_total": total,
+            "currency": "eur",
+            "metadata": params.get("metadata") or {},
+            "payment_intent": new_id("pi"),
+        }
+
+    def update(self, kind, obj_id, params):
+        obj = self.objects[kind].get(obj_id)
+        if obj is not None:
+            obj.update(params)
+        return obj
+
+    # --- Webhooks ---
+
+    def complete(self, session_id):
+        """Mark a session paid and deliver checkout.session.completed. Returns (event, HTTP status)."""
+        session = self.objects["checkout/sessions"].get(session_id)
+        if session is None:
+            return None, 404
+        session.update({"status": "complete", "payment_status": "paid"})
+        event = checkout_completed_event(session)
+        return event, self.deliver(event)
+
+    def deliver(self, event, url=None, secret=None, timestamp=None):
+        """POST ``event`` signed like Stripe does. Returns the HTTP status (0 on connection error)."""
+        payload = json.dumps(event).encode()
+        request = urllib.request.Request(
+            url or self.webhook_url,
+            data=payload,
+            headers={
+                "Content-Type": "application/json",
+                "Stripe-Signature": sign_payload(payload, secret or self.webhook_secret, timestamp),
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            return 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        for kind in OBJECT_PREFIXES:
+            if path == f"/v1/{kind}":
+                return kind, None
+            if path.startswith(f"/v1/{kind}/"):
+                return kind, path[len(f"/v1/{kind}/"):]
+        return None, None
+
+    def do_GET(self):
+        standin = self.server.standin
+        kind, obj_id = self._route()
+        obj = standin.objects[kind].get(obj_id) if kind and obj_id else None
+        if obj is None:
+            return self._reply(404, {"error": {"type": "invalid_request_error", "message": "No such object"}})
+        self._reply(200, obj)
+
+    def do_POST(self):
+        standin = self.server.standin
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else ""
+        with standin.lock:
+            standin.requests += 1
+
+        match = re.fullmatch(r"/_standin/checkout/sessions/([\w]+)/complete", self.path.rstrip("/"))
+        if match:
+            event, delivered = standin.complete(match.group(1))
+            if event is None:
+                return self._reply(404, {"error": {"message": "No such checkout session"}})
+            return self._reply(200, {"event": event["id"], "delivery_status": delivered})
+
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._reply(401, {"error": {"type": "invalid_request_error", "message": "No API key provided"}})
+        kind, obj_id = self._route()
+        if kind is None:
+            return self._reply(404, {"error": {"type": "invalid_request_error", "message": "Unrecognized request URL"}})
+
+        params = decode_form(body)
+        key = self.headers.get("Idempotency-Key")
+        with standin.lock:
+            if key and key in standin.idempotent:
+                return self._reply(200, standin.idempotent[key])
+            obj = standin.update(kind, obj_id, params) if obj_id else standin.create(kind, params)
+            if obj is None:
+                return self._reply(404, {"error": {"type": "invalid_request_error", "message": "No such object"}})
+            if key:
+                standin.idempotent[key] = obj
+        self._reply(200, obj)
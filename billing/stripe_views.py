@@ -18,7 +18,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from accounts.auth import client_id_for
 from billing.models import Plan, Subscription, Payment
+from billing import stripe_events, stripe_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -64,17 +66,17 @@ class CreateStripeCheckoutSessionView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        user = request.user
-        if not hasattr(user, "client_profile"):
+        client_id = client_id_for(request.user)
+        if client_id is None:
             return Response(
                 {"detail": "User has no client profile."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
         try:
-            subscription = Subscription.objects.get(
+            subscription = Subscription.objects.select_related("plan").get(
                 pk=subscription_id,
-                client=user.client_profile,
+                client_id=client_id,
                 status="PENDING",
             )
         except Subscription.DoesNotExist:
@@ -95,33 +97,8 @@ class CreateStripeCheckoutSessionView(APIView):
         success_url = f"{frontend_base}/dashboard/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
         cancel_url = f"{frontend_base}/dashboard/payment?subscription={subscription_id}"
 
-        stripe = get_stripe()
-        stripe.api_key = stripe_secret
-
         try:
-            session = stripe.checkout.Session.create(
-                payment_method_types=["card"],
-                line_items=[
-                    {
-                        "price_data": {
-                            "currency": "eur",
-                            "product_data": {
-                                "name": f"Abonnement {subscription.plan.name}",
-                                "description": f"Paiement pour le plan {subscription.plan.name}",
-                            },
-                            "unit_amount": int(amount_decimal * 100),  # cents
-                        },
-                        "quantity": 1,
-                    }
-                ],
-                mode="payment",
-                success_url=success_url,
-                cancel_url=cancel_url,
-                metadata={
-                    "payment_id": str(payment.id),
-                    "subscription_id": str(subscription.id),
-                },
-            )
+            session = stripe_gateway.create_checkout_session(subscription, payment, success_url, cancel_url)
         except Exception as e:
             logger.exception("Stripe Checkout Session create failed: %s", e)
             payment.delete()
@@ -136,7 +113,7 @@ class CreateStripeCheckoutSessionView(APIView):
 @method_decorator(csrf_exempt, name="dispatch")
 @method_decorator(require_POST, name="dispatch")
 class StripeWebhookView(View):
-    """Handle Stripe webhooks (checkout.session.completed) to mark payment as PAID."""
+    """Verify Stripe webhooks and queue them in the StripeEvent inbox; 200 as soon as stored."""
 
     def post(self, request):
         payload = request.body
@@ -145,39 +122,23 @@ class StripeWebhookView(View):
 
         if not webhook_secret:
             logger.warning("STRIPE_WEBHOOK_SECRET not set; skipping signature verification")
-            # In dev you may not have a webhook secret; still try to process
-            try:
-                event = json.loads(payload)
-            except json.JSONDecodeError:
-                return HttpResponse(status=400)
         else:
             stripe = get_stripe()
-            stripe.api_key = getattr(settings, "STRIPE_SECRET_KEY")
             try:
-                event = stripe.Webhook.construct_event(
-                    payload, sig_header, webhook_secret
-                )
-            except ValueError:
-                return HttpResponse(status=400)
+                stripe.WebhookSignature.verify_header(payload, sig_header, webhook_secret, tolerance=300)
             except Exception as e:
                 logger.warning("Stripe webhook signature verification failed: %s", e)
                 return HttpResponse(status=400)
 
-        if event.get("type") == "checkout.session.completed":
-            session = event.get("data", {}).get("object", {})
-            payment_id = session.get("metadata", {}).get("payment_id")
-            if not payment_id:
-                logger.warning("checkout.session.completed missing metadata.payment_id")
-                return HttpResponse(status=200)
-
-            try:
-                payment = Payment.objects.get(pk=int(payment_id))
-            except (Payment.DoesNotExist, ValueError):
-                logger.warning("Payment id %s not found", payment_id)
-                return HttpResponse(status=200)
-
-            payment.status = "PAID"
-            payment.transaction_id = session.get("id") or session.get("payment_intent")
-            payment.save()  # Payment.save() will activate subscription
-
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            return HttpResponse(status=400)
+        if not event.get("id"):
+            return HttpResponse(status=400)
+
+        # Store and acknowledge: processing happens out of the request (billing/stripe_events.py)
+        _, created = stripe_events.record_event(event)
+        if created:
+            stripe_events.process_in_background()
         return HttpResponse(status=200)
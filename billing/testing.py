@@ -0,0 +1,24 @@
+"""Model factories shared by the billing and instances tests."""
+from django.contrib.auth.models import User
+
+from accounts.models import Client
+from billing.models import Plan, Subscription
+
+
+def make_admin(username="admin"):
+    return User.objects.create_user(username, f"{username}@example.com", "pw", is_staff=True)
+
+
+def make_client(username="owner"):
+    """A user and its Client profile (``client.user`` authenticates as the tenant)."""
+    user = User.objects.create_user(username, f"{username}@example.com", "pw")
+    client, _ = Client.objects.get_or_create(user=user, defaults={"company_name": "ACME"})
+    return client
+
+
+def make_plan(name="P", price=10, **fields):
+    return Plan.objects.create(name=name, price=price, **fields)
+
+
+def make_subscription(client=None, plan=None, **fields):
+    return Subscription.objects.create(client=client or make_client(), plan=plan or make_plan(), **fields)
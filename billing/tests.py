@@ -0,0 +1,206 @@
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from billing import catalog
+from billing.models import Invoice, Payment, RevenueRollup, Subscription
+from billing.testing import make_admin, make_client, make_plan, make_subscription
+
+
+class SubscriptionListQueryCountTest(TestCase):
+    """The subscription list is served by one query whatever the number of rows."""
+
+    SUBSCRIPTIONS = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+        client = make_client()
+        plans = [make_plan(f"Plan {i}", price=10 * (i + 1)) for i in range(3)]
+        # EXPIRED: a client can have any number of them (unique ACTIVE / PENDING only)
+        Subscription.objects.bulk_create(
+            [
+                Subscription(client=client, plan=plans[i % 3], status="EXPIRED", paid_total=i % 40)
+                for i in range(cls.SUBSCRIPTIONS)
+            ],
+            batch_size=1000,
+        )
+
+    def test_list_is_a_single_query(self):
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = api.get("/api/subscriptions/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), self.SUBSCRIPTIONS)
+        row = response.data[0]
+        self.assertEqual(row["amount_due"], max(Decimal(row["plan_price"]) - row["total_paid"], 0))
+
+    def test_paid_total_is_read_only(self):
+        subscription = Subscription.objects.first()
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        response = api.patch(f"/api/subscriptions/{subscription.pk}/", {"paid_total": "9999.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        subscription.refresh_from_db()
+        self.assertNotEqual(subscription.paid_total, 9999)
+
+
+class RollupFieldsReadOnlyTest(TestCase):
+    def test_payment_rollup_fields_are_ignored(self):
+        subscription = make_subscription()
+        api = APIClient()
+        api.force_authenticate(subscription.client.user)
+        response = api.post(
+            "/api/payments/",
+            {"subscription": subscription.pk, "amount": "10", "billing_period": "2020-01-01", "paid_at": "2020-01-01T00:00:00Z"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertIsNone(response.data["billing_period"])
+        self.assertIsNone(response.data["paid_at"])
+        payment = response.data["id"]
+        other = make_subscription(subscription.client, subscription.plan, status="EXPIRED")
+        response = api.patch(f"/api/payments/{payment}/", {"amount": "1", "subscription": other.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["amount"], response.data["subscription"]), ("10.00", subscription.pk))
+        response = api.patch(f"/api/subscriptions/{subscription.pk}/", {"mrr_amount": "500"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        subscription.refresh_from_db()
+        self.assertIsNone(subscription.mrr_amount)
+
+
+class RenewalInvoicingTest(TestCase):
+    def test_outstanding_counts_inserted_renewals_once(self):
+        from billing import cycle
+
+        today = date(2026, 3, 10)
+        subscription = make_subscription(status="ACTIVE", end_date=date(2026, 3, 15), next_billing_date=today)
+        self.assertEqual(cycle.invoice_renewals(today), 1)
+        # Re-run (e.g. next_billing_date set again by hand): the period is already invoiced.
+        Subscription.objects.filter(pk=subscription.pk).update(next_billing_date=today)
+        cycle.invoice_renewals(today)
+        self.assertEqual(Payment.objects.filter(subscription=subscription).count(), 1)
+        self.assertEqual(RevenueRollup.objects.get(plan=subscription.plan).outstanding, Decimal("10"))
+
+
+class PaymentConfirmationTest(TestCase):
+    def test_stale_copies_settle_the_payment_once(self):
+        from billing import services
+
+        subscription = make_subscription(plan=make_plan(price=30))
+        pk = Payment.objects.create(subscription=subscription, amount=30).pk
+        # Both loaded while PENDING, as by two concurrent requests: only the conditional UPDATE decides.
+        first, second = Payment.objects.get(pk=pk), Payment.objects.get(pk=pk)
+
+        self.assertTrue(services.mark_payment_paid(first))
+        self.assertFalse(services.mark_payment_paid(second))
+        subscription.refresh_from_db()
+        self.assertEqual(Invoice.objects.filter(payment_id=pk).count(), 1)
+        self.assertEqual(subscription.paid_total, Decimal("30"))
+        self.assertEqual(RevenueRollup.objects.get(plan=subscription.plan).payments_count, 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "needs row locks (select_for_update is a no-op on SQLite)")
+class ConcurrentPaymentConfirmationTest(TransactionTestCase):
+    """Concurrent validate_payment calls on one payment settle it exactly once."""
+
+    THREADS = 8
+
+    def test_concurrent_validate_payment(self):
+        admin = make_admin()
+        subscription = make_subscription(plan=make_plan(price=30))
+        payment = Payment.objects.create(subscription=subscription, amount=30)
+
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def confirm():
+            # The test client's exception capture is process-wide: report 500s instead.
+            api = APIClient(raise_request_exception=False)
+            api.force_authenticate(admin)
+            try:
+                barrier.wait()
+                response = api.post(f"/api/payments/{payment.pk}/validate_payment/")
+                results.append((response.status_code, getattr(response, "data", None) or {}))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=confirm) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(code == 200 for code, _ in results), results)
+        self.assertEqual([data.get("status") for _, data in results].count("Payment validated"), 1, results)
+        payment.refresh_from_db()
+        subscription.refresh_from_db()
+        self.assertEqual(payment.status, "PAID")
+        self.assertEqual(Invoice.objects.filter(payment=payment).count(), 1)
+        self.assertEqual(subscription.paid_total, Decimal("30"))
+        self.assertEqual(subscription.status, "ACTIVE")
+
+
+class InvoicedPaymentDeletionTest(TestCase):
+    def test_invoiced_payments_block_deletion(self):
+        subscription = make_subscription()
+        invoiced = Payment.objects.create(subscription=subscription, amount=10, status="PAID")
+        pending = Payment.objects.create(subscription=subscription, amount=5)
+        api = APIClient()
+        api.force_authenticate(make_admin())
+
+        response = api.delete(f"/api/payments/{invoiced.pk}/")
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Payment.objects.filter(pk=invoiced.pk).exists())
+        self.assertEqual(api.delete(f"/api/payments/{pending.pk}/").status_code, 204)
+
+        self.assertEqual(api.delete(f"/api/subscriptions/{subscription.pk}/").status_code, 409)
+        self.assertEqual(api.delete(f"/api/clients/{subscription.client_id}/").status_code, 409)
+        self.assertTrue(Subscription.objects.filter(pk=subscription.pk).exists())
+
+
+class PlanChangeTest(TestCase):
+    def test_active_subscription_is_kept_until_the_new_one_is_paid(self):
+        from billing import services
+
+        current = make_subscription(status="ACTIVE")
+        bigger = make_plan("L", price=20)
+        api = APIClient()
+        api.force_authenticate(current.client.user)
+
+        response = api.post("/api/subscriptions/", {"plan": bigger.pk}, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        current.refresh_from_db()
+        self.assertEqual(current.status, "ACTIVE")
+
+        new = Subscription.objects.get(pk=response.data["id"])
+        services.mark_payment_paid(Payment.objects.create(subscription=new, amount=20))
+        current.refresh_from_db()
+        new.refresh_from_db()
+        self.assertEqual((current.status, new.status), ("SUSPENDED", "ACTIVE"))
+
+
+class PlanCatalogETagTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plan = make_plan()
+        self.api = APIClient()
+
+    def test_etag_only_changes_with_the_plans(self):
+        etag = self.api.get("/api/plans/")["ETag"]
+        cache.delete(catalog.VERSION_KEY)  # PLAN_CATALOG_TTL elapsed
+        response = self.api.get("/api/plans/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.plan.price = 12
+        self.plan.save()
+        response = self.api.get("/api/plans/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
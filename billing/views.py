@@ -1,51 +1,173 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, DecimalField, F, Q, Value
+from django.db.models.functions import Greatest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.dateparse import parse_date
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import status
 
-from billing.models import Plan, Subscription, Payment
-from billing.serializers import PlanSerializer, SubscriptionSerializer, PaymentSerializer
+from accounts.auth import client_id_for
+from billing import catalog, invoices, modules, rollups, services
+from billing.mixins import ProtectedDestroyMixin
+from billing.models import Plan, Subscription, Payment, Module, PlanModule, Invoice
+from billing.serializers import (
+    PlanSerializer, SubscriptionSerializer, PaymentSerializer, ModuleSerializer, InvoiceSerializer
+)
 
 
 class PlanViewSet(viewsets.ModelViewSet):
     queryset = Plan.objects.all()
     serializer_class = PlanSerializer
+    rollout = None
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
+    # list / retrieve back the public pricing page: served from billing/catalog.py
+    def _catalog_response(self, request, etag, modified, get_data):
+        """304 when the client's validators still match, else the cached representation."""
+        response = get_conditional_response(request, etag=etag, last_modified=modified)
+        if response is None:
+            response = Response(get_data())
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modified)
+        patch_cache_control(response, public=True, max_age=getattr(settings, "PLAN_CATALOG_MAX_AGE", 60))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        version = catalog.current_version()
+        return self._catalog_response(
+            request,
+            quote_etag(version["token"]),
+            int(version["modified"].timestamp()),
+            lambda: list(catalog.get_catalog(version).values()),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get(self.lookup_field, ""))
+        version = catalog.current_version()
+        data = catalog.get_catalog(version).get(int(pk)) if pk.isdigit() else None
+        if data is None:
+            raise Http404
+        return self._catalog_response(
+            request, quote_etag(f"{version['token']}-{pk}"), int(version["modified"].timestamp()), lambda: data
+        )
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        if self.rollout is not None:
+            response.data["rollout"] = self.rollout.pk
+        return response
+
+    def perform_update(self, serializer):
+        from instances import rollouts  # local import: instances depends on billing
+
+        before = {name: getattr(serializer.instance, name) for name in rollouts.ROLLOUT_FIELDS}
+        plan = serializer.save()
+        # Propagate to the running tenants in the background, canary first (see instances/rollouts.py)
+        changes = rollouts.changed_fields(before, plan)
+        self.rollout = rollouts.start_rollout(plan, self.request.user, changes) if changes else None
+
+    @action(detail=True, methods=["get"], url_path="effective-modules")
+    def effective_modules(self, request, pk=None):
+        """Allowed modules expanded with their dependencies and auto-installed modules."""
+        return Response(modules.effective_modules(self.get_object()))
+
+    @action(detail=True, methods=["get"])
+    def diff(self, request, pk=None):
+        """Modules only in this plan / only in ?with=<plan id>, in one grouped query."""
+        plan = self.get_object()
+        other_id = request.query_params.get("with")
+        if not other_id or not other_id.isdigit() or not Plan.objects.filter(pk=other_id).exists():
+            return Response({"error": "?with=<plan id> is required"}, status=status.HTTP_400_BAD_REQUEST)
+        other_id = int(other_id)
+
+        rows = (
+            PlanModule.objects.filter(plan_id__in=[plan.pk, other_id])
+            .values("module__name")
+            .annotate(
+                in_plan=Count("id", filter=Q(plan_id=plan.pk)),
+                in_other=Count("id", filter=Q(plan_id=other_id)),
+            )
+            .exclude(in_plan=F("in_other"))
+            .order_by("module__name")
+        )
+        only_in_plan, only_in_other = [], []
+        for row in rows:
+            (only_in_plan if row["in_plan"] else only_in_other).append(row["module__name"])
+        return Response({"plan": plan.pk, "with": other_id, "only_in_plan": only_in_plan, "only_in_other": only_in_other})
+
+
+class ModuleViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Module.objects.order_by("name")
+    serializer_class = ModuleSerializer
+    lookup_field = "name"
+    lookup_value_regex = r"[\w.\-]+"
+    permission_classes = [permissions.AllowAny]
+
+    @action(detail=True, methods=["get"])
+    def plans(self, request, name=None):
+        """Plans that allow this module."""
+        plans = Plan.objects.filter(plan_modules__module__name=name).order_by("name")
+        return Response(PlanSerializer(plans, many=True).data)
+
+    @action(detail=True, methods=["get"], permission_classes=[permissions.IsAdminUser])
+    def instances(self, request, name=None):
+        """Instances whose current plan allows this module (who is affected if it is removed)."""
+        from instances import policy  # local import: instances depends on billing
+
+        instances = (
+            policy.governed_instances(PlanModule.objects.filter(module__name=name).values("plan"))
+            .values("id", "name", "status", "client_id", plan_id=F("effective_plan_id"))
+            .order_by("name")
+        )
+        return Response(list(instances))
+
 
-class SubscriptionViewSet(viewsets.ModelViewSet):
+class SubscriptionViewSet(ProtectedDestroyMixin, viewsets.ModelViewSet):
+    protected_error_message = "Subscriptions with invoiced payments cannot be deleted"
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
+        qs = Subscription.objects.select_related("plan", "client").annotate(
+            total_paid=F("paid_total"),
+            amount_due=Greatest(F("plan__price") - F("paid_total"), Value(Decimal("0")), output_field=DecimalField()),
+        )
         if user.is_staff:
-            return Subscription.objects.all()
-        if hasattr(user, "client_profile"):
-            return Subscription.objects.filter(client=user.client_profile)
+            return qs
+        client_id = client_id_for(user)
+        if client_id is not None:
+            return qs.filter(client_id=client_id)
         return Subscription.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if not hasattr(user, "client_profile"):
+        client_id = client_id_for(self.request.user)
+        if client_id is None:
             from rest_framework import exceptions
             raise exceptions.PermissionDenied("User has no Client profile")
         
-        # Suspend previous active subscriptions if any (to respect the unique constraint or business logic)
-        Subscription.objects.filter(client=user.client_profile, status="ACTIVE").update(status="SUSPENDED")
-        # Also suspend pending subscriptions
-        Subscription.objects.filter(client=user.client_profile, status="PENDING").update(status="SUSPENDED")
+        # The active subscription stays ACTIVE (instances keep running) until the new one is paid:
+        # mark_payment_paid ends it on activation. Only a previous unpaid plan change is dropped.
+        Subscription.objects.filter(client_id=client_id, status="PENDING").update(status="SUSPENDED")
         
         # Create subscription with PENDING status (will be activated when payment is confirmed)
-        serializer.save(client=user.client_profile, status="PENDING")
+        serializer.save(client_id=client_id, status="PENDING")
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ProtectedDestroyMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -54,13 +176,14 @@ class PaymentViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_staff:
             return Payment.objects.all()
-        if hasattr(user, "client_profile"):
-            return Payment.objects.filter(subscription__client=user.client_profile)
+        client_id = client_id_for(user)
+        if client_id is not None:
+            return Payment.objects.filter(subscription__client_id=client_id)
         return Payment.objects.none()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if not hasattr(user, "client_profile"):
+        client_id = client_id_for(self.request.user)
+        if client_id is None:
             from rest_framework import exceptions
             raise exceptions.PermissionDenied("User has no Client profile")
         
@@ -72,7 +195,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         
         # Verify the subscription belongs to the client
         subscription = subscription_id
-        if subscription.client != user.client_profile:
+        if subscription.client_id != client_id:
             from rest_framework import exceptions
             raise exceptions.PermissionDenied("Subscription does not belong to this client")
         
@@ -86,8 +209,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
     def validate_payment(self, request, pk=None):
         """Admin action to validate a payment (mark as PAID)"""
         payment = self.get_object()
-        payment.status = "PAID"
-        payment.save()  # This will trigger subscription activation via the model's save method
+        if not services.mark_payment_paid(payment):
+            return Response({"status": "Payment already validated", "payment_id": payment.id}, status=status.HTTP_200_OK)
         return Response({"status": "Payment validated", "payment_id": payment.id}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAdminUser])
@@ -97,3 +220,53 @@ class PaymentViewSet(viewsets.ModelViewSet):
         payment.status = "FAILED"
         payment.save()
         return Response({"status": "Payment rejected", "payment_id": payment.id}, status=status.HTTP_200_OK)
+
+
+class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Invoice.objects.select_related("payment")
+    serializer_class = InvoiceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return self.queryset
+        client_id = client_id_for(user)
+        if client_id is not None:
+            return self.queryset.filter(payment__subscription__client_id=client_id)
+        return Invoice.objects.none()
+
+    @action(detail=True, methods=["get"])
+    def pdf(self, request, pk=None):
+        invoice = self.get_object()
+        response = HttpResponse(invoices.pdf_bytes(invoice), content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="{invoice.number}.pdf"'
+        return response
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """ZIP of the invoices issued between ?from= and ?to= (YYYY-MM-DD, inclusive), streamed."""
+        start, end = parse_date(request.query_params.get("from") or ""), parse_date(request.query_params.get("to") or "")
+        if not start or not end or start > end:
+            return Response({"error": "?from=YYYY-MM-DD&to=YYYY-MM-DD required"}, status=status.HTTP_400_BAD_REQUEST)
+        qs = Invoice.objects.filter(issued_at__date__gte=start, issued_at__date__lte=end).order_by("number")
+        response = StreamingHttpResponse(invoices.stream_zip(qs), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="invoices_{start}_{end}.zip"'
+        return response
+
+
+class RevenueReportView(APIView):
+    """Monthly MRR/ARR, churn, revenue per plan and outstanding balance, read from RevenueRollup."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        bounds = {}
+        for param in ("from", "to"):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    bounds[param] = datetime.strptime(value, "%Y-%m").date()
+                except ValueError:
+                    return Response({"error": f"{param} must be YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"months": rollups.report(since=bounds.get("from"), until=bounds.get("to"))})
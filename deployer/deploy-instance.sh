@@ -52,12 +52,13 @@ cat > "${MODULE_RESTRICTION_DIR}/__manifest__.py" <<'MANIFEST_EOF'
 # -*- coding: utf-8 -*-
 {
     'name': 'SaaS Module Restriction',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.2.0',
     'category': 'Tools',
     'summary': 'Restrict module installation based on plan allowed modules',
     'description': """
         This module restricts the installation of modules based on a whitelist
-        defined in environment variable ALLOWED_MODULES.
+        pushed by the SaaS platform in /mnt/extra-addons/saas_policy.json
+        (falls back to the environment variable ALLOWED_MODULES).
         Only modules in the whitelist can be installed by users.
     """,
     'author': 'Odoo SaaS Platform',
@@ -91,69 +92,85 @@ MODELS_INIT_EOF
 cat > "${MODULE_RESTRICTION_DIR}/models/ir_module_module.py" <<'MODEL_EOF'
 # -*- coding: utf-8 -*-
 
+import json
 import os
 import logging
-from odoo import models, api, fields, _
+from odoo import models, api, fields, tools, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# Politique poussée par la plateforme SaaS (mise à jour sans recréer le conteneur)
+POLICY_FILE = os.environ.get('SAAS_POLICY_FILE', '/mnt/extra-addons/saas_policy.json')
+
+
+def _policy_signature():
+    """Cheap stamp of the current policy: one stat() per call, no parsing."""
+    try:
+        st = os.stat(POLICY_FILE)
+        return 'file:%s:%s' % (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return 'env:%s' % os.environ.get('ALLOWED_MODULES', '')
+
 
 class IrModuleModule(models.Model):
     _inherit = 'ir.module.module'
 
     can_install = fields.Boolean(
         string='Can Install',
-        compute='_compute_can_install',
+        compute='_compute_install_flags',
         help='Whether this module can be installed based on the plan restrictions'
     )
     needs_upgrade = fields.Boolean(
         string='Needs Upgrade',
-        compute='_compute_needs_upgrade',
+        compute='_compute_install_flags',
         help='True when the module is not allowed by the current plan'
     )
 
     def _get_allowed_modules(self):
-        """Get list of allowed modules from environment variable"""
-        allowed_str = os.environ.get('ALLOWED_MODULES', '')
-        if not allowed_str:
-            return None
-        
-        allowed_list = [m.strip() for m in allowed_str.split(',') if m.strip()]
-        if 'base' not in allowed_list:
-            allowed_list.append('base')
-        if 'web' not in allowed_list:
-            allowed_list.append('web')
-        
-        return set(allowed_list)
-
-    @api.depends('name', 'state')
-    def _compute_can_install(self):
-        """Compute whether the module can be installed based on plan restrictions"""
-        allowed_modules = self._get_allowed_modules()
-        if allowed_modules is None:
-            # No restriction configured, allow all
-            for module in self:
-                module.can_install = True
-            return
+        """Allowed modules of the current plan (None = no restriction)."""
+        return self._load_allowed_modules(_policy_signature())
 
-        for module in self:
-            # Autoriser installation/activation seulement si le module est
-            # 'uninstalled' ou 'to_buy' ET présent dans la liste autorisée.
-            module.can_install = module.state in ('uninstalled', 'to_buy') and module.name in allowed_modules
+    @tools.ormcache('signature')
+    def _load_allowed_modules(self, signature):
+        """
+        Parse the policy once per signature: a new policy file (or a new
+        ALLOWED_MODULES value) changes the signature and is picked up on the
+        next request, without restarting Odoo.
+        """
+        allowed_list = None
+        if signature.startswith('file:'):
+            try:
+                with open(POLICY_FILE) as f:
+                    policy = json.load(f)
+                allowed_list = policy.get('allowed_modules')
+                _logger.info("SaaS policy %s loaded (%s modules)", policy.get('version'), len(allowed_list or []))
+            except (OSError, ValueError) as e:
+                _logger.warning("Invalid SaaS policy file %s: %s", POLICY_FILE, e)
+        if allowed_list is None:
+            allowed_str = os.environ.get('ALLOWED_MODULES', '')
+            if not allowed_str:
+                return None
+            allowed_list = allowed_str.split(',')
+
+        allowed = {m.strip() for m in allowed_list if m and m.strip()}
+        allowed.update(('base', 'web'))
+        return frozenset(allowed)
 
     @api.depends('name', 'state')
-    def _compute_needs_upgrade(self):
+    def _compute_install_flags(self):
+        """
+        can_install / needs_upgrade in one pass: the Apps kanban computes both
+        for hundreds of records, the policy is looked up once per batch.
+        """
         allowed_modules = self._get_allowed_modules()
-        if allowed_modules is None:
-            for module in self:
-                module.needs_upgrade = False
-            return
-
         for module in self:
-            # Demander une mise à niveau si le module est installable/activable
-            # (uninstalled/to_buy) mais non inclus dans les modules autorisés.
-            module.needs_upgrade = module.state in ('uninstalled', 'to_buy') and module.name not in allowed_modules
+            # Seuls les modules 'uninstalled' ou 'to_buy' sont installables/activables.
+            installable = module.state in ('uninstalled', 'to_buy')
+            allowed = allowed_modules is None or module.name in allowed_modules
+            module.can_install = installable and allowed
+            # Demander une mise à niveau si le module est installable mais non autorisé.
+            module.needs_upgrade = installable and not allowed
 
     def _get_upgrade_url(self, module_name: str):
         """
@@ -182,9 +199,15 @@ class IrModuleModule(models.Model):
     def _check_module_allowed(self, module_name):
         """Check if a module is in the allowed list"""
         allowed_modules = self._get_allowed_modules()
+        return allowed_modules is None or module_name in allowed_modules
+
+    def _first_denied_module(self):
+        """First module of the recordset outside the plan (one set difference), or an empty recordset."""
+        allowed_modules = self._get_allowed_modules()
         if allowed_modules is None:
-            return True
-        return module_name in allowed_modules
+            return self.browse()
+        denied = set(self.mapped('name')) - allowed_modules
+        return self.filtered(lambda m: m.name in denied)[:1] if denied else self.browse()
 
     def button_immediate_install(self):
         """
@@ -193,19 +216,19 @@ class IrModuleModule(models.Model):
         - Si NON autorisé: au lieu d'une erreur technique, on ouvre le wizard
           "Mettre à niveau le forfait" (un seul bouton côté UI: Activer).
         """
-        for module in self:
-            if not self._check_module_allowed(module.name):
-                # Ouvrir directement le wizard d'upgrade pour ce module
-                return module.action_request_upgrade()
+        denied = self._first_denied_module()
+        if denied:
+            # Ouvrir directement le wizard d'upgrade pour ce module
+            return denied.action_request_upgrade()
         return super().button_immediate_install()
 
     def button_install(self):
         """
         Override install (non-immediate) pour la même logique que ci‑dessus.
         """
-        for module in self:
-            if not self._check_module_allowed(module.name):
-                return module.action_request_upgrade()
+        denied = self._first_denied_module()
+        if denied:
+            return denied.action_request_upgrade()
         return super().button_install()
 MODEL_EOF
 
@@ -279,6 +302,89 @@ class SaasModuleUpgradeWizard(models.TransientModel):
         return {"type": "ir.actions.act_window_close"}
 WIZ_EOF
 
+# Micro-benchmark de l'Apps kanban (non exécuté par défaut) :
+#   docker exec odoo_<instance> odoo -d <db> --db_host=db_<instance> -r <user> -w <password> \
+#       -u saas_module_restriction --test-tags benchmark/saas_module_restriction --stop-after-init --no-http --workers=0
+mkdir -p "${MODULE_RESTRICTION_DIR}/tests"
+cat > "${MODULE_RESTRICTION_DIR}/tests/__init__.py" <<'TESTS_INIT_EOF'
+# -*- coding: utf-8 -*-
+from . import test_install_flags_benchmark
+TESTS_INIT_EOF
+
+cat > "${MODULE_RESTRICTION_DIR}/tests/test_install_flags_benchmark.py" <<'BENCH_EOF'
+# -*- coding: utf-8 -*-
+"""
+Cost of _compute_install_flags over the Apps kanban records, with the policy
+ormcache cold (cleared before each pass: the policy file is re-parsed) and
+warm (one stat() per batch). Tagged -standard: only run on request.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models import ir_module_module as restriction
+
+_logger = logging.getLogger(__name__)
+
+RECORDS = 500
+ROUNDS = 20
+
+
+@tagged('-standard', 'benchmark')
+class TestInstallFlagsBenchmark(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.modules = cls.env['ir.module.module'].search([], limit=RECORDS)
+        # Plan allowing half of the modules, as saas_policy.json pushed by the platform
+        fd, cls.policy_file = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': 'bench', 'allowed_modules': cls.modules[::2].mapped('name')}, f)
+        cls.startClassPatcher(patch.object(restriction, 'POLICY_FILE', cls.policy_file))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.policy_file)
+        super().tearDownClass()
+
+    def _clear_ormcache(self):
+        registry = self.env.registry
+        # Registry.clear_cache() since Odoo 17, clear_caches() before
+        (getattr(registry, 'clear_cache', None) or registry.clear_caches)()
+
+    def _compute_pass(self, cold):
+        if cold:
+            self._clear_ormcache()
+        self.modules.invalidate_recordset(['can_install', 'needs_upgrade'])
+        start = time.perf_counter()
+        self.modules.mapped('can_install')
+        return time.perf_counter() - start
+
+    def _measure(self, cold):
+        self._compute_pass(cold)  # warm-up (imports, prefetch)
+        timings = sorted(self._compute_pass(cold) for _ in range(ROUNDS))
+        return timings[len(timings) // 2]
+
+    def test_install_flags(self):
+        cold, warm = self._measure(cold=True), self._measure(cold=False)
+        _logger.info(
+            "_compute_install_flags over %s modules (median of %s): cold cache %.2f ms, warm cache %.2f ms",
+            len(self.modules), ROUNDS, cold * 1000, warm * 1000,
+        )
+        allowed = self.modules._get_allowed_modules()
+        self.assertEqual(
+            self.modules.filtered('can_install').mapped('name'),
+            self.modules.filtered(lambda m: m.state in ('uninstalled', 'to_buy') and m.name in allowed).mapped('name'),
+        )
+BENCH_EOF
+
 # Traductions (FR) — format Odoo
 mkdir -p "${MODULE_RESTRICTION_DIR}/i18n"
 cat > "${MODULE_RESTRICTION_DIR}/i18n/fr.po" <<'FR_PO_EOF'
@@ -425,6 +531,7 @@ access_saas_module_upgrade_wizard,access_saas_module_upgrade_wizard,model_saas_m
 ACCESS_EOF
 
 # docker-compose spécifique à l'instance
+# (en mode prefork, docker-compose.override.yml publie en plus le gevent_port 8072 pour /websocket)
 cat > "${INSTANCE_DIR}/docker-compose.yml" <<EOF
 version: "3.8"
 
@@ -490,7 +597,7 @@ MAX_RETRIES=30
 RETRY=0
 INIT_SUCCESS=false
 while [ ${RETRY} -lt ${MAX_RETRIES} ]; do
-    if docker exec odoo_${INSTANCE_NAME} odoo --stop-after-init -d ${DB_NAME} -r ${DB_USER} -w ${DB_PASSWORD} --db_host=db_${INSTANCE_NAME} --db_port=5432 -i ${INITIAL_MODULES} >/dev/null 2>&1; then
+    if docker exec odoo_${INSTANCE_NAME} odoo --stop-after-init --workers=0 -d ${DB_NAME} -r ${DB_USER} -w ${DB_PASSWORD} --db_host=db_${INSTANCE_NAME} --db_port=5432 -i ${INITIAL_MODULES} >/dev/null 2>&1; then
         echo "✅ Base de données initialisée avec succès!"
         echo "🔐 Configuration du mot de passe administrateur..."
         docker exec odoo_db_${INSTANCE_NAME} psql -U ${DB_USER} -d ${DB_NAME} -c "UPDATE res_users SET password='${ADMIN_PASSWORD}' WHERE id=2;" >/dev/null 2>&1
@@ -506,7 +613,7 @@ done
 
 if [ "${INIT_SUCCESS}" != "true" ]; then
     echo "⚠️  L'initialisation automatique a échoué. Initialisez manuellement:"
-    echo "   docker exec odoo_${INSTANCE_NAME} odoo --stop-after-init -d ${DB_NAME} -r ${DB_USER} -w ${DB_PASSWORD} --db_host=db_${INSTANCE_NAME} --db_port=5432 -i base"
+    echo "   docker exec odoo_${INSTANCE_NAME} odoo --stop-after-init --workers=0 -d ${DB_NAME} -r ${DB_USER} -w ${DB_PASSWORD} --db_host=db_${INSTANCE_NAME} --db_port=5432 -i base"
 else
     echo "🔄 Redémarrage du conteneur Odoo..."
     docker restart odoo_${INSTANCE_NAME} >/dev/null 2>&1
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from instances.models import OdooInstance, DeploymentLog
+from instances.models import OdooInstance, DeploymentLog, Backup, StorageUsage, PlanRollout, PlanRolloutTarget, TenantUsageSnapshot
 
 
 @admin.register(OdooInstance)
@@ -14,9 +14,51 @@ class OdooInstanceAdmin(admin.ModelAdmin):
 
 @admin.register(DeploymentLog)
 class DeploymentLogAdmin(admin.ModelAdmin):
-    list_display = ["instance", "action", "status", "timestamp", "duration_seconds", "user"]
+    list_display = ["instance_name", "action", "status", "timestamp", "duration_seconds", "user"]
     list_filter = ["action", "status", "timestamp"]
-    search_fields = ["instance__name", "error_message"]
+    search_fields = ["instance_name", "error_message"]
     raw_id_fields = ["instance", "user"]
     readonly_fields = ["timestamp"]
 
+
+
+@admin.register(Backup)
+class BackupAdmin(admin.ModelAdmin):
+    list_display = ["instance", "status", "created_at", "completed_at", "db_size_bytes", "filestore_size_bytes"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["instance__name", "path"]
+    raw_id_fields = ["instance", "log"]
+    readonly_fields = ["created_at", "completed_at", "db_sha256", "filestore_sha256"]
+
+
+@admin.register(StorageUsage)
+class StorageUsageAdmin(admin.ModelAdmin):
+    list_display = ["instance", "db_bytes", "filestore_bytes", "limit_bytes", "state", "measured_at"]
+    list_filter = ["state"]
+    search_fields = ["instance__name"]
+    raw_id_fields = ["instance"]
+    exclude = ["filestore_index"]
+
+
+@admin.register(TenantUsageSnapshot)
+class TenantUsageSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["instance", "date", "active_users", "max_users", "over_users", "companies", "records"]
+    list_filter = ["over_users", "date"]
+    search_fields = ["instance__name"]
+    raw_id_fields = ["instance"]
+
+
+class PlanRolloutTargetInline(admin.TabularInline):
+    model = PlanRolloutTarget
+    extra = 0
+    raw_id_fields = ["instance"]
+    readonly_fields = ["wave", "status", "actions", "error_message", "started_at", "finished_at"]
+
+
+@admin.register(PlanRollout)
+class PlanRolloutAdmin(admin.ModelAdmin):
+    list_display = ["plan", "status", "total", "succeeded", "failed", "created_at", "finished_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["plan__name"]
+    raw_id_fields = ["plan", "user"]
+    inlines = [PlanRolloutTargetInline]
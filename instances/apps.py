@@ -5,3 +5,5 @@ class InstancesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "instances"
 
+    def ready(self):
+        from instances import signals  # noqa: F401
@@ -0,0 +1,191 @@
+"""
+Streaming backups of an Odoo instance (database + filestore).
+
+The database is dumped with ``pg_dump -Fc`` (compressed custom format, restorable
+with ``pg_restore -j``) and the filestore volume is tarred and gzipped on the
+fly; the backup fails if that volume does not exist. Both streams are written
+chunk by chunk to the backup store while being hashed, so nothing is staged in
+memory or in a temporary file. A failed backup leaves no partial files behind.
+"""
+import gzip
+import hashlib
+import json
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from instances import operations, runtime
+from instances.models import Backup, DeploymentLog
+
+CHUNK_SIZE = 1024 * 1024
+
+# Limits how many tenants are dumped at the same time across the whole process.
+_backup_slots = threading.BoundedSemaphore(getattr(settings, "BACKUP_MAX_CONCURRENCY", 2))
+
+
+class _HashingWriter:
+    """File wrapper that counts and hashes the bytes actually stored."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def _stream_to_file(cmd, path, compress=False):
+    """Pipe the stdout of ``cmd`` into ``path``. Returns (size, sha256) of the stored file."""
+    try:
+        with tempfile.TemporaryFile() as stderr, open(path, "wb") as raw:
+            writer = _HashingWriter(raw)
+            sink = gzip.GzipFile(fileobj=writer, mode="wb", compresslevel=6) if compress else writer
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                while True:
+                    chunk = proc.stdout.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sink.write(chunk)
+                if compress:
+                    sink.close()
+            finally:
+                proc.stdout.close()
+                returncode = proc.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                raise RuntimeError(f"{cmd[0]} {cmd[1]} exited with {returncode}: {message}")
+            return writer.size, writer.sha256.hexdigest()
+    except BaseException:
+        # A truncated dump or archive must never be mistaken for a backup.
+        Path(path).unlink(missing_ok=True)
+        raise
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dump_database_cmd(instance):
+    return [
+        "docker", "exec", runtime.db_container(instance),
+        "pg_dump", "-U", runtime.db_user(instance), "-Fc", "-Z", "6", instance.db_name,
+    ]
+
+
+def archive_filestore_cmd(instance):
+    return [
+        "docker", "run", "--rm",
+        "-v", f"{runtime.filestore_volume(instance)}:/data:ro",
+        getattr(settings, "BACKUP_HELPER_IMAGE", "alpine:3"),
+        "tar", "-C", "/data", "--exclude=./sessions", "-cf", "-", ".",
+    ]
+
+
+def backup_dir(instance):
+    root = Path(getattr(settings, "BACKUP_ROOT", settings.BASE_DIR / "backups"))
+    return root / instance.name / timezone.now().strftime("%Y%m%dT%H%M%S")
+
+
+def run_backup(backup: Backup):
+    """Dump database and filestore for ``backup.instance``. Blocks until a slot is free."""
+    instance = backup.instance
+    log = backup.log
+
+    with _backup_slots:
+        start = time.monotonic()
+        target = None
+        try:
+            target = backup_dir(instance)
+            target.mkdir(parents=True, exist_ok=True)
+            backup.path = str(target)
+            backup.save(update_fields=["path"])
+
+            # Database and filestore are streamed in parallel.
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                db_future = pool.submit(_stream_to_file, dump_database_cmd(instance), target / "db.dump")
+                fs_future = pool.submit(
+                    _stream_to_file, archive_filestore_cmd(instance), target / "filestore.tar.gz", True
+                )
+                backup.db_size_bytes, backup.db_sha256 = db_future.result()
+                backup.filestore_size_bytes, backup.filestore_sha256 = fs_future.result()
+
+            duration = time.monotonic() - start
+            manifest = {
+                "instance": instance.name,
+                "db_name": instance.db_name,
+                "odoo_version": backup.odoo_version,
+                "created_at": timezone.now().isoformat(),
+                "files": {
+                    "db.dump": {"size": backup.db_size_bytes, "sha256": backup.db_sha256},
+                    "filestore.tar.gz": {"size": backup.filestore_size_bytes, "sha256": backup.filestore_sha256},
+                },
+            }
+            (target / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+            backup.status = "SUCCESS"
+            backup.completed_at = timezone.now()
+            backup.save()
+            if log:
+                log.status = "SUCCESS"
+                log.duration_seconds = int(duration)
+                log.details.update(
+                    {
+                        "backup_id": backup.id,
+                        "path": backup.path,
+                        "size_bytes": backup.size_bytes,
+                        "db_size_bytes": backup.db_size_bytes,
+                        "filestore_size_bytes": backup.filestore_size_bytes,
+                        "throughput_mb_s": round(backup.size_bytes / (1024 * 1024) / max(duration, 0.001), 2),
+                    }
+                )
+                log.save()
+        except Exception as e:
+            if target is not None:
+                # The other stream may have completed: it is useless on its own.
+                shutil.rmtree(target, ignore_errors=True)
+            backup.status = "FAILED"
+            backup.completed_at = timezone.now()
+            backup.save()
+            if log:
+                log.status = "FAILED"
+                log.error_message = str(e)
+                log.duration_seconds = int(time.monotonic() - start)
+                log.save()
+    return backup
+
+
+def start_backup(instance, user=None, exclusive=True):
+    """
+    Create the Backup/DeploymentLog rows. The caller runs ``run_backup``.
+
+    Raises operations.OperationInProgress if another backup, restore or
+    upgrade runs on the instance, unless ``exclusive`` is False (the
+    snapshot taken by an upgrade).
+    """
+    details = {"name": instance.name}
+    if exclusive:
+        log = operations.begin(instance, "BACKUP", user=user, details=details)
+    else:
+        log = DeploymentLog.objects.create(
+            instance=instance, user=user, action="BACKUP", status="IN_PROGRESS", details=details,
+        )
+    return Backup.objects.create(instance=instance, log=log, odoo_version=instance.odoo_version)
@@ -0,0 +1,124 @@
+"""
+Copy the data of an instance into a freshly deployed one (staging copies).
+
+Every tenant runs its own Postgres container, so the database is streamed with
+``pg_dump -Fc | pg_restore`` between the two clusters. The filestore is copied
+with ``cp --reflink=auto`` so copy-on-write filesystems share the blocks.
+The copy is then neutralized: no outgoing mail, no crons.
+"""
+import subprocess
+import time
+
+from instances import runtime
+from instances.models import DeploymentLog
+
+NEUTRALIZE_SQL = """
+UPDATE ir_cron SET active = false;
+UPDATE ir_mail_server SET active = false;
+DO $$ BEGIN
+    IF to_regclass('fetchmail_server') IS NOT NULL THEN
+        UPDATE fetchmail_server SET active = false;
+    END IF;
+END $$;
+UPDATE ir_config_parameter SET value = gen_random_uuid()::text WHERE key = 'database.uuid';
+UPDATE ir_config_parameter SET value = 'http://' || :'domain' WHERE key = 'web.base.url';
+INSERT INTO ir_config_parameter (key, value, create_date, write_date)
+VALUES ('database.is_neutralized', 'true', now(), now())
+ON CONFLICT (key) DO UPDATE SET value = 'true';
+"""
+
+
+class CloneError(Exception):
+    pass
+
+
+def stream_database(source, target):
+    """Replace the target database with a copy of the source one."""
+    names = {"db": target.db_name, "owner": runtime.db_user(target)}
+    runtime.psql(
+        target,
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :'db' AND pid <> pg_backend_pid()",
+        variables=names,
+    )
+    runtime.psql(target, 'DROP DATABASE IF EXISTS :"db"', variables=names)
+    runtime.psql(target, 'CREATE DATABASE :"db" OWNER :"owner"', variables=names)
+
+    dump = subprocess.Popen(
+        ["docker", "exec", runtime.db_container(source),
+         "pg_dump", "-U", runtime.db_user(source), "-Fc", "-Z", "0", source.db_name],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    restore = subprocess.run(
+        ["docker", "exec", "-i", runtime.db_container(target),
+         "pg_restore", "-U", runtime.db_user(target), "-d", target.db_name, "--no-owner", "--no-acl"],
+        stdin=dump.stdout, capture_output=True, text=True,
+    )
+    dump.stdout.close()
+    if dump.wait() != 0:
+        raise CloneError("pg_dump of the source database failed")
+    if restore.returncode != 0:
+        raise CloneError(restore.stderr.strip() or "pg_restore failed")
+
+
+# Database names are passed as positional arguments ($1 source, $2 target), never formatted in.
+COPY_FILESTORE_SCRIPT = (
+    'rm -rf "/to/filestore/$2" && mkdir -p /to/filestore'
+    ' && if [ -d "/from/filestore/$1" ]; then'
+    ' cp -a --reflink=auto "/from/filestore/$1" "/to/filestore/$2"; fi'
+)
+
+
+def copy_filestore(source, target):
+    # The odoo image ships GNU coreutils, needed for --reflink.
+    result = subprocess.run(
+        [
+            "docker", "run", "--rm", "--user", "root", "--entrypoint", "sh",
+            "-v", f"{runtime.filestore_volume(source)}:/from:ro",
+            "-v", f"{runtime.filestore_volume(target)}:/to",
+            f"odoo:{source.odoo_version}", "-c", COPY_FILESTORE_SCRIPT,
+            "copy-filestore", runtime.check_name(source.db_name), runtime.check_name(target.db_name),
+        ],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CloneError(result.stderr.strip() or "filestore copy failed")
+
+
+def neutralize(target):
+    runtime.psql(target, NEUTRALIZE_SQL, database=target.db_name, variables={"domain": target.domain})
+
+
+def copy_instance_data(source, target, user=None):
+    """Copy ``source`` into the already deployed ``target`` and log it as CLONE."""
+    log = DeploymentLog.objects.create(
+        instance=target,
+        user=user,
+        action="CLONE",
+        status="IN_PROGRESS",
+        details={"source": source.name},
+    )
+    phases = {}
+    start = time.monotonic()
+    try:
+        subprocess.run(["docker", "stop", runtime.odoo_container(target)], capture_output=True)
+        for name, step in (
+            ("database", stream_database),
+            ("filestore", copy_filestore),
+        ):
+            t0 = time.monotonic()
+            step(source, target)
+            phases[name] = round(time.monotonic() - t0, 2)
+        neutralize(target)
+        subprocess.run(["docker", "start", runtime.odoo_container(target)], check=True, capture_output=True)
+
+        target.status = "RUNNING"
+        log.status = "SUCCESS"
+    except Exception as e:
+        target.status = "ERROR"
+        log.status = "FAILED"
+        log.error_message = str(e)
+    target.save()
+    log.duration_seconds = int(time.monotonic() - start)
+    log.details.update({"phases": phases})
+    log.save()
+    return log
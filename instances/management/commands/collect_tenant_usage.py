@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from instances import metering
+
+
+class Command(BaseCommand):
+    help = "Snapshot active users, companies and records of every running tenant database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instance", action="append", default=[], help="Instance name (repeatable)")
+        parser.add_argument("--concurrency", type=int, default=None, help="Default: METERING_CONCURRENCY")
+        parser.add_argument("--date", help="Snapshot date (YYYY-MM-DD), default today")
+
+    def handle(self, *args, **options):
+        date = None
+        if options["date"]:
+            date = parse_date(options["date"])
+            if date is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+        qs = metering.instances_to_meter()
+        if options["instance"]:
+            qs = qs.filter(name__in=options["instance"])
+
+        report = metering.collect(qs, date=date, concurrency=options["concurrency"])
+        for name, error in sorted(report.errors.items()):
+            self.stdout.write(self.style.ERROR(f"{name}: {error}"))
+        for name in sorted(report.over_users):
+            self.stdout.write(self.style.WARNING(f"{name}: over the plan user limit"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"done: {report.collected} collected, {len(report.over_users)} over users, {len(report.errors)} failed"
+            )
+        )
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from instances import teardown
+
+
+class Command(BaseCommand):
+    help = (
+        "Reclaim containers, volumes and deployer/instances directories not owned by any "
+        "OdooInstance, and retry stuck DELETING tombstones. Meant to run periodically (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--min-age", type=int, default=30,
+            help="Minutes before a tombstone or an unknown directory is considered stale",
+        )
+
+    def handle(self, *args, **options):
+        dry_run: bool = options["dry_run"]
+        prefix = "[dry-run] " if dry_run else ""
+        report = teardown.collect_garbage(dry_run=dry_run, min_age=timedelta(minutes=options["min_age"]))
+
+        for name in report.tombstones:
+            self.stdout.write(f"{prefix}teardown tombstone {name}")
+        for kind, items in (
+            ("container", report.containers),
+            ("volume", report.volumes),
+            ("directory", report.directories),
+        ):
+            for item in items:
+                self.stdout.write(f"{prefix}remove {kind} {item}")
+        for error in report.errors:
+            self.stdout.write(self.style.ERROR(error))
+
+        self.stdout.write(
+            f"done: containers={len(report.containers)}, volumes={len(report.volumes)}, "
+            f"directories={len(report.directories)}, freed={report.freed_bytes / (1024 * 1024):.1f} MiB"
+        )
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from instances import storage
+from instances.models import OdooInstance
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure database + filestore usage of running instances (and of instances stopped "
+        "for exceeding their quota) against their plan storage limit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instance", action="append", default=[], help="Instance name (repeatable)")
+        parser.add_argument("--concurrency", type=int, default=4)
+
+    def handle(self, *args, **options):
+        qs = OdooInstance.objects.filter(
+            Q(status="RUNNING") | Q(status="STOPPED", storage_usage__state="EXCEEDED")
+        ).select_related("subscription__plan", "storage_usage")
+        if options["instance"]:
+            qs = qs.filter(name__in=options["instance"])
+
+        with ThreadPoolExecutor(max_workers=max(options["concurrency"], 1)) as pool:
+            futures = {pool.submit(storage.measure, instance): instance for instance in qs}
+            for future in as_completed(futures):
+                instance = futures[future]
+                try:
+                    usage = future.result()
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"{instance.name}: {e}"))
+                    continue
+                line = (
+                    f"{instance.name}: {usage.total_bytes / storage.GB:.2f} / "
+                    f"{usage.limit_bytes / storage.GB:.0f} GB ({usage.state})"
+                )
+                style = {"OK": self.style.SUCCESS, "WARNING": self.style.WARNING}.get(usage.state, self.style.ERROR)
+                self.stdout.write(style(line))
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billing.models import Plan
+from instances import operations, policy, upgrades
+from instances.models import OdooInstance
+
+
+class Command(BaseCommand):
+    help = (
+        "Rolling Odoo version upgrade. Resumable: instances already on the target "
+        "version are skipped, as are the ones whose last attempt failed (unless --retry-failed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--odoo-version", required=True, help="Target Odoo version (e.g. 18)")
+        parser.add_argument("--plan", help="Only instances whose effective plan has this name")
+        parser.add_argument("--instance", action="append", default=[], help="Instance name (repeatable)")
+        parser.add_argument("--concurrency", type=int, default=2)
+        parser.add_argument("--limit", type=int, default=0, help="Stop after N instances (0 = all)")
+        parser.add_argument("--retry-failed", action="store_true")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        version = options["odoo_version"]
+        qs = OdooInstance.objects.all()
+        if options["plan"]:
+            plan = Plan.objects.filter(name=options["plan"]).first()
+            if plan is None:
+                raise CommandError(f"Unknown plan {options['plan']!r}")
+            qs = policy.governed_instances(plan)
+        qs = qs.filter(status="RUNNING").exclude(odoo_version=version).order_by("id")
+        if options["instance"]:
+            qs = qs.filter(name__in=options["instance"])
+
+        targets = [i for i in qs if options["retry_failed"] or not upgrades.last_upgrade_failed(i, version)]
+        if options["limit"]:
+            targets = targets[: options["limit"]]
+        if not targets:
+            self.stdout.write("nothing to upgrade")
+            return
+
+        for instance in targets:
+            self.stdout.write(
+                f"{'[dry-run] ' if options['dry_run'] else ''}upgrade {instance.name}: "
+                f"{instance.odoo_version} -> {version}"
+            )
+        if options["dry_run"]:
+            return
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be >= 1")
+
+        failed = skipped = 0
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            futures = {pool.submit(upgrades.run_upgrade, i, version): i for i in targets}
+            for future in as_completed(futures):
+                instance = futures[future]
+                try:
+                    log = future.result()
+                except operations.OperationInProgress as e:
+                    skipped += 1
+                    self.stdout.write(self.style.WARNING(f"{instance.name}: skipped, {e}"))
+                    continue
+                if log.status == "SUCCESS":
+                    self.stdout.write(self.style.SUCCESS(f"{instance.name}: upgraded ({log.duration_seconds}s)"))
+                else:
+                    failed += 1
+                    rollback = log.details.get("rollback", "not needed")
+                    self.stdout.write(self.style.ERROR(f"{instance.name}: {log.error_message} (rollback: {rollback})"))
+
+        self.stdout.write(f"done: upgraded={len(targets) - failed - skipped}, failed={failed}, skipped={skipped}")
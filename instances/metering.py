@@ -0,0 +1,133 @@
+"""
+Per-tenant usage metering (manage.py collect_tenant_usage).
+
+Each tenant database is queried once, through its own ``odoo_db_<name>``
+container, for the active internal users, the companies and an estimate of the
+live rows. Tenants are read in parallel by at most METERING_CONCURRENCY
+workers, so no more than that many tenant connections are open at once, and
+every read is bounded by METERING_TIMEOUT. The day's snapshots are then
+upserted in one statement.
+
+An instance whose active users exceed its plan's ``max_users`` is flagged
+``over_users``; ``tenant_user_overage`` is sent when it was not already over in
+its previous snapshot.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from billing.models import Subscription
+from instances import runtime
+from instances.models import OdooInstance, TenantUsageSnapshot
+
+tenant_user_overage = Signal()  # sender=TenantUsageSnapshot, snapshot=...
+
+# share = portal/public users; the __system__ user is inactive.
+USAGE_SQL = (
+    "SELECT (SELECT count(*) FROM res_users WHERE active AND NOT share),"
+    " (SELECT count(*) FROM res_company),"
+    " (SELECT coalesce(sum(n_live_tup), 0)::bigint FROM pg_stat_user_tables)"
+)
+
+
+@dataclass
+class MeteringReport:
+    collected: int = 0
+    over_users: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+
+
+def instances_to_meter():
+    """RUNNING instances annotated with the max_users of their effective plan (see OdooInstance.get_plan)."""
+    active_plan_users = Subscription.objects.filter(client=OuterRef("client"), status="ACTIVE").values(
+        "plan__max_users"
+    )[:1]
+    return OdooInstance.objects.filter(status="RUNNING").annotate(
+        plan_max_users=Coalesce(
+            Subquery(active_plan_users), F("subscription__plan__max_users"), output_field=IntegerField()
+        )
+    )
+
+
+def read_usage(instance):
+    """(active_users, companies, records) of the tenant database."""
+    out = runtime.psql(
+        instance, USAGE_SQL, database=instance.db_name, timeout=getattr(settings, "METERING_TIMEOUT", 30)
+    )
+    users, companies, records = (int(value) for value in out.split("|"))
+    return users, companies, records
+
+
+def _read(instance):
+    try:
+        return instance, read_usage(instance), None
+    except Exception as e:
+        return instance, None, str(e) or e.__class__.__name__
+
+
+def collect(instances=None, date=None, concurrency=None):
+    """Snapshot ``instances`` (default: every RUNNING one) for ``date``. Returns a MeteringReport."""
+    instances = list(instances if instances is not None else instances_to_meter())
+    date = date or timezone.localdate()
+    concurrency = concurrency or getattr(settings, "METERING_CONCURRENCY", 16)
+    report = MeteringReport()
+    if not instances:
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(min(concurrency, len(instances)), 1)) as pool:
+        results = list(pool.map(_read, instances))
+
+    now = timezone.now()
+    snapshots = []
+    for instance, usage, error in results:
+        if error is not None:
+            report.errors[instance.name] = error
+            continue
+        users, companies, records = usage
+        max_users = getattr(instance, "plan_max_users", None)
+        if max_users is None:
+            max_users = instance.get_plan().max_users
+        snapshots.append(
+            TenantUsageSnapshot(
+                instance=instance,
+                date=date,
+                active_users=users,
+                companies=companies,
+                records=records,
+                max_users=max_users,
+                over_users=bool(max_users) and users > max_users,
+                collected_at=now,
+            )
+        )
+    if not snapshots:
+        return report
+
+    # Last flag per instance (today's included), read before the upsert: a re-run of the day sends nothing.
+    previous = TenantUsageSnapshot.objects.filter(instance=OuterRef("pk"), date__lte=date).order_by("-date")
+    previously_over = dict(
+        OdooInstance.objects.filter(pk__in=[s.instance_id for s in snapshots])
+        .annotate(over=Subquery(previous.values("over_users")[:1]))
+        .values_list("pk", "over")
+    )
+
+    TenantUsageSnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["instance", "date"],
+        update_fields=["active_users", "companies", "records", "max_users", "over_users", "collected_at"],
+    )
+    report.collected = len(snapshots)
+
+    for snapshot in snapshots:
+        if not snapshot.over_users:
+            continue
+        report.over_users.append(snapshot.instance.name)
+        if not previously_over.get(snapshot.instance_id):
+            tenant_user_overage.send(sender=TenantUsageSnapshot, snapshot=snapshot)
+    return report
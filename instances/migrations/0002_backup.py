@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 02:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instances', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Backup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('IN_PROGRESS', 'In Progress'), ('SUCCESS', 'Success'), ('FAILED', 'Failed')], default='IN_PROGRESS', max_length=20)),
+                ('path', models.CharField(blank=True, help_text='Backup directory on the backup store', max_length=500)),
+                ('odoo_version', models.CharField(max_length=20)),
+                ('db_size_bytes', models.BigIntegerField(default=0)),
+                ('db_sha256', models.CharField(blank=True, max_length=64)),
+                ('filestore_size_bytes', models.BigIntegerField(default=0)),
+                ('filestore_sha256', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backups', to='instances.odooinstance')),
+                ('log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='instances.deploymentlog')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instances', '0002_backup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deploymentlog',
+            name='action',
+            field=models.CharField(choices=[('CREATE', 'Create'), ('START', 'Start'), ('STOP', 'Stop'), ('RESTART', 'Restart'), ('DELETE', 'Delete'), ('UPDATE', 'Update'), ('BACKUP', 'Backup'), ('RESTORE', 'Restore'), ('CLONE', 'Clone')], max_length=20),
+        ),
+    ]
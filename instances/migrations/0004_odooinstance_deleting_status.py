@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instances', '0003_deploymentlog_clone_action'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='odooinstance',
+            name='status',
+            field=models.CharField(choices=[('CREATED', 'Created - Pending Deployment'), ('DEPLOYING', 'Deploying'), ('RUNNING', 'Running'), ('STOPPED', 'Stopped'), ('ERROR', 'Error'), ('DELETING', 'Deleting')], default='CREATED', max_length=20),
+        ),
+    ]
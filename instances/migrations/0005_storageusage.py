@@ -0,0 +1,27 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instances', '0004_odooinstance_deleting_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('db_bytes', models.BigIntegerField(default=0)),
+                ('filestore_bytes', models.BigIntegerField(default=0)),
+                ('limit_bytes', models.BigIntegerField(default=0)),
+                ('state', models.CharField(choices=[('OK', 'Ok'), ('WARNING', 'Warning'), ('EXCEEDED', 'Exceeded')], default='OK', max_length=20)),
+                ('filestore_index', models.JSONField(default=dict)),
+                ('measured_at', models.DateTimeField(blank=True, null=True)),
+                ('instance', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='storage_usage', to='instances.odooinstance')),
+            ],
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('billing', '0006_sync_plan_modules'),
+        ('instances', '0005_storageusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanRollout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCESS', 'Success'), ('PARTIAL', 'Partial - some instances failed'), ('ABORTED', 'Aborted')], default='PENDING', max_length=20)),
+                ('changes', models.JSONField(blank=True, default=list, help_text='Plan fields that changed')),
+                ('canary_size', models.PositiveIntegerField(default=1)),
+                ('batch_size', models.PositiveIntegerField(default=10)),
+                ('concurrency', models.PositiveIntegerField(default=4)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('succeeded', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollouts', to='billing.plan')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanRolloutTarget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wave', models.PositiveIntegerField(default=0, help_text='0 = canary')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCESS', 'Success'), ('FAILED', 'Failed'), ('SKIPPED', 'Skipped')], default='PENDING', max_length=20)),
+                ('actions', models.JSONField(blank=True, default=dict)),
+                ('error_message', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollout_targets', to='instances.odooinstance')),
+                ('rollout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='targets', to='instances.planrollout')),
+            ],
+            options={
+                'ordering': ['wave', 'id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='planrollouttarget',
+            constraint=models.UniqueConstraint(fields=('rollout', 'instance'), name='unique_rollout_target'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-19 03:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instances', '0007_odooinstance_suspended_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantUsageSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('active_users', models.IntegerField(default=0, help_text='Active internal (non-portal) users')),
+                ('companies', models.IntegerField(default=0)),
+                ('records', models.BigIntegerField(default=0, help_text='Live rows over all tables (pg_stat estimate)')),
+                ('max_users', models.IntegerField(default=0, help_text='Plan limit when the snapshot was taken')),
+                ('over_users', models.BooleanField(default=False)),
+                ('collected_at', models.DateTimeField()),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_snapshots', to='instances.odooinstance')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'over_users'], name='instances_t_date_b282a8_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tenantusagesnapshot',
+            constraint=models.UniqueConstraint(fields=('instance', 'date'), name='unique_usage_snapshot_per_day'),
+        ),
+    ]
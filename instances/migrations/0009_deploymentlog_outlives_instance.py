@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 04:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_instance_name(apps, schema_editor):
+    DeploymentLog = apps.get_model("instances", "DeploymentLog")
+    OdooInstance = apps.get_model("instances", "OdooInstance")
+    DeploymentLog.objects.update(
+        instance_name=Subquery(OdooInstance.objects.filter(pk=OuterRef("instance_id")).values("name")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instances', '0008_tenantusagesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deploymentlog',
+            name='instance_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='deploymentlog',
+            name='instance',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deployment_logs', to='instances.odooinstance'),
+        ),
+        migrations.RunPython(backfill_instance_name, migrations.RunPython.noop),
+    ]
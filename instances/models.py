@@ -14,6 +14,8 @@ class OdooInstance(models.Model):
         ("RUNNING", "Running"),
         ("STOPPED", "Stopped"),
         ("ERROR", "Error"),
+        ("DELETING", "Deleting"),
+        ("SUSPENDED", "Suspended - No Active Subscription"),
     ]
 
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="instances")
@@ -51,6 +53,11 @@ class OdooInstance(models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
 
+    def get_plan(self):
+        """Plan of the client's active subscription, else the one the instance was created with."""
+        active = self.client.subscriptions.filter(status="ACTIVE").select_related("plan").first()
+        return (active or self.subscription).plan
+
     def __str__(self):
         return f"{self.name} ({self.status})"
 
@@ -65,6 +72,7 @@ class DeploymentLog(models.Model):
         ("UPDATE", "Update"),
         ("BACKUP", "Backup"),
         ("RESTORE", "Restore"),
+        ("CLONE", "Clone"),
     ]
 
     STATUS_CHOICES = [
@@ -73,7 +81,11 @@ class DeploymentLog(models.Model):
         ("IN_PROGRESS", "In Progress"),
     ]
 
-    instance = models.ForeignKey(OdooInstance, on_delete=models.CASCADE, related_name="deployment_logs")
+    # SET_NULL: the DELETE log (freed resources report) outlives the instance it tore down
+    instance = models.ForeignKey(
+        OdooInstance, on_delete=models.SET_NULL, null=True, blank=True, related_name="deployment_logs"
+    )
+    instance_name = models.CharField(max_length=100, blank=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
@@ -85,6 +97,151 @@ class DeploymentLog(models.Model):
     class Meta:
         ordering = ["-timestamp"]
 
+    def save(self, *args, **kwargs):
+        if self.instance and not self.instance_name:
+            self.instance_name = self.instance.name
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.action} - {self.instance_name} ({self.status})"
+
+
+
+class Backup(models.Model):
+    STATUS_CHOICES = [
+        ("IN_PROGRESS", "In Progress"),
+        ("SUCCESS", "Success"),
+        ("FAILED", "Failed"),
+    ]
+
+    instance = models.ForeignKey(OdooInstance, on_delete=models.CASCADE, related_name="backups")
+    log = models.ForeignKey(DeploymentLog, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="IN_PROGRESS")
+    path = models.CharField(max_length=500, blank=True, help_text="Backup directory on the backup store")
+    odoo_version = models.CharField(max_length=20)
+    db_size_bytes = models.BigIntegerField(default=0)
+    db_sha256 = models.CharField(max_length=64, blank=True)
+    filestore_size_bytes = models.BigIntegerField(default=0)
+    filestore_sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def size_bytes(self):
+        return self.db_size_bytes + self.filestore_size_bytes
+
+    def __str__(self):
+        return f"Backup {self.instance.name} {self.created_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class StorageUsage(models.Model):
+    STATE_CHOICES = [
+        ("OK", "Ok"),
+        ("WARNING", "Warning"),
+        ("EXCEEDED", "Exceeded"),
+    ]
+
+    instance = models.OneToOneField(OdooInstance, on_delete=models.CASCADE, related_name="storage_usage")
+    db_bytes = models.BigIntegerField(default=0)
+    filestore_bytes = models.BigIntegerField(default=0)
+    limit_bytes = models.BigIntegerField(default=0)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default="OK")
+    # {filestore sub-directory: [mtime_ns, bytes]} so unchanged directories are not rescanned
+    filestore_index = models.JSONField(default=dict)
+    measured_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def total_bytes(self):
+        return self.db_bytes + self.filestore_bytes
+
+    def __str__(self):
+        return f"{self.instance.name}: {self.total_bytes} / {self.limit_bytes} ({self.state})"
+
+
+class TenantUsageSnapshot(models.Model):
+    """Daily usage read from the tenant database (manage.py collect_tenant_usage)."""
+
+    instance = models.ForeignKey(OdooInstance, on_delete=models.CASCADE, related_name="usage_snapshots")
+    date = models.DateField()
+    active_users = models.IntegerField(default=0, help_text="Active internal (non-portal) users")
+    companies = models.IntegerField(default=0)
+    records = models.BigIntegerField(default=0, help_text="Live rows over all tables (pg_stat estimate)")
+    max_users = models.IntegerField(default=0, help_text="Plan limit when the snapshot was taken")
+    over_users = models.BooleanField(default=False)
+    collected_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["instance", "date"], name="unique_usage_snapshot_per_day"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "over_users"]),
+        ]
+
+    def __str__(self):
+        return f"{self.instance.name} {self.date}: {self.active_users}/{self.max_users} users"
+
+
+class PlanRollout(models.Model):
+    """Propagation of a plan change to the instances governed by the plan (see instances/rollouts.py)."""
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("SUCCESS", "Success"),
+        ("PARTIAL", "Partial - some instances failed"),
+        ("ABORTED", "Aborted"),
+    ]
+
+    plan = models.ForeignKey("billing.Plan", on_delete=models.CASCADE, related_name="rollouts")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    changes = models.JSONField(default=list, blank=True, help_text="Plan fields that changed")
+    canary_size = models.PositiveIntegerField(default=1)
+    batch_size = models.PositiveIntegerField(default=10)
+    concurrency = models.PositiveIntegerField(default=4)
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
     def __str__(self):
-        return f"{self.action} - {self.instance.name} ({self.status})"
+        return f"Rollout {self.plan.name} #{self.pk} ({self.status})"
 
+
+class PlanRolloutTarget(models.Model):
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("SUCCESS", "Success"),
+        ("FAILED", "Failed"),
+        ("SKIPPED", "Skipped"),
+    ]
+
+    rollout = models.ForeignKey(PlanRollout, on_delete=models.CASCADE, related_name="targets")
+    instance = models.ForeignKey(OdooInstance, on_delete=models.CASCADE, related_name="rollout_targets")
+    wave = models.PositiveIntegerField(default=0, help_text="0 = canary")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    actions = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["wave", "id"]
+        constraints = [
+            models.UniqueConstraint(fields=["rollout", "instance"], name="unique_rollout_target"),
+        ]
+
+    def __str__(self):
+        return f"{self.instance.name} wave {self.wave} ({self.status})"
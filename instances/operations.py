@@ -0,0 +1,35 @@
+"""
+One data operation (backup, restore, Odoo version upgrade) per instance at a time.
+
+They share the instance status, the filestore volume and the staged
+``<db>_restore`` database, so a new one is refused while the DeploymentLog of
+another is IN_PROGRESS. The check and the new log are written under a row
+lock on the instance: two concurrent requests cannot both get through.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from instances.models import DeploymentLog, OdooInstance
+
+
+class OperationInProgress(Exception):
+    pass
+
+
+def in_progress(instance):
+    # Rollout UPDATE logs only push files; version upgrades carry "to_version".
+    return DeploymentLog.objects.filter(instance=instance, status="IN_PROGRESS").filter(
+        Q(action__in=["BACKUP", "RESTORE"]) | Q(action="UPDATE", details__has_key="to_version")
+    )
+
+
+def begin(instance, action, user=None, details=None):
+    """Create the IN_PROGRESS DeploymentLog of ``action``, or raise OperationInProgress."""
+    with transaction.atomic():
+        OdooInstance.objects.select_for_update().get(pk=instance.pk)
+        running = in_progress(instance).first()
+        if running:
+            raise OperationInProgress(f"{running.get_action_display()} already in progress on {instance.name}")
+        return DeploymentLog.objects.create(
+            instance=instance, user=user, action=action, status="IN_PROGRESS", details=details or {},
+        )
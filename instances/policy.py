@@ -0,0 +1,73 @@
+"""
+Module policy pushed to running tenants.
+
+The allowed module set of the plan is written to
+``deployer/instances/<name>/addons/saas_policy.json``, which the tenant already
+sees as /mnt/extra-addons/saas_policy.json. saas_module_restriction stats that
+file on each check and re-parses it only when it changed, so a plan change
+reaches the tenant on its next request, without recreating the container.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from django.db.models import F, IntegerField, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from billing.models import Subscription
+from instances import runtime
+from instances.models import OdooInstance
+
+POLICY_FILENAME = "saas_policy.json"
+
+
+def policy_path(instance):
+    return runtime.instance_dir(instance.name) / "addons" / POLICY_FILENAME
+
+
+def build_policy(plan):
+    modules = sorted(set(plan.allowed_modules or []))
+    return {
+        # Content hash: pushing the same set again does not invalidate tenant caches.
+        "version": hashlib.sha1(json.dumps(modules).encode()).hexdigest()[:12],
+        "plan": plan.name,
+        "allowed_modules": modules,
+        "updated_at": timezone.now().isoformat(),
+    }
+
+
+def push_policy(instance, plan=None):
+    """Atomically write the policy file of ``instance``. Returns the policy version."""
+    policy = build_policy(plan or instance.get_plan())
+    path = policy_path(instance)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        current = json.loads(path.read_text())
+        if current.get("version") == policy["version"]:
+            return policy["version"]
+    except (OSError, ValueError):
+        pass
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".policy-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(policy, f, indent=2)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+    return policy["version"]
+
+
+def governed_instances(plan):
+    """
+    Live instances whose effective plan (see OdooInstance.get_plan) is ``plan``,
+    resolved in SQL. ``plan`` may also be a queryset of plan ids: any of them.
+    """
+    active_plan = Subscription.objects.filter(client=OuterRef("client"), status="ACTIVE").values("plan")[:1]
+    lookup = {"effective_plan_id__in": plan} if isinstance(plan, QuerySet) else {"effective_plan_id": plan.pk}
+    return (
+        OdooInstance.objects.exclude(status="DELETING")
+        .annotate(effective_plan_id=Coalesce(Subquery(active_plan), F("subscription__plan_id"), output_field=IntegerField()))
+        .filter(**lookup)
+    )
+
@@ -0,0 +1,182 @@
+"""
+Plan-driven resource profiles.
+
+Each Plan maps to cgroup limits for the tenant containers and to an odoo.conf
+tuned for them (multi-process workers, memory limits, db pool). Both are rendered
+next to the instance docker-compose.yml:
+
+    deployer/instances/<name>/docker-compose.override.yml  (merged by docker compose)
+    deployer/instances/<name>/config/odoo.conf              (mounted on /etc/odoo/odoo.conf)
+
+Small plans run the threaded server (workers = 0), which serves /websocket
+(bus, chat) on 8069 itself. In prefork mode Odoo serves it only on
+gevent_port (8072): the override then publishes it on the host port
+``instance.port + ODOO_GEVENT_PORT_OFFSET``, where the reverse proxy routes
+/websocket.
+
+Limits can be overridden per plan name with settings.RESOURCE_PROFILES.
+"""
+import math
+import re
+import subprocess
+from dataclasses import asdict, dataclass, replace
+
+from django.conf import settings
+
+from instances import runtime
+
+MB = 1024 * 1024
+GEVENT_PORT = 8072
+
+
+@dataclass(frozen=True)
+class ResourceProfile:
+    workers: int
+    max_cron_threads: int
+    limit_memory_soft_mb: int
+    limit_memory_hard_mb: int
+    db_maxconn: int
+    mem_limit_mb: int
+    cpus: float
+    pids_limit: int
+    db_mem_limit_mb: int
+
+
+def profile_for_plan(plan):
+    # Rule of thumb from the Odoo deployment guide: one worker per ~6 concurrent users.
+    # Up to 6 users the threaded server is enough (and needs no gevent port).
+    workers = math.ceil(plan.max_users / 6) + 1
+    workers = 0 if workers <= 2 else min(workers, 8)
+    max_cron_threads = 2 if workers >= 6 else 1
+    soft, hard = 640, 768
+    profile = ResourceProfile(
+        workers=workers,
+        max_cron_threads=max_cron_threads,
+        limit_memory_soft_mb=soft,
+        limit_memory_hard_mb=hard,
+        # Every process keeps its own pool: keep the sum under Postgres' max_connections (100).
+        db_maxconn=max(8, 96 // (workers + max_cron_threads + 1)),
+        mem_limit_mb=(workers + max_cron_threads) * soft + 512,
+        cpus=min(max(workers / 2, 1.0), 4.0),
+        pids_limit=256 + 64 * workers,
+        db_mem_limit_mb=512 + 128 * workers,
+    )
+    overrides = getattr(settings, "RESOURCE_PROFILES", {}).get(plan.name)
+    return replace(profile, **overrides) if overrides else profile
+
+
+def gevent_host_port(instance):
+    return instance.port + getattr(settings, "ODOO_GEVENT_PORT_OFFSET", 1000)
+
+
+def render_odoo_conf(profile: ResourceProfile):
+    lines = [
+        "[options]",
+        "addons_path = /mnt/extra-addons",
+        "data_dir = /var/lib/odoo",
+        f"workers = {profile.workers}",
+        f"max_cron_threads = {profile.max_cron_threads}",
+        f"limit_memory_soft = {profile.limit_memory_soft_mb * MB}",
+        f"limit_memory_hard = {profile.limit_memory_hard_mb * MB}",
+        "limit_time_cpu = 600",
+        "limit_time_real = 1200",
+        f"db_maxconn = {profile.db_maxconn}",
+    ]
+    if profile.workers:
+        # Prefork: /websocket and longpolling are only served by the gevent process
+        lines.append(f"gevent_port = {GEVENT_PORT}")
+    return "\n".join(lines + [""])
+
+
+def render_override(instance, profile: ResourceProfile):
+    name = instance.name
+    ports = f'\n    ports:\n      - "{gevent_host_port(instance)}:{GEVENT_PORT}"' if profile.workers else ""
+    return f"""services:
+  odoo_{name}:
+    mem_limit: {profile.mem_limit_mb}m
+    memswap_limit: {profile.mem_limit_mb}m
+    cpus: {profile.cpus}
+    pids_limit: {profile.pids_limit}
+    volumes:
+      - ./config/odoo.conf:/etc/odoo/odoo.conf:ro{ports}
+
+  db_{name}:
+    mem_limit: {profile.db_mem_limit_mb}m
+    memswap_limit: {profile.db_mem_limit_mb}m
+    pids_limit: 512
+"""
+
+
+def _write_if_changed(path, content):
+    """Write in place (keeps the inode, so bind mounts see it). Returns True if changed."""
+    if path.exists() and path.read_text() == content:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+
+def _published_ports(override):
+    return re.findall(r'^\s*- "(\d+:\d+)"$', override, re.MULTILINE)
+
+
+def render(instance, profile=None):
+    """Render the profile files for ``instance``. Returns what changed."""
+    profile = profile or profile_for_plan(instance.get_plan())
+    directory = runtime.instance_dir(instance.name)
+    override_path = directory / "docker-compose.override.yml"
+    is_new = not override_path.exists()
+    override = render_override(instance, profile)
+    previous = "" if is_new else override_path.read_text()
+    return {
+        "profile": profile,
+        "new": is_new,
+        "ports_changed": _published_ports(previous) != _published_ports(override),
+        "conf_changed": _write_if_changed(directory / "config" / "odoo.conf", render_odoo_conf(profile)),
+        "limits_changed": _write_if_changed(override_path, override),
+    }
+
+
+def apply(instance, profile=None):
+    """Render and apply the profile to a running instance with as few restarts as possible."""
+    changes = render(instance, profile)
+    profile = changes["profile"]
+    directory = runtime.instance_dir(instance.name)
+    actions = []
+
+    if changes["new"] or changes["ports_changed"]:
+        # First profile for a tenant deployed without one, or the gevent port
+        # appears / goes away (threaded <-> prefork): mounts and ports need a recreate.
+        subprocess.run(["docker", "compose", "up", "-d"], cwd=directory, check=True, capture_output=True)
+        actions.append("recreate")
+        return {"actions": actions, "profile": asdict(profile)}
+
+    if changes["limits_changed"]:
+        # cgroup limits are changed live, without a restart.
+        subprocess.run(
+            [
+                "docker", "update",
+                "--memory", f"{profile.mem_limit_mb}m", "--memory-swap", f"{profile.mem_limit_mb}m",
+                "--cpus", str(profile.cpus), "--pids-limit", str(profile.pids_limit),
+                runtime.odoo_container(instance),
+            ],
+            check=True, capture_output=True,
+        )
+        subprocess.run(
+            [
+                "docker", "update",
+                "--memory", f"{profile.db_mem_limit_mb}m", "--memory-swap", f"{profile.db_mem_limit_mb}m",
+                runtime.db_container(instance),
+            ],
+            check=True, capture_output=True,
+        )
+        actions.append("update_limits")
+
+    if changes["conf_changed"]:
+        # Only the Odoo process reads odoo.conf; the database keeps running.
+        subprocess.run(["docker", "restart", runtime.odoo_container(instance)], check=True, capture_output=True)
+        actions.append("restart_odoo")
+
+    return {"actions": actions, "profile": asdict(profile)}
+
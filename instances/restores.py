@@ -0,0 +1,201 @@
+"""
+Restore an Odoo instance from a Backup.
+
+The dump is restored into a side database with ``pg_restore -j`` while the
+filestore archive is unpacked next to the live one. Nothing touches the live
+data until both are ready and the checksums matched; the swap itself is a pair
+of renames, so the instance is only down for a few seconds.
+"""
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+from instances import operations, runtime
+from instances.backups import file_sha256
+from instances.models import DeploymentLog
+
+_restore_slots = threading.BoundedSemaphore(getattr(settings, "RESTORE_MAX_CONCURRENCY", 2))
+
+
+class RestoreError(Exception):
+    pass
+
+
+def _run(cmd, **kwargs):
+    result = subprocess.run(cmd, capture_output=True, text=True, **kwargs)
+    if result.returncode != 0:
+        raise RestoreError(result.stderr.strip() or f"{' '.join(cmd[:3])} exited with {result.returncode}")
+    return result.stdout
+
+
+def _volume_shell(instance, script, stdin=None):
+    cmd = [
+        "docker", "run", "--rm", "-i",
+        "-v", f"{runtime.filestore_volume(instance)}:/data",
+        getattr(settings, "BACKUP_HELPER_IMAGE", "alpine:3"),
+        "sh", "-c", script,
+    ]
+    result = subprocess.run(cmd, stdin=stdin, capture_output=True)
+    if result.returncode != 0:
+        raise RestoreError(result.stderr.decode(errors="replace").strip())
+
+
+def check_backup(instance, backup):
+    """A dump only restores into the Odoo major version it was taken from."""
+    if backup.odoo_version != instance.odoo_version:
+        raise RestoreError(
+            f"Backup was taken on Odoo {backup.odoo_version}, the instance runs Odoo {instance.odoo_version}"
+        )
+
+
+def verify_backup(backup):
+    """Check both archives against the checksums recorded at backup time."""
+    path = Path(backup.path)
+    expected = {"db.dump": backup.db_sha256, "filestore.tar.gz": backup.filestore_sha256}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        actual = dict(zip(expected, pool.map(lambda name: file_sha256(path / name), expected)))
+    for name, digest in expected.items():
+        if actual[name] != digest:
+            raise RestoreError(f"Checksum mismatch for {name}")
+
+
+def restore_database(instance, dump_path, target_db, jobs):
+    container = runtime.db_container(instance)
+    user = runtime.db_user(instance)
+    names = {"db": target_db, "owner": user}
+    runtime.psql(instance, 'DROP DATABASE IF EXISTS :"db"', variables=names)
+    runtime.psql(instance, 'CREATE DATABASE :"db" OWNER :"owner"', variables=names)
+    # pg_restore -j needs a seekable file, so the dump is copied into the container first.
+    remote_dump = f"/tmp/{target_db}.dump"
+    _run(["docker", "cp", str(dump_path), f"{container}:{remote_dump}"])
+    try:
+        _run([
+            "docker", "exec", container,
+            "pg_restore", "-U", user, "-d", target_db, "-j", str(jobs), "--no-owner", remote_dump,
+        ])
+    finally:
+        subprocess.run(["docker", "exec", container, "rm", "-f", remote_dump], capture_output=True)
+
+
+def unpack_filestore(instance, archive_path):
+    with open(archive_path, "rb") as archive:
+        _volume_shell(
+            instance,
+            "rm -rf /data/.restore && mkdir -p /data/.restore && tar -xzf - -C /data/.restore",
+            stdin=archive,
+        )
+
+
+def swap_in(instance, staged_db):
+    """Replace the live database and filestore with the staged copies."""
+    db = instance.db_name
+    old_db = f"{db}_pre_restore"
+    names = {"db": db, "old_db": old_db, "staged_db": staged_db}
+    subprocess.run(["docker", "stop", runtime.odoo_container(instance)], capture_output=True)
+    runtime.psql(instance, 'DROP DATABASE IF EXISTS :"old_db"', variables=names)
+    runtime.psql(
+        instance,
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+        "WHERE datname IN (:'db', :'staged_db') AND pid <> pg_backend_pid()",
+        variables=names,
+    )
+    runtime.psql(
+        instance,
+        'BEGIN;\nALTER DATABASE :"db" RENAME TO :"old_db";\nALTER DATABASE :"staged_db" RENAME TO :"db";\nCOMMIT;',
+        variables=names,
+    )
+    _volume_shell(
+        instance,
+        "rm -rf /data/filestore.pre_restore"
+        " && if [ -d /data/filestore ]; then mv /data/filestore /data/filestore.pre_restore; fi"
+        " && if [ -d /data/.restore/filestore ]; then mv /data/.restore/filestore /data/filestore; fi"
+        " && rm -rf /data/.restore",
+    )
+    _run(["docker", "start", runtime.odoo_container(instance)])
+    # The previous copies are only needed if the swap itself failed.
+    runtime.psql(instance, 'DROP DATABASE IF EXISTS :"old_db"', variables=names)
+    _volume_shell(instance, "rm -rf /data/filestore.pre_restore")
+
+
+def run_restore(instance, backup, log: DeploymentLog = None, jobs=None):
+    """Restore ``backup`` into ``instance``. Returns the phase timings in seconds."""
+    jobs = jobs or getattr(settings, "RESTORE_JOBS", 4)
+    staged_db = f"{instance.db_name}_restore"
+    phases = {}
+    swapping = False
+    start = time.monotonic()
+
+    def timed(name, fn, *args):
+        t0 = time.monotonic()
+        result = fn(*args)
+        phases[name] = round(time.monotonic() - t0, 2)
+        return result
+
+    with _restore_slots:
+        try:
+            check_backup(instance, backup)
+            timed("verify", verify_backup, backup)
+            instance.status = "DEPLOYING"
+            instance.save()
+
+            path = Path(backup.path)
+            # Database and filestore are staged concurrently.
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                db_future = pool.submit(
+                    timed, "pg_restore", restore_database, instance, path / "db.dump", staged_db, jobs
+                )
+                fs_future = pool.submit(timed, "filestore", unpack_filestore, instance, path / "filestore.tar.gz")
+                db_future.result()
+                fs_future.result()
+
+            swapping = True
+            timed("swap", swap_in, instance, staged_db)
+
+            instance.status = "RUNNING"
+            instance.save()
+            if log:
+                log.status = "SUCCESS"
+                log.duration_seconds = int(time.monotonic() - start)
+                log.details.update({"backup_id": backup.id, "jobs": jobs, "phases": phases})
+                log.save()
+        except Exception as e:
+            # Staged copies are discarded; the live data was not touched before the swap.
+            try:
+                runtime.psql(instance, 'DROP DATABASE IF EXISTS :"db"', variables={"db": staged_db})
+                _volume_shell(instance, "rm -rf /data/.restore")
+            except Exception:
+                pass
+            instance.status = "ERROR" if swapping else "RUNNING"
+            instance.save()
+            if log:
+                log.status = "FAILED"
+                log.error_message = str(e)
+                log.duration_seconds = int(time.monotonic() - start)
+                log.details.update({"backup_id": backup.id, "jobs": jobs, "phases": phases})
+                log.save()
+            raise
+    return phases
+
+
+def start_restore(instance, backup, user=None, jobs=None):
+    """
+    Run the restore in a background thread and return its DeploymentLog.
+
+    Raises RestoreError for a backup of another Odoo version and
+    operations.OperationInProgress while a backup, restore or upgrade runs.
+    """
+    check_backup(instance, backup)
+    log = operations.begin(instance, "RESTORE", user=user, details={"name": instance.name, "backup_id": backup.id})
+
+    def target():
+        try:
+            run_restore(instance, backup, log=log, jobs=jobs)
+        except Exception:
+            pass  # already recorded on the log
+
+    threading.Thread(target=target).start()
+    return log
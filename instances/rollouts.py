@@ -0,0 +1,149 @@
+"""
+Fleet-wide propagation of plan changes.
+
+Editing a plan creates a PlanRollout listing every instance currently governed
+by it. The rollout runs in a background thread, in waves: a canary wave first
+(any failure aborts the rollout), then batches applied with bounded
+parallelism. A batch wave failing above ROLLOUT_MAX_FAILURE_RATIO also aborts.
+For each instance the module policy is pushed, then the resource profile is
+applied (running instances only).
+
+A newer rollout of the same plan aborts the older one: its pending instances
+are covered by the new rollout anyway.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from instances import policy, resources
+from instances.models import DeploymentLog, PlanRollout, PlanRolloutTarget
+
+# Plan fields that have an effect on running instances.
+ROLLOUT_FIELDS = ("allowed_modules", "max_users", "storage_limit_gb", "odoo_version")
+
+
+def changed_fields(before, plan):
+    return [name for name in ROLLOUT_FIELDS if before.get(name) != getattr(plan, name)]
+
+
+def create_rollout(plan, user=None, changes=()):
+    """Create the rollout and its targets, grouped in waves. Does not run it."""
+    PlanRollout.objects.filter(plan=plan, status__in=["PENDING", "RUNNING"]).update(
+        status="ABORTED", error_message="Superseded by a newer rollout", finished_at=timezone.now()
+    )
+    rollout = PlanRollout.objects.create(
+        plan=plan,
+        user=user,
+        changes=list(changes),
+        canary_size=getattr(settings, "ROLLOUT_CANARY_SIZE", 1),
+        batch_size=max(getattr(settings, "ROLLOUT_BATCH_SIZE", 10), 1),
+        concurrency=max(getattr(settings, "ROLLOUT_CONCURRENCY", 4), 1),
+    )
+
+    instances = list(policy.governed_instances(plan).order_by("id"))
+    # Canary on running instances first: stopped ones would not exercise the docker side.
+    instances.sort(key=lambda i: i.status != "RUNNING")
+    targets = []
+    for position, instance in enumerate(instances):
+        if position < rollout.canary_size:
+            wave = 0
+        else:
+            wave = 1 + (position - rollout.canary_size) // rollout.batch_size
+        targets.append(PlanRolloutTarget(rollout=rollout, instance=instance, wave=wave))
+    PlanRolloutTarget.objects.bulk_create(targets)
+    rollout.total = len(targets)
+    rollout.save(update_fields=["total"])
+    return rollout
+
+
+def apply_target(target):
+    """Push the plan to one instance. Runs in a worker thread."""
+    instance = target.instance
+    plan = target.rollout.plan
+    log = DeploymentLog.objects.create(
+        instance=instance,
+        user=target.rollout.user,
+        action="UPDATE",
+        status="IN_PROGRESS",
+        details={"rollout": target.rollout_id, "plan": plan.name},
+    )
+    target.status = "RUNNING"
+    target.started_at = timezone.now()
+    target.save(update_fields=["status", "started_at"])
+    try:
+        actions = {"policy": policy.push_policy(instance, plan)}
+        if instance.status == "RUNNING":
+            actions.update(resources.apply(instance))
+        else:
+            # Files only: the new profile is used at the next start.
+            resources.render(instance)
+            actions["actions"] = ["render"]
+        if instance.odoo_version != plan.odoo_version:
+            # Database migrations are not part of a rollout: see manage.py upgrade_instances --plan.
+            actions["upgrade_required"] = plan.odoo_version
+        target.actions = actions
+        target.status = log.status = "SUCCESS"
+        log.details.update(actions)
+    except Exception as e:
+        target.status = log.status = "FAILED"
+        target.error_message = log.error_message = str(e)
+    finally:
+        target.finished_at = timezone.now()
+        target.save(update_fields=["status", "actions", "error_message", "finished_at"])
+        log.duration_seconds = int((target.finished_at - target.started_at).total_seconds())
+        log.save()
+        connection.close()
+    return target
+
+
+def run_rollout(rollout):
+    rollout.status = "RUNNING"
+    rollout.started_at = timezone.now()
+    rollout.save(update_fields=["status", "started_at"])
+    max_failure_ratio = getattr(settings, "ROLLOUT_MAX_FAILURE_RATIO", 0.5)
+
+    waves = sorted(set(rollout.targets.values_list("wave", flat=True)))
+    with ThreadPoolExecutor(max_workers=rollout.concurrency) as pool:
+        for wave in waves:
+            rollout.refresh_from_db(fields=["status"])
+            if rollout.status == "ABORTED":
+                break
+            targets = list(rollout.targets.filter(wave=wave, status="PENDING").select_related("instance", "rollout__plan"))
+            results = list(pool.map(apply_target, targets))
+            failed = sum(1 for t in results if t.status == "FAILED")
+            rollout.succeeded += len(results) - failed
+            rollout.failed += failed
+            rollout.save(update_fields=["succeeded", "failed"])
+
+            if failed and (wave == 0 or failed / len(results) > max_failure_ratio):
+                rollout.status = "ABORTED"
+                rollout.error_message = f"{'Canary' if wave == 0 else f'Wave {wave}'}: {failed}/{len(results)} instances failed"
+                rollout.save(update_fields=["status", "error_message"])
+                break
+
+    # A newer rollout may have aborted this one meanwhile.
+    rollout.refresh_from_db(fields=["status", "error_message"])
+    rollout.targets.filter(status="PENDING").update(status="SKIPPED")
+    if rollout.status != "ABORTED":
+        rollout.status = "PARTIAL" if rollout.failed else "SUCCESS"
+    rollout.finished_at = timezone.now()
+    rollout.save(update_fields=["status", "error_message", "finished_at"])
+    return rollout
+
+
+def start_rollout(plan, user=None, changes=()):
+    """Create the rollout and run it in the background. Returns the rollout."""
+    rollout = create_rollout(plan, user=user, changes=changes)
+
+    def run():
+        try:
+            run_rollout(rollout)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return rollout
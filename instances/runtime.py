@@ -0,0 +1,108 @@
+"""
+Naming and shell helpers shared by the instance pipelines.
+Names mirror what deployer/deploy-instance.sh renders in docker-compose.yml.
+"""
+import re
+import subprocess
+
+from django.conf import settings
+
+
+DEPLOYER_DIR = settings.BASE_DIR / "deployer"
+
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+COMPOSE_VOLUME_LABEL = "com.docker.compose.volume"
+
+# Instance names double as Postgres user/database and docker names
+NAME_RE = re.compile(r"[a-z0-9_]+")
+DOMAIN_RE = re.compile(r"(?=.{1,253}\Z)([a-z0-9]([a-z0-9\-]{0,61}[a-z0-9])?\.)*[a-z0-9]([a-z0-9\-]{0,61}[a-z0-9])?")
+
+
+class VolumeNotFound(RuntimeError):
+    pass
+
+
+def check_name(name):
+    if not NAME_RE.fullmatch(name or ""):
+        raise ValueError(f"Invalid instance name {name!r}: lowercase letters, digits and _ only")
+    return name
+
+
+def script_path(script):
+    return str(DEPLOYER_DIR / script)
+
+
+def instance_dir(name):
+    return DEPLOYER_DIR / "instances" / name
+
+
+def odoo_container(instance):
+    return instance.container_name or f"odoo_{instance.name}"
+
+
+def db_container(instance):
+    return f"odoo_db_{instance.name}"
+
+
+def db_user(instance):
+    # POSTGRES_USER is the instance name (see deploy-instance.sh)
+    return instance.name
+
+
+def compose_project(instance):
+    # Compose project = instance directory name, lowercased by compose
+    return instance.name.lower()
+
+
+def compose_volume(instance, key):
+    """
+    Docker name of the ``key`` volume of the instance's compose file.
+
+    Compose prefixes volumes with the project name; the name is resolved from
+    its labels rather than rebuilt, since ``docker run -v <missing>:...``
+    would silently create an empty volume.
+    """
+    result = subprocess.run(
+        [
+            "docker", "volume", "ls", "-q",
+            "--filter", f"label={COMPOSE_PROJECT_LABEL}={compose_project(instance)}",
+            "--filter", f"label={COMPOSE_VOLUME_LABEL}={key}",
+        ],
+        capture_output=True, text=True,
+    )
+    names = result.stdout.split()
+    if result.returncode != 0 or not names:
+        raise VolumeNotFound(f"Volume {key} of instance {instance.name} not found")
+    return names[0]
+
+
+def filestore_volume(instance):
+    return compose_volume(instance, f"{instance.name}_data")
+
+
+def db_volume(instance):
+    return compose_volume(instance, f"{instance.name}_db_data")
+
+
+def psql(instance, sql, database="postgres", timeout=None, variables=None):
+    """
+    Run SQL inside the tenant's Postgres container and return stdout.
+
+    Values from the database go through ``variables`` and are referenced as
+    :'name' (literal) or :"name" (identifier) in ``sql``, never formatted in.
+    psql only interpolates them in a script, so the SQL is then sent on stdin.
+    """
+    command = ["docker", "exec", "-i", db_container(instance), "psql", "-U", db_user(instance), "-d", database,
+               "-v", "ON_ERROR_STOP=1", "-At"]
+    for name, value in (variables or {}).items():
+        command += ["-v", f"{name}={value}"]
+    if variables:
+        command += ["-f", "-"]
+    else:
+        command += ["-c", sql]
+    result = subprocess.run(
+        command, input=sql if variables else None, capture_output=True, text=True, timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"psql exited with {result.returncode}")
+    return result.stdout.strip()
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from instances.models import OdooInstance, DeploymentLog
+from instances import runtime
+from instances.models import OdooInstance, DeploymentLog, Backup, StorageUsage, PlanRollout, PlanRolloutTarget, TenantUsageSnapshot
 
 
 class OdooInstanceSerializer(serializers.ModelSerializer):
@@ -24,9 +25,20 @@ class OdooInstanceSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def validate_name(self, value):
+        try:
+            return runtime.check_name(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate_domain(self, value):
+        value = value.strip().lower()
+        if not runtime.DOMAIN_RE.fullmatch(value):
+            raise serializers.ValidationError(f"Invalid domain {value!r}")
+        return value
+
 
 class DeploymentLogSerializer(serializers.ModelSerializer):
-    instance_name = serializers.CharField(source="instance.name", read_only=True)
     user_username = serializers.CharField(source="user.username", read_only=True, allow_null=True)
     action_display = serializers.CharField(source="get_action_display", read_only=True)
     status_display = serializers.CharField(source="get_status_display", read_only=True)
@@ -34,5 +46,55 @@ class DeploymentLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = DeploymentLog
         fields = "__all__"
-        read_only_fields = ["timestamp"]
+        read_only_fields = ["timestamp", "instance_name"]
+
+
+
+class BackupSerializer(serializers.ModelSerializer):
+    instance_name = serializers.CharField(source="instance.name", read_only=True)
+    size_bytes = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Backup
+        fields = "__all__"
+        read_only_fields = [f.name for f in Backup._meta.fields]
+
+
+class StorageUsageSerializer(serializers.ModelSerializer):
+    total_bytes = serializers.IntegerField(read_only=True)
+    usage_percent = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StorageUsage
+        exclude = ["filestore_index"]
+
+    def get_usage_percent(self, obj):
+        if not obj.limit_bytes:
+            return None
+        return round(100 * obj.total_bytes / obj.limit_bytes, 1)
+
+
+class TenantUsageSnapshotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TenantUsageSnapshot
+        exclude = ["instance"]
+
+
+class PlanRolloutTargetSerializer(serializers.ModelSerializer):
+    instance_name = serializers.CharField(source="instance.name", read_only=True)
+
+    class Meta:
+        model = PlanRolloutTarget
+        exclude = ["rollout"]
+
+
+class PlanRolloutSerializer(serializers.ModelSerializer):
+    plan_name = serializers.CharField(source="plan.name", read_only=True)
+
+    class Meta:
+        model = PlanRollout
+        fields = "__all__"
+
 
+class PlanRolloutDetailSerializer(PlanRolloutSerializer):
+    targets = PlanRolloutTargetSerializer(many=True, read_only=True)
@@ -0,0 +1,35 @@
+import threading
+
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from billing.models import Subscription
+from instances import policy, suspension
+
+
+@receiver(post_save, sender=Subscription)
+def push_policy_on_activation(sender, instance, **kwargs):
+    """A newly active subscription may change the plan of all the client's instances."""
+    if instance.status != "ACTIVE":
+        return
+    for odoo_instance in instance.client.instances.exclude(status="DELETING"):
+        try:
+            policy.push_policy(odoo_instance, instance.plan)
+        except OSError:
+            pass
+
+
+@receiver(post_save, sender=Subscription)
+def resume_on_activation(sender, instance, **kwargs):
+    """Restart the instances suspended for non-payment without waiting for the next billing cycle."""
+    if instance.status != "ACTIVE" or not suspension.instances_to_resume(instance.client).exists():
+        return
+
+    def run():
+        try:
+            suspension.resume_paid(client=instance.client)
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=run).start())
@@ -0,0 +1,188 @@
+"""
+Storage accounting against Plan.storage_limit_gb.
+
+Database size comes from ``pg_database_size``. The filestore is content
+addressed (``filestore/<db>/<xx>/<sha1>``) and its files are never modified in
+place, so a sub-directory whose mtime did not change since the last pass keeps
+its cached size; only touched directories are rescanned.
+
+When the Docker data root is not readable from the backend, the same
+incremental scan runs in a helper container.
+
+``storage_quota_warning`` / ``storage_quota_exceeded`` are sent when an instance
+enters the WARNING / EXCEEDED state. With STORAGE_QUOTA_ENFORCE the instance is
+stopped when it exceeds its quota; measure_storage keeps measuring it (its
+filestore) and ``recheck`` re-applies the current plan limit on start, so it
+can leave the EXCEEDED state.
+"""
+import os
+import subprocess
+
+from django.conf import settings
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from instances import runtime
+from instances.models import StorageUsage, DeploymentLog
+
+GB = 1024 ** 3
+
+storage_quota_warning = Signal()  # sender=StorageUsage, usage=...
+storage_quota_exceeded = Signal()
+
+
+def database_size(instance):
+    return int(runtime.psql(instance, "SELECT pg_database_size(current_database())", database=instance.db_name))
+
+
+def _volume_mountpoint(instance):
+    result = subprocess.run(
+        ["docker", "volume", "inspect", "--format", "{{.Mountpoint}}", runtime.filestore_volume(instance)],
+        capture_output=True, text=True,
+    )
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def _dir_size(path):
+    total = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                total += entry.stat(follow_symlinks=False).st_size
+            elif entry.is_dir(follow_symlinks=False):
+                total += _dir_size(entry.path)
+    return total
+
+
+def scan_filestore(root, index):
+    """Size of ``root``, rescanning only the sub-directories whose mtime changed."""
+    total = 0
+    new_index = {}
+    if not os.path.isdir(root):
+        return 0, new_index
+    with os.scandir(root) as entries:
+        for entry in entries:
+            st = entry.stat(follow_symlinks=False)
+            if not entry.is_dir(follow_symlinks=False):
+                total += st.st_size
+                continue
+            cached = index.get(entry.name)
+            size = cached[1] if cached and cached[0] == st.st_mtime_ns else _dir_size(entry.path)
+            new_index[entry.name] = [st.st_mtime_ns, size]
+            total += size
+    return total, new_index
+
+
+def filestore_size(instance, index):
+    mountpoint = _volume_mountpoint(instance)
+    root = os.path.join(mountpoint, "filestore", instance.db_name) if mountpoint else ""
+    if root and os.access(mountpoint, os.R_OK | os.X_OK):
+        return scan_filestore(root, index)
+
+    # Docker data root not readable from here: same incremental scan, in a helper container.
+    return scan_filestore_in_container(instance, index)
+
+
+# $1 is the database name. stdin holds the "<directory> <mtime>" pairs of the
+# index; directories still matching are reported as unchanged (S), the others
+# are measured with du (D), loose files by size (F).
+HELPER_SCAN_SCRIPT = (
+    'cat > /tmp/index; cd "/data/filestore/$1" 2>/dev/null || exit 0; '
+    'for e in *; do [ -e "$e" ] || continue; '
+    'if [ -d "$e" ]; then m=$(stat -c %Y "$e"); '
+    'if grep -qxF "$e $m" /tmp/index; then echo "S $m $e"; '
+    'else echo "D $m $(du -sk "$e" | cut -f1) $e"; fi; '
+    'else echo "F 0 $(stat -c %s "$e") $e"; fi; done'
+)
+
+
+def scan_filestore_in_container(instance, index):
+    known = "".join(f"{name} {entry[0] // 10 ** 9}\n" for name, entry in index.items())
+    result = subprocess.run(
+        [
+            "docker", "run", "--rm", "-i", "-v", f"{runtime.filestore_volume(instance)}:/data:ro",
+            getattr(settings, "BACKUP_HELPER_IMAGE", "alpine:3"),
+            "sh", "-c", HELPER_SCAN_SCRIPT, "scan-filestore", runtime.check_name(instance.db_name),
+        ],
+        input=known, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "filestore scan failed")
+    total = 0
+    new_index = {}
+    for line in result.stdout.splitlines():
+        kind, mtime, rest = line.split(" ", 2)
+        if kind == "S":
+            new_index[rest] = index[rest]
+            total += index[rest][1]
+            continue
+        size, name = rest.split(" ", 1)
+        if kind == "D":
+            size = int(size) * 1024
+            new_index[name] = [int(mtime) * 10 ** 9, size]
+        total += int(size)
+    return total, new_index
+
+
+def quota_state(usage):
+    warn_ratio = getattr(settings, "STORAGE_WARN_RATIO", 0.9)
+    if usage.limit_bytes and usage.total_bytes > usage.limit_bytes:
+        return "EXCEEDED"
+    if usage.limit_bytes and usage.total_bytes > usage.limit_bytes * warn_ratio:
+        return "WARNING"
+    return "OK"
+
+
+def recheck(usage):
+    """Re-evaluate the last measurement against the current plan limit (plan upgraded since)."""
+    usage.limit_bytes = usage.instance.get_plan().storage_limit_gb * GB
+    usage.state = quota_state(usage)
+    usage.save(update_fields=["limit_bytes", "state"])
+    return usage
+
+
+def measure(instance):
+    """Measure ``instance`` and update its StorageUsage row. Returns the row."""
+    usage, _ = StorageUsage.objects.get_or_create(instance=instance)
+    previous_state = usage.state
+
+    if instance.status == "RUNNING":
+        usage.db_bytes = database_size(instance)
+    # A stopped instance has no database container: its last database size is kept.
+    usage.filestore_bytes, usage.filestore_index = filestore_size(instance, usage.filestore_index)
+    usage.limit_bytes = instance.get_plan().storage_limit_gb * GB
+    usage.measured_at = timezone.now()
+    usage.state = quota_state(usage)
+    usage.save()
+
+    if usage.state != previous_state:
+        if usage.state == "WARNING":
+            storage_quota_warning.send(sender=StorageUsage, usage=usage)
+        elif usage.state == "EXCEEDED":
+            storage_quota_exceeded.send(sender=StorageUsage, usage=usage)
+    return usage
+
+
+@receiver(storage_quota_exceeded)
+def enforce_storage_quota(sender, usage, **kwargs):
+    if not getattr(settings, "STORAGE_QUOTA_ENFORCE", False):
+        return
+    instance = usage.instance
+    log = DeploymentLog.objects.create(
+        instance=instance,
+        action="STOP",
+        status="IN_PROGRESS",
+        details={"reason": "storage_quota_exceeded", "total_bytes": usage.total_bytes, "limit_bytes": usage.limit_bytes},
+    )
+    result = subprocess.run(
+        ["bash", runtime.script_path("manage-instances.sh"), "stop", instance.name],
+        capture_output=True, text=True,
+    )
+    if result.returncode == 0:
+        instance.status = "STOPPED"
+        instance.save()
+        log.status = "SUCCESS"
+    else:
+        log.status = "FAILED"
+        log.error_message = result.stderr
+    log.save()
@@ -0,0 +1,76 @@
+"""
+Suspend the running instances of clients without an ACTIVE subscription and
+resume them once a subscription is active again (run_billing_cycle, and
+right after an activation through instances.signals).
+
+Only RUNNING instances are suspended, so resuming never starts an instance
+its owner had stopped.
+"""
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from billing.models import Subscription
+from instances import runtime
+from instances.models import OdooInstance, DeploymentLog
+
+
+def _has_active_subscription():
+    return Exists(Subscription.objects.filter(client=OuterRef("client"), status="ACTIVE"))
+
+
+def instances_to_suspend():
+    return OdooInstance.objects.filter(status="RUNNING").exclude(_has_active_subscription())
+
+
+def instances_to_resume(client=None):
+    qs = OdooInstance.objects.filter(_has_active_subscription(), status="SUSPENDED")
+    return qs.filter(client=client) if client is not None else qs
+
+
+def _run(command, instance):
+    result = subprocess.run(
+        ["bash", runtime.script_path("manage-instances.sh"), command, instance.name],
+        capture_output=True, text=True,
+    )
+    return instance, result
+
+
+def _apply(instances, command, new_status, action, dry_run=False):
+    """Run ``command`` on every instance in parallel, then record the outcome in bulk. Returns (ok, failed)."""
+    instances = list(instances)
+    if dry_run or not instances:
+        return [i.name for i in instances], []
+
+    with ThreadPoolExecutor(max_workers=getattr(settings, "SUSPENSION_CONCURRENCY", 4)) as pool:
+        results = list(pool.map(lambda i: _run(command, i), instances))
+
+    ok = [instance for instance, result in results if result.returncode == 0]
+    failed = [(instance, result) for instance, result in results if result.returncode != 0]
+    OdooInstance.objects.filter(pk__in=[i.pk for i in ok]).update(status=new_status)
+    DeploymentLog.objects.bulk_create(
+        [
+            DeploymentLog(
+                instance=i, instance_name=i.name, action=action, status="SUCCESS", details={"reason": "billing"},
+            )
+            for i in ok
+        ]
+        + [
+            DeploymentLog(
+                instance=i, instance_name=i.name, action=action, status="FAILED", details={"reason": "billing"},
+                error_message=result.stderr,
+            )
+            for i, result in failed
+        ]
+    )
+    return [i.name for i in ok], [i.name for i, _ in failed]
+
+
+def suspend_unpaid(dry_run=False):
+    return _apply(instances_to_suspend(), "stop", "SUSPENDED", "STOP", dry_run=dry_run)
+
+
+def resume_paid(client=None, dry_run=False):
+    return _apply(instances_to_resume(client), "start", "RUNNING", "START", dry_run=dry_run)
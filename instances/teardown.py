@@ -0,0 +1,233 @@
+"""
+Instance teardown and orphan garbage collection.
+
+``remove`` only tombstones the row (status DELETING) and hands the work to
+``run_teardown`` in the background. ``collect_garbage`` is run periodically
+(manage.py gc_instances) to retry stuck tombstones and to reclaim containers,
+volumes and instance directories that no instance row owns anymore, once they
+are older than ``min_age`` (a deployment in progress is left alone).
+
+Compose lowercases project names, so resources are matched on the lowercased
+instance name.
+"""
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from instances import runtime
+from instances.models import OdooInstance, DeploymentLog
+from instances.runtime import COMPOSE_PROJECT_LABEL, COMPOSE_VOLUME_LABEL
+
+
+@dataclass
+class GCReport:
+    containers: list = field(default_factory=list)
+    volumes: list = field(default_factory=list)
+    directories: list = field(default_factory=list)
+    tombstones: list = field(default_factory=list)
+    freed_bytes: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _docker(*args):
+    try:
+        return subprocess.run(["docker", *args], capture_output=True, text=True)
+    except FileNotFoundError:
+        return subprocess.CompletedProcess(["docker", *args], 127, "", "docker: command not found")
+
+
+def tree_size(path):
+    total = 0
+    for root, _dirs, files in os.walk(path, onerror=lambda e: None):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def volume_size(volume):
+    result = _docker("volume", "inspect", "--format", "{{.Mountpoint}}", volume)
+    mountpoint = result.stdout.strip()
+    return tree_size(mountpoint) if result.returncode == 0 and mountpoint else 0
+
+
+def _parse_created(value):
+    """Docker creation time: "2026-01-02 03:04:05 +0000 UTC" (ps) or RFC 3339 (volume inspect)."""
+    try:
+        if value[10:11] == "T":
+            return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        return datetime.strptime(" ".join(value.split()[:3]), "%Y-%m-%d %H:%M:%S %z")
+    except ValueError:
+        return None
+
+
+def _is_old(created, cutoff):
+    # Unknown creation time: treated as young, never reaped.
+    return cutoff is None or (created is not None and created < cutoff)
+
+
+def list_instance_containers(min_age=None):
+    """{project: [container names]} for containers rendered by deploy-instance.sh, skipping young ones."""
+    result = _docker(
+        "ps", "-a", "--filter", f"label={COMPOSE_PROJECT_LABEL}",
+        "--format", f'{{{{.Names}}}}\t{{{{.Label "{COMPOSE_PROJECT_LABEL}"}}}}\t{{{{.CreatedAt}}}}',
+    )
+    cutoff = timezone.now() - min_age if min_age else None
+    containers = {}
+    for line in result.stdout.splitlines():
+        container, _, rest = line.partition("\t")
+        project, _, created = rest.partition("\t")
+        if container.lower() not in (f"odoo_{project}", f"odoo_db_{project}"):
+            continue
+        # A young container may belong to a deployment whose row is not committed yet.
+        if _is_old(_parse_created(created), cutoff):
+            containers.setdefault(project, []).append(container)
+    return containers
+
+
+def list_instance_volumes(min_age=None):
+    """{project: [volume names]} for the <name>_data / <name>_db_data volumes, skipping young ones."""
+    result = _docker(
+        "volume", "ls", "--filter", f"label={COMPOSE_PROJECT_LABEL}",
+        "--format",
+        f'{{{{.Name}}}}\t{{{{.Label "{COMPOSE_PROJECT_LABEL}"}}}}\t{{{{.Label "{COMPOSE_VOLUME_LABEL}"}}}}',
+    )
+    volumes = {}
+    for line in result.stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3:
+            continue
+        volume, project, key = parts
+        if key.lower() in (f"{project}_data", f"{project}_db_data"):
+            volumes.setdefault(project, []).append(volume)
+    if not min_age or not volumes:
+        return volumes
+
+    # `volume ls` has no creation time: one inspect for all of them.
+    names = [volume for project_volumes in volumes.values() for volume in project_volumes]
+    result = _docker("volume", "inspect", "--format", "{{.Name}}\t{{.CreatedAt}}", *names)
+    created = dict(line.partition("\t")[::2] for line in result.stdout.splitlines())
+    cutoff = timezone.now() - min_age
+    old = {
+        project: [v for v in project_volumes if _is_old(_parse_created(created.get(v, "")), cutoff)]
+        for project, project_volumes in volumes.items()
+    }
+    return {project: project_volumes for project, project_volumes in old.items() if project_volumes}
+
+
+def list_instance_dirs(min_age=None):
+    """{project: directory} for deployer/instances/<name>, skipping young directories."""
+    root = runtime.DEPLOYER_DIR / "instances"
+    if not root.exists():
+        return {}
+    cutoff = (timezone.now() - min_age).timestamp() if min_age else None
+    return {
+        d.name.lower(): d
+        for d in root.iterdir()
+        # A young directory may belong to a deployment whose row is not committed yet.
+        if d.is_dir() and (cutoff is None or d.stat().st_mtime < cutoff)
+    }
+
+
+def remove_resources(report: GCReport, containers=(), volumes=(), directory=None):
+    for container in containers:
+        if _docker("rm", "-f", container).returncode == 0:
+            report.containers.append(container)
+
+    for volume in volumes:
+        size = volume_size(volume)
+        result = _docker("volume", "rm", volume)
+        if result.returncode == 0:
+            report.volumes.append(volume)
+            report.freed_bytes += size
+        else:
+            report.errors.append(result.stderr.strip())
+
+    if directory is not None and directory.exists():
+        size = tree_size(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+        if directory.exists():
+            report.errors.append(f"could not remove {directory}")
+        else:
+            report.directories.append(str(directory))
+            report.freed_bytes += size
+
+
+def run_teardown(instance: OdooInstance, log: DeploymentLog = None):
+    """
+    Destroy everything the instance owns, then delete the tombstoned row.
+
+    The report goes to the DELETE log, which keeps the instance name and
+    survives the row (DeploymentLog.instance is SET_NULL).
+    """
+    report = GCReport()
+    start = timezone.now()
+    log = log or instance.deployment_logs.filter(action="DELETE").first() or DeploymentLog.objects.create(
+        instance=instance, action="DELETE", status="IN_PROGRESS", details={"name": instance.name},
+    )
+    try:
+        remove_resources(
+            report,
+            containers=[runtime.odoo_container(instance), runtime.db_container(instance)],
+            volumes=list_instance_volumes().get(instance.name.lower(), []),
+            directory=runtime.instance_dir(instance.name),
+        )
+    except Exception as e:
+        report.errors.append(str(e))
+
+    # The row stays DELETING on errors; gc_instances will retry.
+    log.status = "FAILED" if report.errors else "SUCCESS"
+    log.error_message = "\n".join(report.errors) or None
+    log.duration_seconds = int((timezone.now() - start).total_seconds())
+    log.details.update(
+        {
+            "freed_bytes": report.freed_bytes,
+            "containers": report.containers,
+            "volumes": report.volumes,
+            "directories": report.directories,
+        }
+    )
+    log.save()
+    if not report.errors:
+        instance.delete()
+    return report
+
+
+def collect_garbage(dry_run=False, min_age=timedelta(minutes=30)):
+    """Retry stuck tombstones and reclaim resources not owned by any instance row."""
+    report = GCReport()
+    cutoff = timezone.now() - min_age
+
+    for instance in OdooInstance.objects.filter(status="DELETING", updated_at__lt=cutoff):
+        report.tombstones.append(instance.name)
+        if not dry_run:
+            sub_report = run_teardown(instance)
+            report.freed_bytes += sub_report.freed_bytes
+            report.errors.extend(sub_report.errors)
+
+    known = {name.lower() for name in OdooInstance.objects.values_list("name", flat=True)}
+    containers = list_instance_containers(min_age)
+    volumes = list_instance_volumes(min_age)
+    directories = list_instance_dirs(min_age)
+
+    for project in sorted((set(containers) | set(volumes) | set(directories)) - known):
+        if dry_run:
+            report.containers.extend(containers.get(project, []))
+            report.volumes.extend(volumes.get(project, []))
+            if project in directories:
+                report.directories.append(str(directories[project]))
+                report.freed_bytes += tree_size(directories[project])
+            continue
+        remove_resources(
+            report,
+            containers=containers.get(project, []),
+            volumes=volumes.get(project, []),
+            directory=directories.get(project),
+        )
+    return report
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from billing.testing import make_admin, make_client, make_plan, make_subscription
+from instances import restores, rollouts, teardown, upgrades
+from instances.models import Backup, DeploymentLog, OdooInstance
+
+
+def make_instance(subscription, name="t", **fields):
+    fields = {"domain": f"{name}.localhost", "port": 9000, "db_name": name, "container_name": f"odoo_{name}", **fields}
+    return OdooInstance.objects.create(client_id=subscription.client_id, subscription=subscription, name=name, **fields)
+
+
+class CreateRolloutTest(TestCase):
+    def test_targets_resolved_in_sql(self):
+        small, large = make_plan("S"), make_plan("L", price=20)
+        for i in range(12):
+            client = make_client(f"owner{i}")
+            created_on = make_subscription(client, small, status="SUSPENDED")
+            if i % 3 == 0:  # moved to the large plan since
+                make_subscription(client, large, status="ACTIVE")
+            make_instance(created_on, f"t{i}", port=9000 + i)
+
+        with CaptureQueriesContext(connection) as queries:
+            rollout = rollouts.create_rollout(small)
+        self.assertEqual(rollout.total, 8)
+        self.assertLessEqual(len(queries), 6)
+        self.assertEqual(rollouts.create_rollout(large).total, 4)
+
+
+class TargetVersionTest(TestCase):
+    def test_version_checked_against_the_effective_plan(self):
+        client = make_client()
+        created_on = make_subscription(client, make_plan("S", odoo_version="17"), status="SUSPENDED")
+        make_subscription(client, make_plan("L", price=20, odoo_version="18"), status="ACTIVE")
+        instance = make_instance(created_on, odoo_version="17")
+
+        upgrades.check_target_version(instance, "18")
+        with self.assertRaises(upgrades.UpgradeError):
+            upgrades.check_target_version(instance, "19")
+
+
+class RestoreRequestTest(TestCase):
+    def setUp(self):
+        self.instance = make_instance(make_subscription(), odoo_version="18", status="RUNNING")
+        self.api = APIClient()
+        self.api.force_authenticate(make_admin())
+        # The restore thread finds a no-op: only the request handling is under test.
+        patcher = mock.patch.object(restores, "run_restore")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def restore(self, odoo_version="18"):
+        backup = Backup.objects.create(instance=self.instance, status="SUCCESS", odoo_version=odoo_version)
+        return self.api.post(f"/api/instances/{self.instance.pk}/restore/", {"backup": backup.pk}, format="json")
+
+    def test_backup_of_another_odoo_version_is_rejected(self):
+        self.assertEqual(self.restore(odoo_version="17").status_code, 400)
+        self.assertFalse(DeploymentLog.objects.filter(action="RESTORE").exists())
+
+    def test_one_operation_at_a_time(self):
+        self.assertEqual(self.restore().status_code, 202)
+        self.assertEqual(self.restore().status_code, 409)
+        self.assertEqual(self.api.post(f"/api/instances/{self.instance.pk}/backup/").status_code, 409)
+        self.assertEqual(DeploymentLog.objects.filter(status="IN_PROGRESS").count(), 1)
+
+
+class TeardownTest(TestCase):
+    def test_delete_log_outlives_the_instance(self):
+        instance = make_instance(make_subscription(), "teardown_t", status="DELETING")
+        with mock.patch.object(teardown, "_docker", return_value=mock.Mock(returncode=0, stdout="", stderr="")):
+            report = teardown.run_teardown(instance)
+
+        self.assertEqual(report.errors, [])
+        self.assertFalse(OdooInstance.objects.filter(name="teardown_t").exists())
+        log = DeploymentLog.objects.get(action="DELETE")
+        self.assertEqual((log.instance, log.instance_name, log.status), (None, "teardown_t", "SUCCESS"))
+        self.assertEqual(log.details["containers"], ["odoo_teardown_t", "odoo_db_teardown_t"])
@@ -0,0 +1,165 @@
+"""
+Odoo version upgrade of a running instance (DeploymentLog action UPDATE).
+
+snapshot -> swap image in docker-compose.yml -> migrate in a disposable
+container -> start -> health probe. Any failure after the snapshot rolls the
+compose file back and restores the snapshot.
+"""
+import re
+import shlex
+import subprocess
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+
+from instances import backups, operations, restores, runtime
+
+_upgrade_slots = threading.BoundedSemaphore(getattr(settings, "UPGRADE_MAX_CONCURRENCY", 2))
+
+DEFAULT_MIGRATION_COMMAND = "odoo -d {db} -u all --stop-after-init --no-http --workers=0"
+
+# "17" / "17.0": the only shape written into docker-compose.yml
+VERSION_RE = re.compile(r"\d+(\.\d+)?")
+
+
+class UpgradeError(Exception):
+    pass
+
+
+def _compose(instance, *args, check=True):
+    result = subprocess.run(
+        ["docker", "compose", *args],
+        cwd=runtime.instance_dir(instance.name), capture_output=True, text=True,
+    )
+    if check and result.returncode != 0:
+        raise UpgradeError(result.stderr.strip() or f"docker compose {args[0]} failed")
+    return result
+
+
+def _version_key(version):
+    major, _, minor = version.partition(".")
+    return int(major), int(minor or 0)
+
+
+def check_target_version(instance, version):
+    """Raise UpgradeError unless ``version`` is a newer Odoo version the instance's effective plan allows."""
+    if not VERSION_RE.fullmatch(version):
+        raise UpgradeError(f"Invalid Odoo version {version!r}")
+    if VERSION_RE.fullmatch(instance.odoo_version) and _version_key(version) <= _version_key(instance.odoo_version):
+        raise UpgradeError(f"Instance runs Odoo {instance.odoo_version}, cannot move to {version}")
+    plan_version = instance.get_plan().odoo_version or ""
+    if not VERSION_RE.fullmatch(plan_version) or _version_key(version) > _version_key(plan_version):
+        raise UpgradeError(f"Odoo {version} is not allowed by the plan (Odoo {plan_version or '?'})")
+
+
+def swap_image(instance, version):
+    """Point the Odoo service at ``odoo:<version>``. Returns the previous compose file."""
+    if not VERSION_RE.fullmatch(version):
+        raise UpgradeError(f"Invalid Odoo version {version!r}")
+    compose_file = runtime.instance_dir(instance.name) / "docker-compose.yml"
+    original = compose_file.read_text()
+    updated, count = re.subn(r"(image:\s*odoo:)[\w.\-]+", lambda m: m.group(1) + version, original)
+    if not count:
+        raise UpgradeError(f"No odoo image found in {compose_file}")
+    compose_file.write_text(updated)
+    return original
+
+
+def migrate(instance):
+    """Run the migration in a throw-away container of the new image."""
+    service = f"odoo_{instance.name}"
+    command = getattr(settings, "UPGRADE_MIGRATION_COMMAND", "") or DEFAULT_MIGRATION_COMMAND
+    _compose(instance, "stop", service)
+    _compose(instance, "pull", service)
+    _compose(instance, "run", "--rm", "--no-deps", service, *shlex.split(command.format(db=instance.db_name)))
+
+
+def wait_healthy(instance, timeout=None):
+    """Poll /web/health (Odoo >= 16), falling back to /web/login."""
+    timeout = timeout or getattr(settings, "UPGRADE_HEALTH_TIMEOUT", 180)
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        for path in ("/web/health", "/web/login"):
+            try:
+                with urllib.request.urlopen(f"http://localhost:{instance.port}{path}", timeout=5) as response:
+                    if response.status == 200:
+                        return
+            except Exception as e:
+                last_error = e
+        time.sleep(3)
+    raise UpgradeError(f"Instance not healthy after {timeout}s: {last_error}")
+
+
+def start_upgrade(instance, version, user=None):
+    """Create the UPDATE DeploymentLog (see operations.begin)."""
+    return operations.begin(
+        instance, "UPDATE", user=user, details={"from_version": instance.odoo_version, "to_version": version},
+    )
+
+
+def run_upgrade(instance, version, user=None, log=None):
+    """
+    Upgrade ``instance`` to ``version``. Returns the DeploymentLog.
+
+    Without ``log``, raises operations.OperationInProgress while a backup,
+    restore or upgrade runs on the instance.
+    """
+    log = log or start_upgrade(instance, version, user=user)
+    phases = {}
+    start = time.monotonic()
+    original_compose = None
+    backup = None
+
+    def timed(name, fn, *args):
+        t0 = time.monotonic()
+        result = fn(*args)
+        phases[name] = round(time.monotonic() - t0, 2)
+        return result
+
+    with _upgrade_slots:
+        try:
+            backup = timed("snapshot", backups.run_backup, backups.start_backup(instance, user=user, exclusive=False))
+            if backup.status != "SUCCESS":
+                raise UpgradeError("Snapshot failed, upgrade aborted")
+
+            instance.status = "DEPLOYING"
+            instance.save()
+            original_compose = timed("swap_image", swap_image, instance, version)
+            timed("migrate", migrate, instance)
+            timed("start", _compose, instance, "up", "-d")
+            timed("health", wait_healthy, instance)
+
+            instance.odoo_version = version
+            instance.status = "RUNNING"
+            instance.save()
+            log.status = "SUCCESS"
+        except Exception as e:
+            log.status = "FAILED"
+            log.error_message = str(e)
+            if original_compose is not None:
+                log.details["rollback"] = rollback(instance, original_compose, backup)
+        log.duration_seconds = int(time.monotonic() - start)
+        log.details.update({"phases": phases, "backup_id": backup.id if backup else None})
+        log.save()
+    return log
+
+
+def rollback(instance, original_compose, backup):
+    """Put the previous image back and restore the pre-upgrade snapshot."""
+    try:
+        (runtime.instance_dir(instance.name) / "docker-compose.yml").write_text(original_compose)
+        _compose(instance, "up", "-d")
+        restores.run_restore(instance, backup)
+        return "SUCCESS"
+    except Exception as e:
+        instance.status = "ERROR"
+        instance.save()
+        return f"FAILED: {e}"
+
+
+def last_upgrade_failed(instance, version):
+    log = instance.deployment_logs.filter(action="UPDATE", details__has_key="to_version").first()
+    return bool(log and log.status == "FAILED" and log.details.get("to_version") == version)
@@ -9,8 +9,14 @@ from rest_framework import permissions, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from instances.models import OdooInstance, DeploymentLog
-from instances.serializers import OdooInstanceSerializer, DeploymentLogSerializer
+from accounts.auth import client_id_for
+from billing.models import Subscription
+from instances import backups, clones, operations, policy, resources, restores, storage, teardown, upgrades
+from instances.models import OdooInstance, DeploymentLog, StorageUsage, PlanRollout
+from instances.serializers import (
+    OdooInstanceSerializer, DeploymentLogSerializer, BackupSerializer, StorageUsageSerializer, TenantUsageSnapshotSerializer,
+    PlanRolloutSerializer, PlanRolloutDetailSerializer,
+)
 
 
 class OdooInstanceViewSet(viewsets.ModelViewSet):
@@ -20,11 +26,12 @@ class OdooInstanceViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        client_id = client_id_for(user)
         qs = OdooInstance.objects.none()
         if user.is_staff:
             qs = OdooInstance.objects.all()
-        elif hasattr(user, "client_profile"):
-            qs = OdooInstance.objects.filter(client=user.client_profile)
+        elif client_id is not None:
+            qs = OdooInstance.objects.filter(client_id=client_id)
         
         # Sync status for the queryset
         self.sync_docker_status(qs)
@@ -56,6 +63,12 @@ class OdooInstanceViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def start(self, request, pk=None):
         instance = self.get_object()
+        usage = StorageUsage.objects.filter(instance=instance, state="EXCEEDED").first()
+        # The plan may have been upgraded since the last measurement
+        if getattr(settings, "STORAGE_QUOTA_ENFORCE", False) and usage and storage.recheck(usage).state == "EXCEEDED":
+            return Response({"error": "Storage quota exceeded"}, status=status.HTTP_403_FORBIDDEN)
+        if instance.status == "SUSPENDED" and not instance.client.subscriptions.filter(status="ACTIVE").exists():
+            return Response({"error": "No active subscription"}, status=status.HTTP_402_PAYMENT_REQUIRED)
         try:
             script_path = str(settings.BASE_DIR / "deployer" / "manage-instances.sh")
             subprocess.run(["bash", script_path, "start", instance.name], check=True)
@@ -91,41 +104,189 @@ class OdooInstanceViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"])
     def remove(self, request, pk=None):
+        """Tombstone the instance and tear it down in the background."""
         instance = self.get_object()
+        if instance.status == "DELETING":
+            return Response({"status": "Instance removal already in progress"}, status=status.HTTP_202_ACCEPTED)
+
+        instance.status = "DELETING"
+        instance.save()
+        log = DeploymentLog.objects.create(
+            instance=instance,
+            user=request.user,
+            action="DELETE",
+            status="IN_PROGRESS",
+            details={"name": instance.name},
+        )
+        thread = threading.Thread(target=teardown.run_teardown, args=(instance, log))
+        thread.start()
+        return Response({"status": "Instance removal scheduled"}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def usage(self, request, pk=None):
+        """Storage usage against the plan limit. ?refresh=1 measures now instead of returning the last pass."""
+        instance = self.get_object()
+        if request.query_params.get("refresh") and instance.status == "RUNNING":
+            try:
+                usage = storage.measure(instance)
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        else:
+            usage = getattr(instance, "storage_usage", None)
+            if usage is None:
+                return Response({"error": "Not measured yet"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(StorageUsageSerializer(usage).data)
+
+    @action(detail=True, methods=["get"], url_path="usage-history")
+    def usage_history(self, request, pk=None):
+        """Daily user/record snapshots (manage.py collect_tenant_usage), last ?days= days (default 30)."""
+        instance = self.get_object()
+        days = request.query_params.get("days", "30")
+        days = int(days) if days.isdigit() else 30
+        snapshots = instance.usage_snapshots.all()[:days]
+        return Response(TenantUsageSnapshotSerializer(snapshots, many=True).data)
+
+    @action(detail=True, methods=["get", "post"])
+    def backup(self, request, pk=None):
+        """GET: list the instance backups. POST: stream a new backup in the background."""
+        instance = self.get_object()
+        if request.method == "GET":
+            return Response(BackupSerializer(instance.backups.all(), many=True).data)
+
+        if instance.status != "RUNNING":
+            return Response(
+                {"error": "Instance must be running to be backed up"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         try:
-            script_path = str(settings.BASE_DIR / "deployer" / "manage-instances.sh")
-            # In manage-instances.sh it's 'remove' (3ème argument --force pour éviter la question interactive)
-            subprocess.run(["bash", script_path, "remove", instance.name, "--force"], check=True)
-            instance.delete()
-            return Response({"status": "Instance removed"})
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            backup = backups.start_backup(instance, user=request.user)
+        except operations.OperationInProgress as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        thread = threading.Thread(target=backups.run_backup, args=(backup,))
+        thread.start()
+        return Response(BackupSerializer(backup).data, status=status.HTTP_202_ACCEPTED)
 
-    def perform_create(self, serializer):
-        user = self.request.user
+    @action(detail=True, methods=["post"])
+    def clone(self, request, pk=None):
+        """Create a neutralized staging copy of the instance (body: name, domain)."""
+        source = self.get_object()
+        if source.status != "RUNNING":
+            return Response(
+                {"error": "Instance must be running to be cloned"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        if not hasattr(user, "client_profile"):
-            raise permissions.exceptions.PermissionDenied("User has no Client profile")
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # The clone counts against the plan's max_instances like any other instance
+        subscription = self.get_quota_subscription(source.client_id)
+        next_port = self.get_next_port()
 
-        client = user.client_profile
-        admin_password = get_random_string(12)
+        instance_name = serializer.validated_data["name"]
+        clone = serializer.save(
+            client=source.client,
+            subscription=subscription,
+            port=next_port,
+            db_name=instance_name,
+            container_name=f"odoo_{instance_name}",
+            admin_password=source.admin_password,
+            odoo_version=source.odoo_version,
+            status="CREATED",
+        )
+        DeploymentLog.objects.create(
+            instance=clone,
+            user=request.user,
+            action="CREATE",
+            status="IN_PROGRESS",
+            details={"name": instance_name, "domain": clone.domain, "port": next_port, "clone_of": source.name},
+        )
+
+        thread = threading.Thread(target=self.clone_instance, args=(source, clone, request.user))
+        thread.start()
+        return Response(self.get_serializer(clone).data, status=status.HTTP_202_ACCEPTED)
+
+    def clone_instance(self, source: OdooInstance, clone: OdooInstance, user=None):
+        self.deploy_instance(clone)
+        if clone.status == "RUNNING":
+            clones.copy_instance_data(source, clone, user=user)
+
+    @action(detail=True, methods=["post"])
+    def upgrade(self, request, pk=None):
+        """Upgrade to another Odoo version (body: odoo_version, defaults to the effective plan's version)."""
+        instance = self.get_object()
+        version = str(request.data.get("odoo_version") or instance.get_plan().odoo_version).strip()
+        try:
+            upgrades.check_target_version(instance, version)
+        except upgrades.UpgradeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if instance.status != "RUNNING":
+            return Response(
+                {"error": "Instance must be running to be upgraded"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            log = upgrades.start_upgrade(instance, version, user=request.user)
+        except operations.OperationInProgress as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        thread = threading.Thread(target=upgrades.run_upgrade, args=(instance, version, request.user, log))
+        thread.start()
+        return Response(DeploymentLogSerializer(log).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["post"])
+    def restore(self, request, pk=None):
+        """Restore the instance from one of its successful backups (body: {"backup": id})."""
+        instance = self.get_object()
+        backup = instance.backups.filter(pk=request.data.get("backup"), status="SUCCESS").first()
+        if not backup:
+            return Response({"error": "Backup not found"}, status=status.HTTP_404_NOT_FOUND)
+        if instance.status != "RUNNING":
+            return Response(
+                {"error": "Instance must be running to be restored"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
+        try:
+            log = restores.start_restore(instance, backup, user=request.user)
+        except restores.RestoreError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except operations.OperationInProgress as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(DeploymentLogSerializer(log).data, status=status.HTTP_202_ACCEPTED)
+
+    def get_quota_subscription(self, client_id):
+        """Return the client's active subscription if it allows one more instance."""
         # Règles métier: abonnement actif + limites de plan
-        subscription = client.subscriptions.filter(status="ACTIVE").first()
+        subscription = Subscription.objects.filter(client_id=client_id, status="ACTIVE").select_related("plan").first()
         if not subscription:
             raise permissions.exceptions.ParseError("No active subscription found for this client")
 
-        if client.instances.count() >= subscription.plan.max_instances:
+        if OdooInstance.objects.filter(client_id=client_id).exclude(status="DELETING").count() >= subscription.plan.max_instances:
             raise permissions.exceptions.ParseError(
                 f"Maximum instances limit reached ({subscription.plan.max_instances})"
             )
+        return subscription
 
+    def get_next_port(self):
         last_instance = OdooInstance.objects.order_by("-port").first()
-        next_port = 8070 if not last_instance else last_instance.port + 1
+        return 8070 if not last_instance else last_instance.port + 1
+
+    def perform_create(self, serializer):
+        user = self.request.user
+
+        client_id = client_id_for(user)
+        if client_id is None:
+            raise permissions.exceptions.PermissionDenied("User has no Client profile")
+
+        admin_password = get_random_string(12)
+
+        subscription = self.get_quota_subscription(client_id)
+        next_port = self.get_next_port()
 
         instance_name = serializer.validated_data["name"]
         instance = serializer.save(
-            client=client,
+            client_id=client_id,
             subscription=subscription,
             port=next_port,
             db_name=instance_name,
@@ -156,6 +317,11 @@ class OdooInstanceViewSet(viewsets.ModelViewSet):
 
             script_path = str(settings.BASE_DIR / "deployer" / "deploy-instance.sh")
 
+            # Limites cgroup + odoo.conf du plan (docker-compose.override.yml)
+            resources.render(instance)
+            # Politique de modules lue à chaud par saas_module_restriction
+            policy.push_policy(instance)
+
             # Tous les modules fonctionnels (Website, CRM, etc.) doivent être
             # installés manuellement par le client.
             # On installe toujours :
@@ -164,7 +330,8 @@ class OdooInstanceViewSet(viewsets.ModelViewSet):
             initial_modules = "base,web,saas_module_restriction"
 
             # ALLOWED_MODULES = liste complète des modules autorisés par le plan
-            allowed = instance.subscription.plan.allowed_modules or []
+            # (valeur de repli si saas_policy.json est absent)
+            allowed = instance.get_plan().allowed_modules or []
             allowed_csv = ",".join(allowed)
             cmd = [
                 "bash",
@@ -222,7 +389,25 @@ class DeploymentLogViewSet(viewsets.ReadOnlyModelViewSet):
 
         if user.is_staff:
             return qs
-        if hasattr(user, "client_profile"):
-            return qs.filter(instance__client=user.client_profile)
+        client_id = client_id_for(user)
+        if client_id is not None:
+            return qs.filter(instance__client_id=client_id)
         return DeploymentLog.objects.none()
 
+
+class PlanRolloutViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PlanRollout.objects.select_related("plan")
+    serializer_class = PlanRolloutSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        plan_id = self.request.query_params.get("plan")
+        if plan_id:
+            qs = qs.filter(plan_id=plan_id)
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return PlanRolloutDetailSerializer
+        return PlanRolloutSerializer
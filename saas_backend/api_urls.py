@@ -6,17 +6,20 @@ from accounts.views import (
     ClientViewSet, UserMeView, RegisterView, GoogleLogin,
     PasswordResetRequestView, PasswordResetConfirmView
 )
-from billing.views import PlanViewSet, SubscriptionViewSet, PaymentViewSet
+from billing.views import PlanViewSet, SubscriptionViewSet, PaymentViewSet, ModuleViewSet, RevenueReportView, InvoiceViewSet
 from billing.stripe_views import CreateStripeCheckoutSessionView, StripeWebhookView
-from instances.views import OdooInstanceViewSet, DeploymentLogViewSet
+from instances.views import OdooInstanceViewSet, DeploymentLogViewSet, PlanRolloutViewSet
 
 router = DefaultRouter()
 router.register(r"clients", ClientViewSet)
 router.register(r"plans", PlanViewSet)
+router.register(r"modules", ModuleViewSet)
 router.register(r"subscriptions", SubscriptionViewSet)
 router.register(r"instances", OdooInstanceViewSet)
 router.register(r"payments", PaymentViewSet)
+router.register(r"invoices", InvoiceViewSet)
 router.register(r"deployment-logs", DeploymentLogViewSet, basename="deployment-logs")
+router.register(r"plan-rollouts", PlanRolloutViewSet)
 router.register(r"me", UserMeView, basename="me")
 
 urlpatterns = [
@@ -28,6 +31,7 @@ urlpatterns = [
     path("password-reset-confirm/", PasswordResetConfirmView.as_view(), name="password_reset_confirm"),
     path("payments/create-stripe-checkout/", CreateStripeCheckoutSessionView.as_view(), name="create_stripe_checkout"),
     path("billing/stripe-webhook/", StripeWebhookView.as_view(), name="stripe_webhook"),
+    path("billing/reports/", RevenueReportView.as_view(), name="billing_reports"),
     path("", include(router.urls)),
 ]
 
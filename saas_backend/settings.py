@@ -143,10 +143,14 @@ STATIC_URL = 'static/'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.auth.ClaimsJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    )
+    ),
+    # Scoped throttles (ScopedRateThrottle, per client IP for anonymous callers)
+    'DEFAULT_THROTTLE_RATES': {
+        'password_reset': os.getenv('PASSWORD_RESET_THROTTLE_RATE', '5/hour'),
+    },
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -173,23 +177,108 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Google ID tokens, verified offline (accounts/google.py)
+GOOGLE_CLIENT_IDS = [cid.strip() for cid in os.getenv('GOOGLE_CLIENT_IDS', '').split(',') if cid.strip()]
+GOOGLE_JWKS_URL = os.getenv('GOOGLE_JWKS_URL', 'https://www.googleapis.com/oauth2/v3/certs')
+GOOGLE_JWKS_FILE = os.getenv('GOOGLE_JWKS_FILE', '')  # local key set instead of Google's (tests)
+GOOGLE_HTTP_TIMEOUT = float(os.getenv('GOOGLE_HTTP_TIMEOUT', 5))
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Tokens carry role / client_id claims, re-read on refresh (accounts/auth.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.auth.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.auth.ClaimsTokenRefreshSerializer',
 }
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_FROM', 'noreply@jounaidsaas.com')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 10))
+
+# Email outbox (accounts/emails.py)
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_RETRY_BASE_SECONDS', 60))
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 30))
 
 # Stripe (payment)
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
 STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
+# Empty = api.stripe.com; e.g. http://localhost:12111 for stripe-mock
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', '')
+STRIPE_TIMEOUT = float(os.getenv('STRIPE_TIMEOUT', 10))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', 2))
+STRIPE_CURRENCY = os.getenv('STRIPE_CURRENCY', 'eur')
 # Frontend base URL for Stripe success/cancel redirects
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+# Webhook inbox (billing/stripe_events.py): retries with exponential backoff, then dead-letter
+STRIPE_EVENT_MAX_ATTEMPTS = int(os.getenv('STRIPE_EVENT_MAX_ATTEMPTS', 8))
+STRIPE_EVENT_RETRY_BASE_SECONDS = int(os.getenv('STRIPE_EVENT_RETRY_BASE_SECONDS', 30))
+
+# Instance backups (pg_dump + filestore archives)
+BACKUP_ROOT = Path(os.getenv('BACKUP_ROOT', BASE_DIR / 'backups'))
+BACKUP_MAX_CONCURRENCY = int(os.getenv('BACKUP_MAX_CONCURRENCY', 2))
+BACKUP_HELPER_IMAGE = os.getenv('BACKUP_HELPER_IMAGE', 'alpine:3')
+RESTORE_MAX_CONCURRENCY = int(os.getenv('RESTORE_MAX_CONCURRENCY', 2))
+RESTORE_JOBS = int(os.getenv('RESTORE_JOBS', 4))  # pg_restore -j
+
+# Odoo version upgrades (UPDATE action)
+UPGRADE_MAX_CONCURRENCY = int(os.getenv('UPGRADE_MAX_CONCURRENCY', 2))
+UPGRADE_HEALTH_TIMEOUT = int(os.getenv('UPGRADE_HEALTH_TIMEOUT', 180))
+# Command run in the disposable container, e.g. an OpenUpgrade invocation. {db} is substituted.
+UPGRADE_MIGRATION_COMMAND = os.getenv('UPGRADE_MIGRATION_COMMAND', '')
+
+# Per-plan overrides of the computed resource profile (see instances/resources.py), e.g.
+# RESOURCE_PROFILES = {"Enterprise": {"workers": 8, "mem_limit_mb": 8192}}
+RESOURCE_PROFILES = {}
+# Prefork tenants publish Odoo's gevent port (/websocket) on <instance port> + this offset
+ODOO_GEVENT_PORT_OFFSET = int(os.getenv('ODOO_GEVENT_PORT_OFFSET', 1000))
+
+# Storage accounting (manage.py measure_storage)
+STORAGE_WARN_RATIO = float(os.getenv('STORAGE_WARN_RATIO', 0.9))
+STORAGE_QUOTA_ENFORCE = os.getenv('STORAGE_QUOTA_ENFORCE', 'False') == 'True'
+
+# Plan rollouts: canary wave, then batches (see instances/rollouts.py)
+ROLLOUT_CANARY_SIZE = int(os.getenv('ROLLOUT_CANARY_SIZE', 1))
+ROLLOUT_BATCH_SIZE = int(os.getenv('ROLLOUT_BATCH_SIZE', 10))
+ROLLOUT_CONCURRENCY = int(os.getenv('ROLLOUT_CONCURRENCY', 4))
+ROLLOUT_MAX_FAILURE_RATIO = float(os.getenv('ROLLOUT_MAX_FAILURE_RATIO', 0.5))
+
+# Billing cycle (manage.py run_billing_cycle)
+BILLING_RENEWAL_LEAD_DAYS = int(os.getenv('BILLING_RENEWAL_LEAD_DAYS', 7))
+BILLING_GRACE_DAYS = int(os.getenv('BILLING_GRACE_DAYS', 3))
+SUSPENSION_CONCURRENCY = int(os.getenv('SUSPENSION_CONCURRENCY', 4))
+
+# Tenant usage metering (instances/metering.py): max tenant connections open at once, per-tenant timeout (s)
+METERING_CONCURRENCY = int(os.getenv('METERING_CONCURRENCY', 16))
+METERING_TIMEOUT = int(os.getenv('METERING_TIMEOUT', 30))
+
+# Invoices (billing/invoices.py)
+INVOICE_ROOT = Path(os.getenv('INVOICE_ROOT', BASE_DIR / 'invoices'))
+INVOICE_RENDER_WORKERS = int(os.getenv('INVOICE_RENDER_WORKERS', 2))
+INVOICE_NUMBER_PREFIX = os.getenv('INVOICE_NUMBER_PREFIX', 'INV')
+INVOICE_SELLER = {
+    'name': os.getenv('INVOICE_SELLER_NAME', 'Jounaid SaaS'),
+    'address': os.getenv('INVOICE_SELLER_ADDRESS', ''),
+    'vat': os.getenv('INVOICE_SELLER_VAT', ''),
+}
+
+# Cache: per-process memory by default; point every worker at a shared one in production
+# (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://...)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Public plan catalog (billing/catalog.py)
+PLAN_CATALOG_TTL = int(os.getenv('PLAN_CATALOG_TTL', 300))
+PLAN_CATALOG_MAX_AGE = int(os.getenv('PLAN_CATALOG_MAX_AGE', 60))